@@ -17,7 +17,8 @@ PINS = {
 DISTANCE = {
     'THRESHOLD': 50,      # Alarm distance threshold (cm)
     'MIN_VALID': 2,      # Minimum valid distance (cm)
-    'MAX_VALID': 400     # Maximum valid distance (cm)
+    'MAX_VALID': 400,    # Maximum valid distance (cm)
+    'ECHO_TIMEOUT': 0.1  # Longest wait for each echo edge before the ping counts as failed (seconds)
 }
 
 # Servo Motor Settings
@@ -26,6 +27,7 @@ SERVO = {
     'MAX_ANGLE': 164,    # Maximum angle
     'STEP': 2,           # Angle step size
     'SPEED_DELAY': 0.1,  # Movement speed delay (seconds)
+    'TRAVEL_TIME': 0.002,  # Extra move time per degree beyond one step (seconds)
     'PWM_FREQUENCY': 50  # PWM frequency (Hz)
 }
 
@@ -37,17 +39,216 @@ SYSTEM = {
     'STARTUP_DELAY': 1             # Startup delay (seconds)
 }
 
+# Scan Step Scheduling
+# Step period = SERVO['SPEED_DELAY'] + SETTLE_TIME + SYSTEM['MEASUREMENT_INTERVAL']
+SCHEDULER = {
+    'POLICY': 'skip',          # After an overrun: 'skip' missed steps or 'catch_up'
+    'SETTLE_TIME': 0.1,        # Wait after moving the servo before pinging (seconds)
+    'MAX_CATCH_UP': 3,         # 'catch_up' never runs more than this many steps behind
+    'LATE_TOLERANCE': 0.005,   # Lateness up to this is jitter, not a missed step (seconds)
+    'LATENESS_HISTORY': 512    # Steps kept for the lateness and period statistics
+}
+
+# Sweep Pattern Settings (python3 -m core.sweep_patterns compares them)
+SWEEP = {
+    'PATTERN': 'linear',         # 'linear', 'interleaved', 'bit_reversed' or 'zone_priority'
+    'COARSE_STEP': 8,            # 'interleaved': first pass spacing, halved each pass (degrees)
+    'PRIORITY_ZONES': ['FRONT'], # 'zone_priority': zones read on every pass
+    'PRIORITY_STRIDE': 2         # 'zone_priority': other angles read every this many passes
+}
+
+# Manual Mode Settings (continuous ranging straight ahead)
+MANUAL = {
+    'STREAMING': True,       # Ping as fast as the sensor allows instead of every 0.5 s
+    'CYCLE_TIME': 0.06,      # HC-SR04 needs ~60 ms between pings (seconds)
+    'FILTER_WINDOW': 5,      # Median filter length (readings)
+    'TREND_WINDOW': 0.5,     # History used for the approach rate (seconds)
+    'RATE_SMOOTHING': 0.5,   # Approach rate smoothing (1 = no smoothing)
+    'APPROACH_RATE': 40,     # Closing speed that counts as approaching (cm/s)
+    'TTC_ALERT': 2.0,        # Alert when contact is this close in time (seconds)
+    'PRINT_INTERVAL': 0.5,   # At most one console line per interval (seconds)
+    'STATS_INTERVAL': 10     # Achieved rate and detection latency report (seconds)
+}
+
 # Database Settings
 DATABASE = {
     'FOLDER': "/home/ceren/Proje/records",
     'FILE': "measurements.db",
     'CONNECTION_TIMEOUT': 10,
-    'MAX_RETRIES': 3
+    'MAX_RETRIES': 3,
+    'RECENT_CAPACITY': 2048,      # Readings kept in memory for the dashboard
+    'SWEEP_FRAMES': True,         # Store every AUTO reading as one packed row per sweep
+    'FRAME_DELTA_ENCODING': True, # Store distance differences (compress much better)
+    'FRAME_COMPRESSION': True,    # zlib the packed distances when it saves space
+    'FRAME_MAX_READINGS': 256     # Longest frame (parked pings at one angle)
 }
 
 # Full database path
 DB_PATH = os.path.join(DATABASE['FOLDER'], DATABASE['FILE'])
 
+# Activity Governor Settings (battery saving)
+GOVERNOR = {
+    'ENABLED': True,
+    'NEAR_FACTOR': 1.5,           # Readings under THRESHOLD * NEAR_FACTOR count as activity
+    'IDLE_AFTER': 20,             # Open space time before slowing the sweep (seconds)
+    'PARK_AFTER': 120,            # Open space time before parking the servo (seconds)
+    'IDLE_STEP_MULTIPLIER': 2,    # Larger servo steps while idle
+    'IDLE_STEP_DELAY': 0.3,       # Extra wait per sweep step while idle (seconds)
+    'PARKED_PING_INTERVAL': 1.0,  # Forward ping interval while parked (seconds)
+    'IDLE_BLINK_EVERY': 10,       # Status LED blinks every N steps while idle
+    'PAUSE_WAKE_INTERVAL': 60     # Longest sleep while paused (seconds)
+}
+
+# Acquisition Process Settings
+ACQUISITION = {
+    'SEPARATE_PROCESS': False,    # Run servo and ranging in a dedicated process
+    'RING_CAPACITY': 1024,        # Shared-memory ring buffer slots
+    'CPU_AFFINITY': None,         # CPUs for the acquisition process, e.g. [3]
+    'REALTIME_PRIORITY': 0,       # SCHED_FIFO priority 1-99 (needs root), 0 = off
+    'NICE': -10,                  # Nice value used when real-time priority is off
+    'POLL_INTERVAL': 0.02,        # Consumer wait when the buffer is empty (seconds)
+    'STATS_INTERVAL': 30          # Throughput report interval (seconds)
+}
+
+# Measurement Pipeline Settings
+PIPELINE = {
+    'ENABLED': False,             # Run filter/classify/alert/sinks on their own threads
+    'BLOCK_TIMEOUT': 0.5,         # Longest a producer waits on a full 'block' queue (seconds)
+    'DEFAULT_CAPACITY': 128,      # Queue size for sinks without an entry below
+    'DEFAULT_POLICY': 'drop_oldest',
+    'STAGES': {                   # Backpressure: 'block' or 'drop_oldest'
+        'filter': {'CAPACITY': 64, 'POLICY': 'block'},
+        'classify': {'CAPACITY': 64, 'POLICY': 'block'},
+        'alert': {'CAPACITY': 32, 'POLICY': 'block'},
+        'signal': {'CAPACITY': 64, 'POLICY': 'drop_oldest'},
+        'persistence': {'CAPACITY': 256, 'POLICY': 'block'},
+        'telemetry': {'CAPACITY': 128, 'POLICY': 'drop_oldest'},
+        'control': {'CAPACITY': 256, 'POLICY': 'drop_oldest'}
+    }
+}
+
+# Fleet Sync Settings
+SYNC = {
+    'SERVER_URL': 'http://127.0.0.1:8765/ingest',  # Aggregation service endpoint
+    'DEVICE_ID': None,            # Defaults to the host name
+    'STATE_FILE': os.path.join(DATABASE['FOLDER'], 'sync_state.json'),  # High-water marks
+    'REJECTED_FILE': os.path.join(DATABASE['FOLDER'], 'sync_rejected.jsonl'),  # Row ranges the server refused
+    'BATCH_SIZE': 500,            # Rows per upload
+    'INTERVAL': 60,               # Time between sync rounds (seconds)
+    'MAX_RETRIES': 5,             # Upload attempts per batch
+    'BACKOFF_BASE': 1.0,          # First retry delay (seconds)
+    'BACKOFF_MAX': 60.0,          # Longest retry delay (seconds)
+    'REQUEST_TIMEOUT': 10,        # HTTP timeout (seconds)
+    'AGGREGATOR_HOST': '127.0.0.1',
+    'AGGREGATOR_PORT': 8765,
+    'AGGREGATOR_DB': os.path.join(DATABASE['FOLDER'], 'fleet.db')
+}
+
+# Database Snapshot Settings (read-only replica for heavy queries)
+SNAPSHOT = {
+    'ENABLED': True,
+    'FILE': os.path.join(DATABASE['FOLDER'], 'measurements_replica.db'),
+    'INTERVAL': 300,         # Time between snapshots (seconds)
+    'PAGES': 64,             # Pages copied per batch - the writer waits at most one batch
+    'PAUSE': 0.01,           # Gap between batches for the writer (seconds)
+    'MAX_RESTARTS': 4        # Writes restarting the copy double the batch this often, then wait for next round
+}
+
+# Distance Quantile Settings (p5/p50/p95 per zone, python3 -m database.quantiles)
+QUANTILES = {
+    'ENABLED': True,
+    'FILE': os.path.join(DATABASE['FOLDER'], 'distance_quantiles.json'),
+    'COMPRESSION': 100,      # t-digest accuracy - about COMPRESSION / 2 centroids per sketch
+    'WINDOW': 3600,          # Time window per set of sketches (seconds)
+    'KEEP_WINDOWS': 24,      # Windows kept for the dashboard and --hours, older ones are dropped
+    'SAVE_INTERVAL': 300     # Save the sketches this often, and on shutdown (seconds)
+}
+
+# Offline Analytics Settings (python3 -m database.analytics)
+ANALYTICS = {
+    'CACHE_FILE': os.path.join(DATABASE['FOLDER'], 'analytics_cache.npz'),
+    'CHUNK_SIZE': 50000,     # Rows read per query
+    'ANGLE_BIN': 5,          # Heatmap angle resolution (degrees)
+    'DISTANCE_BIN': 10,      # Zone histogram resolution (cm)
+    'INCLUDE_FRAMES': True   # Count every automatic reading from the sweep frames
+}
+
+# Warm Restart Settings
+CHECKPOINT = {
+    'ENABLED': True,
+    'FILE': os.path.join(DATABASE['FOLDER'], 'checkpoint.json'),
+    'INTERVAL': 5.0,         # Save runtime state this often when it changed (seconds)
+    'REFRESH': 60.0,         # Rewrite an unchanged state this often (seconds)
+    'MAX_AGE': 300,          # Older checkpoints start cold (seconds)
+    'RECENT_READINGS': 256   # In-memory readings carried over for the dashboard
+}
+
+# Local Control Socket Settings
+CONTROL = {
+    'ENABLED': True,
+    'SOCKET': os.path.join(DATABASE['FOLDER'], 'control.sock'),  # Unix domain socket path
+    'SOCKET_MODE': 0o660,    # File permissions of the socket
+    'MAX_CLIENTS': 16,       # Further connections are closed right away
+    'SUBSCRIBER_QUEUE': 256, # Pushed events held per slow client before the oldest are dropped
+    'RECENT_READINGS': 20,   # Readings included in a status reply
+    'STATE_POLL': 0.5        # Button state check interval for 'state' events (seconds)
+}
+
+# Device Health Settings
+HEALTH = {
+    'ENABLED': True,
+    'FAILURE_THRESHOLD': 5,      # Consecutive failures that make a device fail fast
+    'ERROR_RATE': 0.5,           # ...or this share of failures over the last WINDOW calls
+    'WINDOW': 20,
+    'PROBE_INTERVAL': 1.0,       # First retry of a failing device (seconds)
+    'PROBE_BACKOFF': 2.0,        # Retry interval multiplier after each failed retry
+    'MAX_PROBE_INTERVAL': 60.0   # Longest retry interval (seconds)
+}
+
+# Runtime Configuration Settings
+RUNTIME = {
+    'CONFIG_FILE': os.path.join(DATABASE['FOLDER'], 'config.json'),  # JSON overrides of these settings
+    'HOT_RELOAD': True,            # Watch the config file and apply changes live
+    'RELOAD_INTERVAL': 2.0         # Config file check interval (seconds)
+}
+
+# Soak Test Settings (simulation/soak.py)
+SOAK = {
+    'HOURS': 24,                  # Simulated run time
+    'SAMPLE_INTERVAL': 600,       # Simulated time between resource samples (seconds)
+    'PRESS_INTERVAL': 1800,       # Mean simulated time between random button presses (seconds)
+    'WARMUP': 3600,               # Start-up time left out of the drift checks (simulated seconds) -
+                                  # SQLite page cache, allocator arenas and the sketches fill here
+    'MAX_RSS_GROWTH_KB_PER_HOUR': 256,  # After warm-up - 6 MB a day; sampling noise is ~±100 KB
+    'MAX_FD_GROWTH': 4,           # Open file descriptors, last vs first sample
+    'MAX_DB_GROWTH_MB_PER_HOUR': 5,
+    'MAX_WAL_MB': 16,
+    'MAX_LATENCY_DRIFT': 1.5,     # p95 step latency, last quarter vs first quarter
+    'MAX_CONNECTIONS_PER_STEP': 0.5
+}
+
+# Scenario Scoring Settings (simulation/scenarios.py)
+SCENARIO = {
+    'BEAM_WIDTH': 15,        # Ultrasonic cone that still returns an echo (degrees)
+    'RAYS': 7,               # Rays cast across the cone per ping
+    'MAX_INCIDENCE': 45,     # Surfaces hit more obliquely than this reflect the ping away (degrees)
+    'RANGE_NOISE': 0.5,      # Standard deviation of a measured distance (cm)
+    'TRUTH_STEP': 0.05       # Ground truth sampling interval (seconds)
+}
+
+# Parameter Tuner Settings (simulation/tuner.py)
+TUNER = {
+    'SPACE': {               # Values tried per setting, as 'SECTION.KEY'
+        'SERVO.STEP': [1, 2, 3, 4],
+        'SERVO.SPEED_DELAY': [0.05, 0.1, 0.15],
+        'SYSTEM.MEASUREMENT_INTERVAL': [0.02, 0.05, 0.1],
+        'DISTANCE.THRESHOLD': [40, 50, 60, 70]
+    },
+    'SCENARIOS': [],         # Scenarios run for every combination (empty = all)
+    'WORKERS': 0,            # Worker processes (0 = one per CPU core)
+    'TOP': 20                # Rows shown in the ranked table
+}
+
 # Direction Detection Settings
 DIRECTION = {
     'ZONES': {
@@ -66,6 +267,30 @@ DIRECTION = {
     }
 }
 
+# Alert Settings
+ALERT = {
+    'EXIT_MARGIN': 10,            # Hysteresis band above threshold before a zone may clear (cm)
+    'RELEASE_TIME': 1.0,          # Time above the exit band before a zone clears (seconds)
+    'COOLDOWN': 2.0,              # Minimum gap between alerts in the same zone (seconds)
+    'REPEAT_INTERVAL': 6.0,       # Reminder interval while a zone stays active (seconds)
+    'ESCALATION_DISTANCE': 10     # Distance drop that re-alerts during cooldown (cm)
+}
+
+# Background Model Settings (static surroundings learned per angle)
+BACKGROUND = {
+    'ENABLED': True,
+    'ANGLE_BIN': 2,              # Angle resolution of the model (degrees)
+    'MIN_SAMPLES': 2,            # Readings at an angle before it counts as learned
+    'ADAPT_RATE': 0.1,           # Weight of a new matching reading in the running estimate
+    'FOREGROUND_RATE': 0.25,     # How fast a changed scene becomes background (per reading)
+    'DEVIATION': 3.0,            # Standard deviations off the background that still alert
+    'MIN_DEVIATION': 8,          # ...but never less than this (cm)
+    'INITIAL_SPREAD': 5,         # Standard deviation assumed for a new angle (cm)
+    'APPROACH_RATE': 20,         # Closing speed that alerts even on background (cm/s)
+    'ALWAYS_ALERT_BELOW': 25,    # Closer readings always alert (cm)
+    'MAX_AGE': 60                # Angles not read for this long are learned again (seconds)
+}
+
 # Audio Settings
 AUDIO = {
     'STARTUP_NOTES': [
@@ -80,6 +305,11 @@ AUDIO = {
         (0.2, 0.05),   # G
         (0.2, 0.05),   # E
         (0.4, 0.1),    # Low C (long)
+    ],
+    'DEGRADED_NOTES': [          # A device stopped working
+        (0.6, 0.15),
+        (0.6, 0.15),
+        (0.1, 0.3),
     ]
 }
 
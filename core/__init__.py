@@ -2,5 +2,6 @@
 from .scanner import Scanner
 from .direction import DirectionDetector
 from .button_handler import ButtonHandler
+from .alert_manager import AlertManager
 
-__all__ = ['Scanner', 'DirectionDetector', 'ButtonHandler']
\ No newline at end of file
+__all__ = ['Scanner', 'DirectionDetector', 'ButtonHandler', 'AlertManager']
\ No newline at end of file
@@ -0,0 +1,284 @@
+# Real-time acquisition process - servo and ranging isolated from the consumer
+import multiprocessing
+import os
+import queue
+import time
+from runtime_config import RuntimeConfig, get_config
+from .activity_governor import ActivityGovernor
+from .direction import forward_angle
+from .ring_buffer import SharedRingBuffer
+from .scheduler import PeriodicScheduler
+from .sweep_patterns import next_position
+
+# Pins owned by the acquisition process, the consumer keeps the rest
+ACQUISITION_PINS = ('TRIG', 'ECHO', 'SERVO')
+
+# Wait between readings in manual mode without streaming (seconds)
+MANUAL_INTERVAL = 0.5
+
+# Governor levels by their index in the ring's ACTIVITY byte
+ACTIVITY_LEVELS = (ActivityGovernor.ACTIVE, ActivityGovernor.IDLE, ActivityGovernor.PARKED)
+
+def _apply_realtime_settings(cpus, priority, nice):
+    """Pin the process to CPUs and raise its priority where the OS allows it"""
+    if cpus:
+        try:
+            os.sched_setaffinity(0, set(cpus))
+            print(f"[ACQ] Pinned to CPUs {sorted(cpus)}")
+        except (AttributeError, OSError) as e:
+            print(f"[ACQ] CPU affinity not applied: {e}")
+
+    if priority:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            print(f"[ACQ] SCHED_FIFO priority {priority}")
+            return
+        except (AttributeError, OSError) as e:
+            print(f"[ACQ] Real-time priority not applied: {e}")
+
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError as e:
+            print(f"[ACQ] Nice value not applied: {e}")
+
+def acquisition_main(ring_name, sections, wake, config_updates):
+    """Entry point of the acquisition process
+
+    `wake` is set by the consumer when running/mode change, `config_updates`
+    carries reloaded settings; the activity level comes through the ring.
+    """
+    from hardware.gpio_controller import GPIOController
+    from hardware.servo_motor import ServoMotor
+    from hardware.ultrasonic import UltrasonicSensor
+
+    cfg = RuntimeConfig(sections)
+    acquisition = cfg.acquisition
+    _apply_realtime_settings(acquisition.cpu_affinity, acquisition.realtime_priority,
+                             acquisition.nice)
+
+    ring = SharedRingBuffer(name=ring_name)
+    gpio = GPIOController(cfg, pin_names=ACQUISITION_PINS)
+    servo = ServoMotor(gpio, cfg)
+    sensor = UltrasonicSensor(gpio, cfg)
+    scheduler = PeriodicScheduler(MANUAL_INTERVAL, cfg)
+    governor = ActivityGovernor(cfg)
+
+    current_angle = cfg.servo.min_angle
+    direction = 1
+    sweep_index = 0
+    aimed = False
+    parked = False
+    window_start = time.time()
+    window_count = 0
+    last_report = window_start
+
+    try:
+        while not ring.stop_requested:
+            # Reloaded settings apply from the next step, like in the main process
+            try:
+                while True:
+                    cfg = RuntimeConfig(config_updates.get_nowait())
+                    for component in (gpio, servo, sensor, scheduler, governor):
+                        component.config = cfg
+            except queue.Empty:
+                pass
+            acquisition = cfg.acquisition
+
+            if not ring.running:
+                # Paused - sleep until the consumer passes on a button press
+                scheduler.reset()
+                wake.wait(cfg.governor.pause_wake_interval)
+                wake.clear()
+                continue
+
+            flags = 0
+            if ring.auto_mode:
+                governor.follow(ACTIVITY_LEVELS[ring.activity])
+                scheduler.wait_next()
+
+                if governor.is_parked():
+                    # Long stretch of open space - hold the servo forward and ping slowly
+                    scheduler.set_period(governor.parked_interval())
+                    if not parked:
+                        servo.set_angle(forward_angle(cfg))
+                        parked = True
+                    aimed = False
+                    distance = sensor.measure_distance()
+                    ring.publish(servo.get_current_angle(), distance, flags)
+                else:
+                    if parked:
+                        # Resume the sweep from where the servo is
+                        parked = False
+                        current_angle = servo.get_current_angle()
+
+                    current_angle, direction, sweep_index, wrapped = next_position(
+                        cfg, current_angle, direction, sweep_index, governor.step_multiplier())
+                    # This step's move sizes the gap to the next deadline
+                    settle_offset = servo.move_time(current_angle) + cfg.scheduler.settle_time
+                    scheduler.set_period(settle_offset + cfg.system.measurement_interval +
+                                         governor.extra_step_delay())
+
+                    # A linear pass completes back at the start, a pattern when its cycle wraps
+                    if cfg.sweep.pattern == 'linear':
+                        wrapped = current_angle <= cfg.servo.min_angle
+                    if wrapped:
+                        flags = SharedRingBuffer.FLAG_PASS_COMPLETE
+
+                    servo.set_angle(current_angle)
+                    aimed = False
+                    scheduler.wait_offset(settle_offset)
+                    distance = sensor.measure_distance()
+                    ring.publish(current_angle, distance, flags)
+            else:
+                if not aimed:
+                    servo.set_angle(forward_angle(cfg))
+                    aimed = True
+                    parked = False
+                scheduler.wait_next()
+                scheduler.set_period(cfg.manual.cycle_time if cfg.manual.streaming else MANUAL_INTERVAL)
+                distance = sensor.measure_distance()
+                ring.publish(servo.get_current_angle(), distance, SharedRingBuffer.FLAG_MANUAL)
+
+            window_count += 1
+            now = time.time()
+            if now - window_start >= 1.0:
+                ring.set_producer_rate(window_count / (now - window_start))
+                window_start = now
+                window_count = 0
+
+            if now - last_report >= acquisition.stats_interval:
+                last_report = now
+                stats = ring.get_statistics()
+                timing = scheduler.get_statistics()
+                print(f"[ACQ] Published: {stats['published']} | "
+                      f"Rate: {stats['producer_rate']:.1f}/s | "
+                      f"Overwritten: {stats['overwritten']} | "
+                      f"Missed deadlines: {timing['missed']}, "
+                      f"late p95 {timing['lateness_p95'] * 1000:.0f}ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servo.move_to_center()
+        servo.stop()
+        gpio.cleanup()
+        ring.close()
+
+class AcquisitionProcess:
+    """Runs acquisition in a child process and feeds its readings to the Scanner"""
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.ring = None
+        self.process = None
+        self.wake = None
+        self.config_updates = None
+        self.consumed = 0
+        self.start_time = None
+
+    def start(self):
+        # Spawn keeps the child free of inherited GPIO and SQLite state
+        context = multiprocessing.get_context('spawn')
+        self.ring = SharedRingBuffer(capacity=self.config.acquisition.ring_capacity)
+        self.wake = context.Event()
+        self.config_updates = context.Queue()
+        self.process = context.Process(target=acquisition_main, name="acquisition",
+                                       args=(self.ring.name, self.config.to_dict(), self.wake,
+                                             self.config_updates),
+                                       daemon=True)
+        self.process.start()
+        self.start_time = time.time()
+        print(f"Acquisition process started (pid {self.process.pid})")
+        return True
+
+    def stop(self):
+        if self.ring is None:
+            return
+
+        self.ring.request_stop()
+        self.wake.set()
+        if self.process is not None:
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+
+        self.report()
+        self.config_updates.close()
+        self.ring.close()
+        self.ring = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def apply_config(self, new_config):
+        """Pass a reloaded configuration on - the child applies it from its next step"""
+        self.config = new_config
+        if self.config_updates is not None:
+            self.config_updates.put(new_config.to_dict())
+
+    def run_consumer(self, scanner, button_handler):
+        """Consumer loop - alert decisions, activity level, persistence and dashboard"""
+        governor = scanner.governor
+        last_report = time.time()
+        last_state = None
+
+        while self.is_alive():
+            acquisition = self.config.acquisition
+            state = button_handler.get_system_state()
+            self.ring.set_state(state['running'], state['auto_mode'])
+
+            if (state['running'], state['auto_mode']) != last_state:
+                last_state = (state['running'], state['auto_mode'])
+                self.wake.set()
+                if not state['running']:
+                    scanner.buzzer_led.status_blink(False)
+
+            records = self.ring.read()
+            if not records:
+                if state['running']:
+                    time.sleep(acquisition.poll_interval)
+                else:
+                    # Paused - sleep until the button (or a command) changes the state
+                    governor.wait_for_state_change(button_handler)
+
+            for timestamp, angle, distance, flags in records:
+                self.consumed += 1
+                mode = "MANUAL" if flags & SharedRingBuffer.FLAG_MANUAL else "AUTO"
+                if mode == "AUTO":
+                    # The governor decides here, the child follows through the ring
+                    governor.observe(distance, timestamp)
+                    self.ring.set_activity(ACTIVITY_LEVELS.index(governor.level))
+                    scanner.record_frame_reading(int(round(angle)), distance, timestamp)
+                if mode == "MANUAL" and self.config.manual.streaming:
+                    scanner.stream_reading(distance, int(round(angle)), timestamp)
+                elif distance > 0:
+                    scanner._process_measurement(distance, int(round(angle)), mode, timestamp)
+                if flags & SharedRingBuffer.FLAG_PASS_COMPLETE:
+                    scanner.scan_cycle += 1
+                    scanner._show_scan_results()
+
+            if time.time() - last_report >= acquisition.stats_interval:
+                last_report = time.time()
+                self.report()
+
+        scanner.db.flush_sweep_frame()
+        print("Acquisition process exited")
+
+    def get_statistics(self):
+        if self.ring is None:
+            return {}
+
+        stats = self.ring.get_statistics()
+        elapsed = time.time() - self.start_time if self.start_time else 0
+        stats['consumer_rate'] = self.consumed / elapsed if elapsed > 0 else 0
+        stats['pending'] = self.ring.pending()
+        return stats
+
+    def report(self):
+        stats = self.get_statistics()
+        if stats:
+            print(f"[ACQ] Producer: {stats['published']} readings "
+                  f"({stats['producer_rate']:.1f}/s), {stats['overwritten']} overwritten | "
+                  f"Consumer: {self.consumed} readings ({stats['consumer_rate']:.1f}/s), "
+                  f"{stats['dropped']} dropped, {stats['pending']} pending")
@@ -0,0 +1,110 @@
+# Activity governor - adapts scan rate to how busy the surroundings are
+import time
+from runtime_config import get_config
+
+class ActivityGovernor:
+    """Slows the sweep in open space and parks the servo, full rate when something is near"""
+    ACTIVE = 'ACTIVE'    # Full sweep rate
+    IDLE = 'IDLE'        # Coarser, slower sweep
+    PARKED = 'PARKED'    # Servo at center, slow forward pings
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        now = time.time()
+        self.start_time = now
+        self.level = self.ACTIVE
+        self.level_since = now
+        self.level_time = {self.ACTIVE: 0.0, self.IDLE: 0.0, self.PARKED: 0.0}
+        self.last_activity = now
+        self.last_ping = None
+        self.wakeups = 0
+        self.sleep_time = 0.0
+        self.wake_latencies = []
+        self.step_count = 0
+
+    def _set_level(self, level, now):
+        if level != self.level:
+            self.level_time[self.level] += now - self.level_since
+            self.level = level
+            self.level_since = now
+
+    def observe(self, distance, now=None):
+        """Feed every reading - returns the activity level for the next step"""
+        if now is None:
+            now = time.time()
+
+        cfg = self.config
+        governor = cfg.governor
+
+        if 0 < distance < cfg.distance.threshold * governor.near_factor:
+            if self.level != self.ACTIVE and self.last_ping is not None:
+                # Worst case an obstacle went unseen: the gap since the previous ping
+                self.wake_latencies.append(now - self.last_ping)
+                if len(self.wake_latencies) > 100:
+                    del self.wake_latencies[0]
+            self.last_activity = now
+            self._set_level(self.ACTIVE, now)
+        elif governor.enabled:
+            quiet_time = now - self.last_activity
+            if quiet_time >= governor.park_after:
+                self._set_level(self.PARKED, now)
+            elif quiet_time >= governor.idle_after:
+                self._set_level(self.IDLE, now)
+
+        self.last_ping = now
+        self.step_count += 1
+        return self.level
+
+    def follow(self, level):
+        """Take a level decided by another governor - the acquisition process follows the consumer's"""
+        self._set_level(level, time.time())
+
+    def is_parked(self):
+        return self.level == self.PARKED
+
+    def step_multiplier(self):
+        return self.config.governor.idle_step_multiplier if self.level == self.IDLE else 1
+
+    def extra_step_delay(self):
+        return self.config.governor.idle_step_delay if self.level == self.IDLE else 0
+
+    def parked_interval(self):
+        return self.config.governor.parked_ping_interval
+
+    def status_blink_due(self):
+        """Blink every step when active, every Nth step otherwise"""
+        if self.level == self.ACTIVE:
+            return True
+        return self.step_count % self.config.governor.idle_blink_every == 0
+
+    def sleep(self, seconds):
+        """Sleep with wake-up and duty cycle accounting"""
+        if seconds <= 0:
+            return
+        time.sleep(seconds)
+        self.wakeups += 1
+        self.sleep_time += seconds
+
+    def wait_for_state_change(self, button_handler):
+        """Block while paused until the button (or a command) changes the state"""
+        start = time.time()
+        button_handler.wait_for_state_change(self.config.governor.pause_wake_interval)
+        self.wakeups += 1
+        self.sleep_time += time.time() - start
+
+    def get_statistics(self):
+        now = time.time()
+        elapsed = max(now - self.start_time, 1e-9)
+        level_time = dict(self.level_time)
+        level_time[self.level] += now - self.level_since
+        latencies = self.wake_latencies
+
+        return {
+            'level': self.level,
+            'duty_cycle': max(0.0, 1 - self.sleep_time / elapsed),
+            'wakeups_per_minute': self.wakeups * 60 / elapsed,
+            'level_time': level_time,
+            'wake_count': len(latencies),
+            'wake_latency_avg': sum(latencies) / len(latencies) if latencies else 0,
+            'wake_latency_max': max(latencies) if latencies else 0
+        }
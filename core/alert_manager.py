@@ -0,0 +1,106 @@
+# Alert state management - hysteresis and per-zone cooldown
+import time
+from runtime_config import get_config
+
+class AlertManager:
+    """Decides which close readings deserve an audible alert"""
+    EMIT = 'EMIT'            # New obstacle or reminder - play the alert
+    ESCALATE = 'ESCALATE'    # Obstacle got meaningfully closer - play the alert
+    SUPPRESS = 'SUPPRESS'    # Same obstacle reported recently - stay quiet
+    CLEAR = 'CLEAR'          # Zone left the exit band - obstacle gone
+    BACKGROUND = 'BACKGROUND'  # Close, but part of the learned surroundings - stay quiet
+    TREND = 'TREND'          # Closing in fast beyond the threshold - set by the manual stream
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.zones = {}
+        for zone_name in self.config.direction.zones:
+            self.zones[zone_name] = self._new_zone_state()
+
+    def _new_zone_state(self):
+        return {
+            'active': False,
+            'last_alert_time': None,
+            'last_alert_distance': None,
+            'last_close_time': 0,
+            'emitted': 0,
+            'escalated': 0,
+            'suppressed': 0
+        }
+
+    def evaluate(self, distance, zone_name, now=None):
+        """Return the alert decision for a reading, or None if nothing changes"""
+        if distance <= 0:
+            return None
+
+        if now is None:
+            now = time.time()
+
+        alert = self.config.alert
+        state = self.zones.get(zone_name)
+        if state is None:
+            state = self.zones[zone_name] = self._new_zone_state()
+
+        if distance < alert.enter_threshold:
+            state['last_close_time'] = now
+
+            if not state['active']:
+                state['active'] = True
+                if self._cooldown_elapsed(state, now, alert.cooldown):
+                    return self._emit(state, distance, now, self.EMIT)
+            elif (state['last_alert_distance'] is not None and
+                  distance <= state['last_alert_distance'] - alert.escalation_distance):
+                state['escalated'] += 1
+                return self._emit(state, distance, now, self.ESCALATE)
+            elif self._cooldown_elapsed(state, now, alert.repeat_interval):
+                return self._emit(state, distance, now, self.EMIT)
+
+            state['suppressed'] += 1
+            return self.SUPPRESS
+
+        if not state['active']:
+            return None
+
+        if distance < alert.exit_threshold:
+            # Inside the hysteresis band - obstacle still there
+            state['last_close_time'] = now
+            return None
+
+        if now - state['last_close_time'] >= alert.release_time:
+            state['active'] = False
+            state['last_alert_distance'] = None
+            return self.CLEAR
+
+        return None
+
+    def _cooldown_elapsed(self, state, now, interval):
+        return state['last_alert_time'] is None or now - state['last_alert_time'] >= interval
+
+    def _emit(self, state, distance, now, decision):
+        state['last_alert_time'] = now
+        state['last_alert_distance'] = distance
+        state['emitted'] += 1
+        return decision
+
+    def is_zone_active(self, zone_name):
+        state = self.zones.get(zone_name)
+        return bool(state and state['active'])
+
+    def get_statistics(self):
+        stats = {'emitted': 0, 'escalated': 0, 'suppressed': 0, 'zones': {}}
+
+        for zone_name, state in self.zones.items():
+            stats['emitted'] += state['emitted']
+            stats['escalated'] += state['escalated']
+            stats['suppressed'] += state['suppressed']
+            stats['zones'][zone_name] = {
+                'active': state['active'],
+                'emitted': state['emitted'],
+                'suppressed': state['suppressed']
+            }
+
+        return stats
+
+    def reset(self):
+        for zone_name in list(self.zones):
+            self.zones[zone_name] = self._new_zone_state()
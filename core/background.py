@@ -0,0 +1,105 @@
+# Background model - learned per-angle distances so static surroundings stop beeping
+import math
+from array import array
+from runtime_config import get_config
+
+# Verdicts for a reading
+LEARNING = 'learning'        # Too few readings at this angle yet - alert as usual
+BACKGROUND = 'background'    # Matches the learned surroundings
+DEVIATION = 'deviation'      # Off the learned distance by more than the allowed spread
+APPROACH = 'approach'        # Closing in faster than APPROACH_RATE
+TOO_CLOSE = 'too_close'      # Under ALWAYS_ALERT_BELOW - never treated as background
+
+class BackgroundModel:
+    """Running distance estimate with variance per angle bin
+
+    Every automatic reading updates its bin (exponentially weighted mean and
+    variance). A close reading that matches its bin is background and needs
+    no alert; one that deviates by more than DEVIATION standard deviations
+    (at least MIN_DEVIATION cm), or closes in faster than APPROACH_RATE since
+    the last visit, still alerts. Deviating readings are folded in slowly
+    (FOREGROUND_RATE), so a new static scene is learned within a few passes
+    while a moving obstacle keeps standing out. Bins not visited for MAX_AGE
+    seconds start over.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        # Bin layout is fixed for the lifetime of the model
+        self.bin_size = self.config.background.angle_bin
+        bins = 180 // self.bin_size + 1
+        self.means = array('f', [0.0]) * bins
+        self.variances = array('f', [0.0]) * bins
+        self.last_distances = array('f', [0.0]) * bins
+        self.last_times = array('d', [0.0]) * bins
+        self.counts = array('H', [0]) * bins
+        self.verdicts = {LEARNING: 0, BACKGROUND: 0, DEVIATION: 0, APPROACH: 0, TOO_CLOSE: 0}
+        self.suppressed = 0
+
+    def observe(self, angle, distance, now):
+        """Learn from a reading and return its verdict"""
+        background = self.config.background
+        index = min(len(self.counts) - 1, max(0, int(angle) // self.bin_size))
+        count = self.counts[index]
+        if count and now - self.last_times[index] > background.max_age:
+            count = 0   # Not seen for a while - the wearer has moved on
+
+        if count == 0:
+            self.means[index] = distance
+            self.variances[index] = background.initial_spread ** 2
+            verdict = LEARNING
+        else:
+            mean = self.means[index]
+            elapsed = now - self.last_times[index]
+            rate = (self.last_distances[index] - distance) / elapsed if elapsed > 0 else 0.0
+            allowed = max(background.min_deviation,
+                          background.deviation * math.sqrt(self.variances[index]))
+
+            if distance < background.always_alert_below:
+                verdict = TOO_CLOSE
+            elif count < background.min_samples:
+                verdict = LEARNING
+            elif rate >= background.approach_rate:
+                verdict = APPROACH
+            elif abs(distance - mean) > allowed:
+                verdict = DEVIATION
+            else:
+                verdict = BACKGROUND
+
+            difference = distance - mean
+            if verdict in (DEVIATION, APPROACH):
+                # Only the mean drifts toward a changed scene, the spread stays tight
+                self.means[index] = mean + background.foreground_rate * difference
+            else:
+                # Plain average while learning, then exponential forgetting
+                alpha = max(background.adapt_rate, 1.0 / (count + 1))
+                self.means[index] = mean + alpha * difference
+                self.variances[index] = (1 - alpha) * (self.variances[index] + alpha * difference ** 2)
+
+        self.counts[index] = min(count + 1, 0xFFFF)
+        self.last_distances[index] = distance
+        self.last_times[index] = now
+        self.verdicts[verdict] += 1
+        return verdict
+
+    def is_background(self, angle, distance, now):
+        """True for a reading that would alert but only shows the known surroundings"""
+        if not self.config.background.enabled:
+            return False
+        verdict = self.observe(angle, distance, now)
+        if verdict == BACKGROUND and distance < self.config.distance.threshold:
+            self.suppressed += 1
+            return True
+        return False
+
+    def reset(self):
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+
+    def get_statistics(self):
+        learned = sum(1 for count in self.counts if count >= self.config.background.min_samples)
+        return {
+            'suppressed': self.suppressed,
+            'verdicts': dict(self.verdicts),
+            'learned_bins': learned
+        }
@@ -1,15 +1,18 @@
 # Button control system
+import threading
 import time
-from config import SYSTEM
+from runtime_config import get_config
 
 class ButtonHandler:
-    def __init__(self, gpio_controller, buzzer_led):
+    def __init__(self, gpio_controller, buzzer_led, config=None):
         self.gpio = gpio_controller
         self.buzzer_led = buzzer_led
+        self.config = config or get_config()
         self.system_running = False
         self.auto_mode = True
         self.manual_mode = False
         self.last_button_time = 0
+        self.state_changed = threading.Event()
         self.callbacks = {
             'system_toggle': None,
             'mode_change': None
@@ -23,7 +26,7 @@ class ButtonHandler:
         current_time = time.time()
         
         # Debounce protection
-        if current_time - self.last_button_time < (SYSTEM['BUTTON_DEBOUNCE'] / 1000):
+        if current_time - self.last_button_time < self.config.system.button_debounce_s:
             return
         
         self.last_button_time = current_time
@@ -33,15 +36,16 @@ class ButtonHandler:
             self._handle_button_press()
     
     def _handle_button_press(self):
+        long_press_time = self.config.system.long_press_time
         button_hold_start = time.time()
         
         # Long press check
-        while self.gpio.read_pin('BUTTON') == 0 and (time.time() - button_hold_start) < SYSTEM['LONG_PRESS_TIME']:
+        while self.gpio.read_pin('BUTTON') == 0 and (time.time() - button_hold_start) < long_press_time:
             time.sleep(0.1)
         
         button_hold_time = time.time() - button_hold_start
         
-        if button_hold_time >= SYSTEM['LONG_PRESS_TIME']:
+        if button_hold_time >= long_press_time:
             self._handle_long_press()
         else:
             self._handle_short_press()
@@ -57,6 +61,8 @@ class ButtonHandler:
             print("\n[BUTTON] System PAUSED!")
             self.buzzer_led.system_pause_signal()
         
+        self.state_changed.set()
+        
         # Call callback
         if self.callbacks['system_toggle']:
             self.callbacks['system_toggle'](self.system_running)
@@ -70,6 +76,7 @@ class ButtonHandler:
         print(f"\n[BUTTON] Mode changed to: {mode_text}")
         
         self.buzzer_led.mode_change_signal()
+        self.state_changed.set()
         
         # Call callback
         if self.callbacks['mode_change']:
@@ -88,9 +95,17 @@ class ButtonHandler:
             'manual_mode': self.manual_mode
         }
     
+    def wait_for_state_change(self, timeout=None):
+        """Block until running/mode changes - returns False on timeout"""
+        changed = self.state_changed.wait(timeout)
+        self.state_changed.clear()
+        return changed
+    
     def set_system_running(self, state):
         self.system_running = state
+        self.state_changed.set()
     
     def set_auto_mode(self, state):
         self.auto_mode = state
-        self.manual_mode = not state
\ No newline at end of file
+        self.manual_mode = not state
+        self.state_changed.set()
\ No newline at end of file
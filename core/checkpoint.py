@@ -0,0 +1,99 @@
+# Runtime checkpoints - periodic state snapshots for warm restarts
+import json
+import os
+import threading
+import time
+
+CHECKPOINT_VERSION = 1
+
+def write_checkpoint(path, state):
+    """Atomic replace - a crash mid-write leaves the previous checkpoint intact"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path, max_age):
+    """The saved state if it is recent enough to resume from, else None"""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable checkpoint: {e}")
+        return None
+
+    if state.get('version') != CHECKPOINT_VERSION:
+        print("Ignoring checkpoint from another version")
+        return None
+
+    age = time.time() - state.get('saved_at', 0)
+    if not 0 <= age <= max_age:
+        print(f"Ignoring checkpoint from {age:.0f}s ago")
+        return None
+
+    return state
+
+def clear_checkpoint(path):
+    """Called after a clean shutdown so the next start is a cold one"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Checkpoint removal error: {e}")
+
+class Checkpointer:
+    """Background thread that saves collect() every `interval` seconds when it changed
+
+    An unchanged state is still rewritten every `refresh` seconds so the file
+    never looks too old to resume from while the system idles.
+    """
+
+    def __init__(self, path, collect, interval=5.0, refresh=60.0):
+        self.path = path
+        self.collect = collect
+        self.interval = interval
+        self.refresh = refresh
+        self.last_write_time = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_saved = None
+        self.saves = 0
+        self.errors = 0
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="checkpointer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 1)
+            self.thread = None
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.save()
+
+    def save(self):
+        try:
+            state = self.collect()
+            # saved_at changes every time - compare the rest
+            comparable = dict(state, saved_at=None)
+            if comparable == self.last_saved and time.time() - self.last_write_time < self.refresh:
+                return False
+
+            write_checkpoint(self.path, state)
+            self.last_saved = comparable
+            self.last_write_time = time.time()
+            self.saves += 1
+            return True
+        except Exception as e:
+            self.errors += 1
+            print(f"Checkpoint error: {e}")
+            return False
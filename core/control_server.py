@@ -0,0 +1,402 @@
+# Control server - JSON status, commands and push subscriptions over a Unix socket
+import collections
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+from runtime_config import get_config
+from .alert_manager import AlertManager
+
+# Event types a client can subscribe to
+EVENTS = ('measurement', 'alert', 'state')
+
+# Stop moving queued events into a client's send buffer beyond this size (bytes)
+SEND_BUFFER_LIMIT = 65536
+
+def _encode(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode()
+
+class ControlClient:
+    """One connection - raw buffers plus a bounded queue of pushed events"""
+
+    def __init__(self, sock, queue_size):
+        self.sock = sock
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.events = collections.deque()
+        self.queue_size = queue_size
+        self.subscriptions = set()
+        self.dropped = 0
+
+class ControlServer:
+    """Newline-delimited JSON API for local tools
+
+    Requests:  {"cmd": "status"} | {"cmd": "start"} | {"cmd": "stop"} |
+               {"cmd": "mode", "mode": "auto"|"manual"} |
+               {"cmd": "subscribe", "events": ["measurement", "alert", "state"]} |
+               {"cmd": "unsubscribe"}
+    Replies:   {"ok": true, ...} or {"ok": false, "error": "..."}
+    Pushes:    {"event": "measurement"|"alert"|"state", ...}
+
+    All socket I/O happens on one selector thread. publish() only appends to
+    each subscriber's bounded queue, so the scan loop never waits on a client;
+    a subscriber that reads too slowly loses its oldest events.
+    """
+
+    def __init__(self, system, config=None):
+        self.system = system
+        self.config = config or get_config()
+        self.path = None
+        self.sock = None
+        self.selector = None
+        self.thread = None
+        self.running = False
+        self.clients = {}
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.wake_pending = False
+        self.wake_reader = None
+        self.wake_writer = None
+        self.last_state = None
+        self.published = 0
+        self.dropped = 0
+        self.commands = 0
+
+    def start(self):
+        control = self.config.control
+        self.path = control.socket
+        try:
+            if os.path.exists(self.path):
+                # Left behind by a run that did not shut down cleanly
+                os.remove(self.path)
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.bind(self.path)
+            os.chmod(self.path, control.socket_mode)
+            self.sock.listen(control.max_clients)
+            self.sock.setblocking(False)
+        except OSError as e:
+            print(f"Control server not started: {e}")
+            if self.sock:
+                self.sock.close()
+                self.sock = None
+            return False
+
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.wake_writer.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        self.selector.register(self.wake_reader, selectors.EVENT_READ)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="control-server", daemon=True)
+        self.thread.start()
+        print(f"Control server listening on {self.path}")
+        return True
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._wake()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+        for client in list(self.clients.values()):
+            self._close_client(client)
+        self.selector.close()
+        self.sock.close()
+        self.wake_reader.close()
+        self.wake_writer.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    # Publishing - called from the scan loop and pipeline threads
+
+    def publish(self, event, payload):
+        if not self.subscribers:
+            return
+
+        message = dict(payload, event=event)
+        with self.lock:
+            for client in self.subscribers:
+                if event in client.subscriptions:
+                    if len(client.events) >= client.queue_size:
+                        client.events.popleft()
+                        client.dropped += 1
+                        self.dropped += 1
+                    client.events.append(message)
+            self.published += 1
+            wake = not self.wake_pending
+            self.wake_pending = True
+        if wake:
+            self._wake()
+
+    def reading_sink(self, reading):
+        """Pipeline sink - every classified reading, alerts as a separate event"""
+        payload = {
+            'time': round(reading.timestamp, 3),
+            'distance': round(reading.distance, 1),
+            'angle': reading.angle,
+            'direction': reading.direction_name,
+            'alert': reading.alert_status,
+            'mode': reading.mode
+        }
+        self.publish('measurement', payload)
+        if reading.decision in (AlertManager.EMIT, AlertManager.ESCALATE):
+            self.publish('alert', dict(payload, decision=reading.decision))
+        return reading
+
+    def trend_alert(self, distance, angle, direction_name, rate, time_to_contact):
+        """Scanner callback for manual-mode approach alerts"""
+        self.publish('alert', {
+            'time': round(time.time(), 3),
+            'distance': round(distance, 1),
+            'angle': angle,
+            'direction': direction_name,
+            'alert': 1,
+            'mode': 'MANUAL',
+            'decision': 'APPROACHING',
+            'rate': round(rate, 1),
+            'time_to_contact': round(time_to_contact, 2)
+        })
+
+    def _wake(self):
+        try:
+            self.wake_writer.send(b'\0')
+        except OSError:
+            pass   # Buffer full - the selector is already awake
+
+    # Selector thread
+
+    def _run(self):
+        while self.running:
+            self._update_write_interest()
+            try:
+                ready = self.selector.select(timeout=self.config.control.state_poll)
+            except OSError as e:
+                print(f"Control server error: {e}")
+                break
+
+            for key, mask in ready:
+                if key.fileobj is self.sock:
+                    self._accept()
+                elif key.fileobj is self.wake_reader:
+                    self._drain_wake()
+                else:
+                    client = key.data
+                    if mask & selectors.EVENT_READ:
+                        self._read(client)
+                    if mask & selectors.EVENT_WRITE and client.sock.fileno() >= 0:
+                        self._write(client)
+
+            self._check_state()
+
+    def _accept(self):
+        try:
+            sock, _ = self.sock.accept()
+        except OSError:
+            return
+        control = self.config.control
+        if len(self.clients) >= control.max_clients:
+            sock.close()
+            return
+        sock.setblocking(False)
+        client = ControlClient(sock, control.subscriber_queue)
+        self.clients[sock] = client
+        self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def _drain_wake(self):
+        with self.lock:
+            self.wake_pending = False
+        try:
+            while self.wake_reader.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def _read(self, client):
+        try:
+            data = client.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close_client(client)
+            return
+
+        client.inbuf += data
+        while b'\n' in client.inbuf:
+            line, _, rest = bytes(client.inbuf).partition(b'\n')
+            client.inbuf = bytearray(rest)
+            if line.strip():
+                client.outbuf += _encode(self._handle_line(client, line))
+
+        if len(client.inbuf) > SEND_BUFFER_LIMIT:
+            # No newline in sight - not a client of this protocol
+            self._close_client(client)
+
+    def _write(self, client):
+        with self.lock:
+            while client.events and len(client.outbuf) < SEND_BUFFER_LIMIT:
+                client.outbuf += _encode(client.events.popleft())
+        if not client.outbuf:
+            return
+        try:
+            sent = client.sock.send(client.outbuf)
+            del client.outbuf[:sent]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self._close_client(client)
+
+    def _update_write_interest(self):
+        for client in list(self.clients.values()):
+            events = selectors.EVENT_READ
+            if client.outbuf or client.events:
+                events |= selectors.EVENT_WRITE
+            key = self.selector.get_key(client.sock)
+            if key.events != events:
+                self.selector.modify(client.sock, events, client)
+
+    def _close_client(self, client):
+        self.clients.pop(client.sock, None)
+        with self.lock:
+            if client in self.subscribers:
+                self.subscribers = [other for other in self.subscribers if other is not client]
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def _check_state(self):
+        button_handler = self.system.button_handler
+        if button_handler is None:
+            return
+        state = button_handler.get_system_state()
+        if state != self.last_state:
+            if self.last_state is not None:
+                self.publish('state', state)
+            self.last_state = state
+
+    # Commands
+
+    def _handle_line(self, client, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return {'ok': False, 'error': f"bad request: {e}"}
+
+        self.commands += 1
+        command = request.get('cmd')
+        try:
+            if command == 'status':
+                return dict(self.get_status(), ok=True)
+            if command == 'start':
+                return self._set_running(True)
+            if command == 'stop':
+                return self._set_running(False)
+            if command == 'mode':
+                return self._set_mode(request.get('mode'))
+            if command == 'subscribe':
+                return self._subscribe(client, request.get('events', EVENTS))
+            if command == 'unsubscribe':
+                return self._subscribe(client, ())
+        except Exception as e:
+            print(f"Control command error: {e}")
+            return {'ok': False, 'error': str(e)}
+        return {'ok': False, 'error': f"unknown command: {command}"}
+
+    def _set_running(self, running):
+        system = self.system
+        button_handler = system.button_handler
+        if button_handler.get_system_state()['running'] != running:
+            button_handler.set_system_running(running)
+            if running:
+                print("\n[CONTROL] System STARTED!")
+                system.buzzer_led.system_start_signal()
+            else:
+                print("\n[CONTROL] System PAUSED!")
+                system.buzzer_led.system_pause_signal()
+            system.db.log_system_event("REMOTE_START" if running else "REMOTE_STOP",
+                                       "Changed over the control socket", "MANUAL")
+        return dict(button_handler.get_system_state(), ok=True)
+
+    def _set_mode(self, mode):
+        if mode not in ('auto', 'manual'):
+            return {'ok': False, 'error': "mode must be 'auto' or 'manual'"}
+
+        system = self.system
+        button_handler = system.button_handler
+        auto_mode = mode == 'auto'
+        if button_handler.get_system_state()['auto_mode'] != auto_mode:
+            button_handler.set_auto_mode(auto_mode)
+            mode_text = "AUTO SCAN" if auto_mode else "MANUAL CONTROL"
+            print(f"\n[CONTROL] Mode changed to: {mode_text}")
+            system.buzzer_led.mode_change_signal()
+            system.db.log_system_event("REMOTE_MODE_CHANGE", f"Mode changed to {mode_text}", "MANUAL")
+        return dict(button_handler.get_system_state(), ok=True)
+
+    def _subscribe(self, client, events):
+        if isinstance(events, str):
+            events = [events]
+        unknown = [event for event in events if event not in EVENTS]
+        if unknown:
+            return {'ok': False, 'error': f"unknown events: {', '.join(map(str, unknown))}"}
+
+        with self.lock:
+            client.subscriptions = set(events)
+            others = [other for other in self.subscribers if other is not client]
+            self.subscribers = others + [client] if client.subscriptions else others
+        return {'ok': True, 'subscribed': sorted(client.subscriptions)}
+
+    def get_status(self):
+        """Compact snapshot - state flags, latest readings and counters"""
+        system = self.system
+        scanner = system.scanner
+        status = {
+            'time': round(time.time(), 3),
+            'state': system.button_handler.get_system_state(),
+            'angle': scanner.current_angle,
+            'measurements': scanner.get_measurement_count(),
+            'scan_cycles': scanner.scan_cycle,
+            'recent': [
+                [round(timestamp, 3), round(distance, 1), angle, code, alert, mode]
+                for timestamp, distance, angle, code, alert, mode
+                in system.db.recent.snapshot(self.config.control.recent_readings)
+            ],
+            'alerts': system.alert_manager.get_statistics(),
+            'background': system.pipeline.background.get_statistics(),
+            'power': system.governor.get_statistics(),
+            'timing': scanner.scheduler.get_statistics(),
+            'control': self.get_statistics()
+        }
+        if system.health:
+            status['health'] = system.health.get_statistics()
+        if system.snapshots:
+            status['snapshot'] = system.snapshots.get_statistics()
+        if system.db.quantiles:
+            status['quantiles'] = system.db.get_distance_quantiles()
+        if system.pipeline.threaded:
+            status['pipeline'] = system.pipeline.get_statistics()
+        if system.acquisition:
+            status['acquisition'] = system.acquisition.get_statistics()
+        return status
+
+    def get_statistics(self):
+        return {
+            'clients': len(self.clients),
+            'subscribers': len(self.subscribers),
+            'published': self.published,
+            'dropped': self.dropped,
+            'commands': self.commands
+        }
@@ -1,12 +1,31 @@
 # Direction detection system
-from config import DIRECTION
+from runtime_config import get_config
+
+def forward_angle(config=None):
+    """Servo angle that points straight ahead - the middle of the FRONT zone"""
+    config = config or get_config()
+    front = config.direction.zones.get('FRONT')
+    if front is None:
+        return config.servo.center_angle
+    return (front['min'] + front['max']) // 2
 
 class DirectionDetector:
-    def __init__(self):
-        self.zones = DIRECTION['ZONES']
-        self.beep_patterns = DIRECTION['BEEP_PATTERNS']
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        
+    @property
+    def zones(self):
+        return self.config.direction.zones
+        
+    @property
+    def beep_patterns(self):
+        return self.config.direction.beep_patterns
         
     def get_direction_info(self, angle):
+        # Precomputed lookup for whole angles
+        if isinstance(angle, int) and 0 <= angle <= 180:
+            return self.config.direction.zone_table[angle]
+        
         for zone_name, zone_info in self.zones.items():
             if zone_info['min'] <= angle <= zone_info['max']:
                 return zone_info['name'], zone_info['code']
@@ -15,7 +34,7 @@ class DirectionDetector:
         return 'FRONT', 3
         
     def get_beep_pattern(self, direction_code):
-        return self.beep_patterns.get(direction_code, [(0.15, 0.05)])
+        return self.beep_patterns.get(direction_code, self.config.direction.default_pattern)
         
     def is_danger_zone(self, direction_name):
         # FAR_LEFT and FAR_RIGHT can be considered more dangerous
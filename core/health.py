@@ -0,0 +1,221 @@
+# Device health - circuit breakers that fail fast instead of waiting on broken hardware
+import collections
+import threading
+import time
+from runtime_config import get_config
+
+class CircuitBreaker:
+    """Tracks one device and stops calling it while it keeps failing
+
+    closed:    calls go through, failures are counted
+    open:      calls are refused at once until the next probe is due
+    half_open: one probe call is let through - success closes the breaker,
+               failure opens it again with a doubled probe interval
+
+    The breaker trips after FAILURE_THRESHOLD consecutive failures or when
+    ERROR_RATE of the last WINDOW calls failed.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    STATES = (CLOSED, OPEN, HALF_OPEN)
+
+    def __init__(self, name, config=None, on_change=None):
+        self.name = name
+        self.config = config or get_config()
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.state_since = time.monotonic()
+        self.state_time = {state: 0.0 for state in self.STATES}
+        self.results = collections.deque(maxlen=self.config.health.window)
+        self.consecutive_failures = 0
+        self.probe_interval = self.config.health.probe_interval
+        self.next_probe = 0
+        self.probe_started = 0
+        self.trips = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def allow(self):
+        """Whether the device should be used now - False means fail fast"""
+        health = self.config.health
+        if not health.enabled:
+            return True
+
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now >= self.next_probe:
+                self.probe_started = now
+                change = self._set_state(self.HALF_OPEN)
+            elif self.state == self.HALF_OPEN and now - self.probe_started >= self.probe_interval:
+                # The probe never reported back - let another caller try
+                self.probe_started = now
+                change = None
+            else:
+                self.rejected += 1
+                return False
+        self._notify(change)
+        return True
+
+    def record_success(self):
+        with self.lock:
+            self.results.append(0)
+            self.consecutive_failures = 0
+            change = None
+            if self.state != self.CLOSED:
+                self.probe_interval = self.config.health.probe_interval
+                change = self._set_state(self.CLOSED)
+        self._notify(change)
+
+    def record_failure(self, reason):
+        health = self.config.health
+        with self.lock:
+            if self.results.maxlen != health.window:
+                self.results = collections.deque(self.results, maxlen=health.window)
+            self.results.append(1)
+            self.consecutive_failures += 1
+            self.failures += 1
+            self.last_error = reason
+            change = None
+
+            if self.state == self.HALF_OPEN:
+                # Failed probe - wait longer before the next one
+                self.probe_interval = min(self.probe_interval * health.probe_backoff,
+                                          health.max_probe_interval)
+                change = self._open()
+            elif self.state == self.CLOSED and health.enabled and self._should_trip():
+                self.probe_interval = health.probe_interval
+                self.trips += 1
+                change = self._open()
+        self._notify(change)
+
+    def _should_trip(self):
+        health = self.config.health
+        if self.consecutive_failures >= health.failure_threshold:
+            return True
+        return (len(self.results) >= health.window and
+                sum(self.results) / len(self.results) >= health.error_rate)
+
+    def _open(self):
+        self.next_probe = time.monotonic() + self.probe_interval
+        return self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+        # Caller holds the lock
+        now = time.monotonic()
+        previous = self.state
+        self.state_time[previous] += now - self.state_since
+        self.state = state
+        self.state_since = now
+        return (previous, state)
+
+    def _notify(self, change):
+        if change and self.on_change:
+            self.on_change(self, *change)
+
+    def get_statistics(self):
+        with self.lock:
+            now = time.monotonic()
+            state_time = dict(self.state_time)
+            state_time[self.state] += now - self.state_since
+            results = list(self.results)
+            return {
+                'state': self.state,
+                'trips': self.trips,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'consecutive_failures': self.consecutive_failures,
+                'error_rate': sum(results) / len(results) if results else 0,
+                'last_error': self.last_error,
+                'next_probe': max(0.0, self.next_probe - now) if self.state == self.OPEN else 0,
+                'state_time': state_time
+            }
+
+class HealthMonitor:
+    """Owns a breaker per device and tells the user when one trips or recovers
+
+    Breakers change state inside the failing call, on the scan loop. After
+    start() the callbacks (warning melody, log row) run on a worker thread so
+    that call returns at once; without it they run inline.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.breakers = {}
+        self.callbacks = {
+            'degraded': None,
+            'recovered': None
+        }
+        self.notices = collections.deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closing = False
+
+    def set_callback(self, event_type, callback):
+        if event_type in self.callbacks:
+            self.callbacks[event_type] = callback
+
+    def start(self):
+        self.closing = False
+        self.thread = threading.Thread(target=self._run, name="health-notices", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Deliver what is queued, then stop the worker"""
+        if self.thread is None:
+            return
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.notices and not self.closing:
+                    self.condition.wait()
+                if not self.notices:
+                    return
+                event_type, args = self.notices.popleft()
+            self._deliver(event_type, args)
+
+    def _dispatch(self, event_type, *args):
+        if not self.callbacks[event_type]:
+            return
+        if self.thread is None:
+            self._deliver(event_type, args)
+            return
+        with self.condition:
+            self.notices.append((event_type, args))
+            self.condition.notify_all()
+
+    def _deliver(self, event_type, args):
+        try:
+            self.callbacks[event_type](*args)
+        except Exception as e:
+            print(f"Health notice '{event_type}' error: {e}")
+
+    def breaker(self, name):
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(name, self.config, self._state_changed)
+        return self.breakers[name]
+
+    def _state_changed(self, breaker, previous, state):
+        if state == CircuitBreaker.OPEN and previous == CircuitBreaker.CLOSED:
+            print(f"\n[HEALTH] {breaker.name} failing ({breaker.last_error}) - "
+                  f"fast-fail, next check in {breaker.probe_interval:.0f}s")
+            self._dispatch('degraded', breaker.name, breaker.last_error)
+        elif state == CircuitBreaker.CLOSED:
+            print(f"\n[HEALTH] {breaker.name} recovered")
+            self._dispatch('recovered', breaker.name)
+
+    def is_degraded(self):
+        return any(breaker.state != CircuitBreaker.CLOSED for breaker in self.breakers.values())
+
+    def get_statistics(self):
+        return {name: breaker.get_statistics() for name, breaker in self.breakers.items()}
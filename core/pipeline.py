@@ -0,0 +1,280 @@
+# Measurement pipeline - filter, classify, alert and sinks joined by bounded queues
+import collections
+import threading
+import time
+from runtime_config import get_config
+from .alert_manager import AlertManager
+from .background import BackgroundModel
+
+# Backpressure policies
+BLOCK = 'block'              # Producer waits for room (up to BLOCK_TIMEOUT)
+DROP_OLDEST = 'drop_oldest'  # Oldest queued item is discarded to make room
+POLICIES = (BLOCK, DROP_OLDEST)
+
+# Decisions that play the alert and are stored
+ALERTS = (AlertManager.EMIT, AlertManager.ESCALATE, AlertManager.TREND)
+
+class Reading:
+    """One measurement as it travels through the stages"""
+    __slots__ = ('sequence', 'timestamp', 'distance', 'angle', 'mode',
+                 'direction_name', 'direction_code', 'alert_status', 'decision')
+
+    def __init__(self, sequence, distance, angle, mode, timestamp=None):
+        self.sequence = sequence
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.distance = distance
+        self.angle = angle
+        self.mode = mode
+        self.direction_name = None
+        self.direction_code = None
+        self.alert_status = 0
+        self.decision = None
+
+class Stage:
+    """A handler with its own bounded input queue and worker thread
+
+    handler(reading) returns the reading to pass on, or None to stop it here.
+    Without start() the stage runs inline in the caller's thread.
+    """
+
+    def __init__(self, name, handler, capacity=64, policy=BLOCK, block_timeout=0.5):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy '{policy}' for stage '{name}'")
+        self.name = name
+        self.handler = handler
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.next_stages = []
+        self.queue = collections.deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closing = False
+        self.started_at = time.time()
+        self.received = 0
+        self.processed = 0
+        self.passed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.blocked_time = 0.0
+        self.busy_time = 0.0
+
+    def start(self):
+        self.closing = False
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._run, name=f"pipeline-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        """Finish what is queued, then stop the worker"""
+        if self.thread is None:
+            return
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def put(self, reading):
+        if self.thread is None:
+            self.received += 1
+            self._handle(reading)
+            return
+
+        with self.condition:
+            self.received += 1
+            if len(self.queue) >= self.capacity and self.policy == BLOCK:
+                start = time.time()
+                deadline = start + self.block_timeout
+                while len(self.queue) >= self.capacity and not self.closing:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                self.blocked_time += time.time() - start
+
+            if len(self.queue) >= self.capacity:
+                # drop_oldest, or a blocked producer that ran out of patience
+                self.queue.popleft()
+                self.dropped += 1
+
+            self.queue.append(reading)
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.closing:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                reading = self.queue.popleft()
+                self.condition.notify_all()
+            self._handle(reading)
+
+    def _handle(self, reading):
+        start = time.time()
+        try:
+            result = self.handler(reading)
+        except Exception as e:
+            self.errors += 1
+            print(f"Pipeline stage '{self.name}' error: {e}")
+            result = None
+        self.busy_time += time.time() - start
+        self.processed += 1
+
+        if result is not None:
+            self.passed += 1
+            for stage in self.next_stages:
+                stage.put(result)
+
+    def get_statistics(self):
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        return {
+            'policy': self.policy,
+            'capacity': self.capacity,
+            'depth': len(self.queue),
+            'max_depth': self.max_depth,
+            'received': self.received,
+            'processed': self.processed,
+            'passed': self.passed,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'throughput': self.processed / elapsed,
+            'blocked_time': self.blocked_time,
+            'busy_time': self.busy_time
+        }
+
+class MeasurementPipeline:
+    """filter -> classify -> alert -> sinks (signal, persistence, any added with add_sink)
+
+    With PIPELINE['ENABLED'] each stage runs on its own thread so a slow sink
+    never holds up the scan loop; otherwise the same stages run inline.
+    """
+
+    def __init__(self, direction_detector, alert_manager, buzzer_led, db_manager, config=None,
+                 background=None):
+        self.config = config or get_config()
+        self.direction = direction_detector
+        self.alert_manager = alert_manager
+        self.background = background or BackgroundModel(self.config)
+        self.buzzer_led = buzzer_led
+        self.db = db_manager
+        self.sequence = 0
+        self.threaded = False
+
+        self.filter = self._make_stage('filter', self._filter)
+        self.classify = self._make_stage('classify', self._classify)
+        self.alert = self._make_stage('alert', self._alert)
+        self.filter.next_stages.append(self.classify)
+        self.classify.next_stages.append(self.alert)
+        self.stages = [self.filter, self.classify, self.alert]
+        self.sinks = []
+        # The buzzer pattern plays on its own sink so it does not hold up the alert decisions
+        self.add_sink('signal', self._signal)
+        self.add_sink('persistence', self._persist)
+
+    def _make_stage(self, name, handler, capacity=None, policy=None):
+        pipeline = self.config.pipeline
+        settings = pipeline.stages.get(name, {})
+        return Stage(name, handler,
+                     capacity or settings.get('CAPACITY', pipeline.default_capacity),
+                     policy or settings.get('POLICY', pipeline.default_policy),
+                     pipeline.block_timeout)
+
+    def add_sink(self, name, handler, capacity=None, policy=None):
+        """Attach handler(reading) after the alert decision"""
+        sink = self._make_stage(name, handler, capacity, policy)
+        self.sinks.append(sink)
+        self.stages.append(sink)
+        self.alert.next_stages.append(sink)
+        if self.threaded:
+            sink.start()
+        return sink
+
+    def start(self):
+        if self.threaded:
+            return
+        self.threaded = True
+        for stage in self.stages:
+            stage.start()
+        print(f"Measurement pipeline started ({len(self.stages)} stages)")
+
+    def stop(self):
+        # Upstream first so everything already submitted reaches the sinks
+        for stage in self.stages:
+            stage.stop()
+        self.threaded = False
+
+    def submit(self, distance, angle, mode, timestamp=None, decision=None):
+        """Queue a reading - a preset decision (TREND) skips the alert manager"""
+        self.sequence += 1
+        reading = Reading(self.sequence, distance, angle, mode, timestamp)
+        reading.decision = decision
+        self.filter.put(reading)
+
+    # Stage handlers
+
+    def _filter(self, reading):
+        limits = self.config.distance
+        if limits.min_valid <= reading.distance <= limits.max_valid:
+            return reading
+        return None
+
+    def _classify(self, reading):
+        reading.direction_name, reading.direction_code = self.direction.get_direction_info(reading.angle)
+        reading.alert_status = 1 if reading.distance < self.config.distance.threshold else 0
+        return reading
+
+    def _alert(self, reading):
+        if reading.decision == AlertManager.TREND:
+            # Decided by the trend tracker - an alert even beyond the threshold
+            reading.alert_status = 1
+            return reading
+
+        if reading.mode == "AUTO" and self.background.is_background(reading.angle, reading.distance,
+                                                                   reading.timestamp):
+            # Wall or furniture the sweep sees every pass - no beep, no row, no pause
+            reading.decision = AlertManager.BACKGROUND
+            return reading
+
+        reading.decision = self.alert_manager.evaluate(reading.distance, reading.direction_name,
+                                                       reading.timestamp)
+
+        # Object detected!
+        if reading.decision == AlertManager.ESCALATE:
+            print(f"OBJECT APPROACHING! {reading.distance:.1f}cm at {reading.angle}° ({reading.direction_name})")
+        elif reading.decision == AlertManager.EMIT:
+            print(f"OBJECT DETECTED! {reading.distance:.1f}cm at {reading.angle}° ({reading.direction_name})")
+        return reading
+
+    def _signal(self, reading):
+        if reading.decision in ALERTS:
+            self.buzzer_led.alert_signal(reading.direction_code)
+
+            # Short wait
+            time.sleep(0.5)
+        return reading
+
+    def _persist(self, reading):
+        db = self.db
+        row = (reading.distance, reading.angle, reading.direction_name, reading.direction_code,
+               reading.alert_status, reading.mode)
+
+        if reading.decision in ALERTS:
+            db.save_measurement(*row)
+            return reading
+
+        # Periodic recording (every 20 measurements) - suppressed repeats included.
+        # AUTO readings are already kept in full by the sweep frames.
+        frames_kept = reading.mode == "AUTO" and db.frames is not None
+        if reading.sequence % 20 == 0 and not frames_kept:
+            db.save_measurement(*row)
+        else:
+            db.record_measurement(*row)
+        return reading
+
+    def get_statistics(self):
+        return {stage.name: stage.get_statistics() for stage in self.stages}
@@ -0,0 +1,153 @@
+# Shared-memory ring buffer between the acquisition and consumer processes
+import struct
+import time
+from multiprocessing import shared_memory
+
+# Header layout (bytes)
+HEAD = 0              # u64 - records published by the producer
+TAIL = 8              # u64 - records taken by the consumer
+OVERWRITTEN = 16      # u64 - unread records the producer had to overwrite
+CAPACITY = 24         # u64 - number of slots
+PRODUCER_RATE = 32    # f64 - producer readings per second
+HEARTBEAT = 40        # f64 - last producer activity (time.time())
+RUNNING = 48          # u8  - consumer -> producer: scanning enabled
+AUTO_MODE = 49        # u8  - consumer -> producer: auto scan vs manual
+STOP = 50             # u8  - consumer -> producer: exit
+ACTIVITY = 51         # u8  - consumer -> producer: activity level index (see acquisition.py)
+HEADER_SIZE = 64
+
+U64 = struct.Struct('<Q')
+F64 = struct.Struct('<d')
+
+# Slot: sequence, timestamp, angle, distance, flags
+SLOT = struct.Struct('<QdffI4x')
+
+class SharedRingBuffer:
+    """Lock-free single-producer / single-consumer measurement ring
+
+    The producer only writes HEAD and the slots, the consumer only writes
+    TAIL. Each slot carries a sequence number written last, so a reader can
+    detect a slot that was overwritten while it was being copied.
+    """
+    FLAG_PASS_COMPLETE = 1   # Reading ends a sweep pass
+    FLAG_MANUAL = 2          # Reading taken in manual mode
+
+    def __init__(self, capacity=None, name=None):
+        if name is None:
+            size = HEADER_SIZE + capacity * SLOT.size
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+            self.buf = self.shm.buf
+            self.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+            U64.pack_into(self.buf, CAPACITY, capacity)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+            self.buf = self.shm.buf
+
+        self.name = self.shm.name
+        self.capacity = U64.unpack_from(self.buf, CAPACITY)[0]
+        self._head = U64.unpack_from(self.buf, HEAD)[0]
+        self._tail = U64.unpack_from(self.buf, TAIL)[0]
+        self.dropped = 0
+
+    def _slot_offset(self, index):
+        return HEADER_SIZE + (index % self.capacity) * SLOT.size
+
+    # Producer side
+
+    def publish(self, angle, distance, flags=0, timestamp=None):
+        index = self._head
+        offset = self._slot_offset(index)
+
+        if index - U64.unpack_from(self.buf, TAIL)[0] >= self.capacity:
+            overwritten = U64.unpack_from(self.buf, OVERWRITTEN)[0]
+            U64.pack_into(self.buf, OVERWRITTEN, overwritten + 1)
+
+        # Fill with an invalid sequence, then stamp it and advance the head
+        SLOT.pack_into(self.buf, offset, 0, timestamp or time.time(), angle, distance, flags)
+        U64.pack_into(self.buf, offset, index + 1)
+
+        self._head = index + 1
+        U64.pack_into(self.buf, HEAD, self._head)
+
+    def set_producer_rate(self, rate):
+        F64.pack_into(self.buf, PRODUCER_RATE, rate)
+        F64.pack_into(self.buf, HEARTBEAT, time.time())
+
+    # Consumer side
+
+    def read(self, max_items=None):
+        """Return unread records as (timestamp, angle, distance, flags) tuples"""
+        head = U64.unpack_from(self.buf, HEAD)[0]
+        tail = self._tail
+
+        if head - tail > self.capacity:
+            # Producer lapped us - the oldest records are gone
+            self.dropped += head - tail - self.capacity
+            tail = head - self.capacity
+
+        if max_items is not None:
+            head = min(head, tail + max_items)
+
+        records = []
+        for index in range(tail, head):
+            offset = self._slot_offset(index)
+            sequence, timestamp, angle, distance, flags = SLOT.unpack_from(self.buf, offset)
+            if sequence != index + 1 or U64.unpack_from(self.buf, offset)[0] != sequence:
+                self.dropped += 1
+                continue
+            records.append((timestamp, angle, distance, flags))
+
+        self._tail = head
+        U64.pack_into(self.buf, TAIL, head)
+        return records
+
+    def pending(self):
+        return U64.unpack_from(self.buf, HEAD)[0] - self._tail
+
+    # Control flags (consumer -> producer)
+
+    def set_state(self, running, auto_mode):
+        self.buf[RUNNING] = 1 if running else 0
+        self.buf[AUTO_MODE] = 1 if auto_mode else 0
+
+    def request_stop(self):
+        self.buf[STOP] = 1
+
+    def set_activity(self, level):
+        self.buf[ACTIVITY] = level
+
+    @property
+    def running(self):
+        return self.buf[RUNNING] == 1
+
+    @property
+    def auto_mode(self):
+        return self.buf[AUTO_MODE] == 1
+
+    @property
+    def stop_requested(self):
+        return self.buf[STOP] == 1
+
+    @property
+    def activity(self):
+        return self.buf[ACTIVITY]
+
+    def get_statistics(self):
+        return {
+            'published': U64.unpack_from(self.buf, HEAD)[0],
+            'consumed': U64.unpack_from(self.buf, TAIL)[0],
+            'overwritten': U64.unpack_from(self.buf, OVERWRITTEN)[0],
+            'dropped': self.dropped,
+            'producer_rate': F64.unpack_from(self.buf, PRODUCER_RATE)[0],
+            'heartbeat': F64.unpack_from(self.buf, HEARTBEAT)[0],
+            'capacity': self.capacity
+        }
+
+    def close(self):
+        # Release the exported memoryview before closing the mapping
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -1,59 +1,154 @@
 #Main scanning system
+import collections
 import time
-from config import SYSTEM, SERVO
+from runtime_config import get_config
+from .alert_manager import AlertManager
+from .direction import forward_angle
+from .activity_governor import ActivityGovernor
+from .pipeline import MeasurementPipeline
+from .trend import TrendTracker
+from .scheduler import PeriodicScheduler
+from .sweep_patterns import next_position, pattern_statistics
 
 class Scanner:
-    def __init__(self, servo_motor, ultrasonic, buzzer_led, direction_detector, db_manager):
+    def __init__(self, servo_motor, ultrasonic, buzzer_led, direction_detector, db_manager,
+                 alert_manager=None, config=None, governor=None, pipeline=None, health=None):
+        self.config = config or get_config()
         self.servo = servo_motor
         self.ultrasonic = ultrasonic
         self.buzzer_led = buzzer_led
         self.direction = direction_detector
         self.db = db_manager
+        self.alert_manager = alert_manager or AlertManager(self.config)
+        self.governor = governor or ActivityGovernor(self.config)
+        # Runs inline unless started - see MeasurementPipeline
+        self.pipeline = pipeline or MeasurementPipeline(direction_detector, self.alert_manager,
+                                                        buzzer_led, db_manager, self.config)
+        self.health = health
         self.measurement_count = 0
         self.scan_cycle = 0
+        # Sweep position survives mode changes and warm restarts
+        self.current_angle = self.config.servo.min_angle
+        self.sweep_direction = 1  # 1: increase, -1: decrease
+        self.sweep_index = 0      # Position in the sweep pattern cycle
+        self.sweep_wrapped = False
+        self.trend = TrendTracker(self.config)
+        self.scheduler = PeriodicScheduler(self.step_period(), self.config, self.governor.sleep)
+        self.stream_started = None
+        # Detection latency is taken from the alert stage's decisions, not from a guess here
+        self.stream_alerting = set()
+        self.add_sink('stream_latency', self._stream_latency_sink)
+        self.callbacks = {
+            'trend_alert': None
+        }
         
     def auto_scan_mode(self, button_handler):
-        current_angle = SERVO['MIN_ANGLE']
-        direction = 1  # 1: increase, -1: decrease
+        governor = self.governor
+        parked = False
         
         print("Starting automatic scanning mode...")
         self.db.log_system_event("AUTO_SCAN_START", "Automatic scanning initiated", "AUTO")
+        self._report_sweep_pattern()
+        
+        scheduler = self.scheduler
+        scheduler.config = self.config
+        scheduler.reset()
         
         while button_handler.system_running and button_handler.auto_mode:
-            # Update servo angle
-            current_angle += direction * SERVO['STEP']
+            # Settings are read once per step so a reload applies on the next step
+            cfg = self.config
+            scheduler.config = cfg
+            
+            # Steps start on absolute deadlines; each step sizes the gap to the next
+            # deadline from its own work, the governor stretches it
+            scheduler.wait_next()
+            
+            if governor.is_parked():
+                scheduler.set_period(governor.parked_interval())
+                # Long stretch of open space - hold the servo and ping forward slowly
+                if not parked:
+                    print("Open space - servo parked, low rate scanning")
+                    # Straight ahead, not the servo's mechanical center
+                    self.servo.set_angle(forward_angle(cfg))
+                    parked = True
+                self._parked_step()
+                continue
             
-            # Change direction at boundaries
-            if current_angle >= SERVO['MAX_ANGLE']:
-                current_angle = SERVO['MAX_ANGLE']
-                direction = -1
+            if parked:
+                # Something came close - resume the sweep from where the servo is
+                parked = False
+                self.current_angle = self.servo.get_current_angle()
+            
+            # Update servo angle - the pattern decides the order, a full pass counts as a cycle
+            (self.current_angle, self.sweep_direction,
+             self.sweep_index, self.sweep_wrapped) = self._next_sweep_position(cfg)
+            if self.sweep_wrapped:
                 self.scan_cycle += 1
-            elif current_angle <= SERVO['MIN_ANGLE']:
-                current_angle = SERVO['MIN_ANGLE']
-                direction = 1
             
-            # Set servo position
-            self.servo.set_angle(current_angle)
-            time.sleep(0.1)  
+            # Set servo position and let it settle
+            ping_offset = self.servo.move_time(self.current_angle) + cfg.scheduler.settle_time
+            scheduler.set_period(self.step_period(self.current_angle) + governor.extra_step_delay())
+            self.servo.set_angle(self.current_angle)
+            scheduler.wait_offset(ping_offset)
             
             # Distance measurement
             distance = self.ultrasonic.measure_distance()
+            governor.observe(distance)
+            self.record_frame_reading(self.current_angle, distance)
             
             if distance > 0:
-                self._process_measurement(distance, current_angle, "AUTO")
+                self._process_measurement(distance, self.current_angle, "AUTO")
                 
                 # Show dashboard if full scan cycle completed
-                if self._is_scan_complete(current_angle, direction):
+                if self._is_scan_complete(self.current_angle, self.sweep_direction):
                     self._show_scan_results()
             
-            # System status LED
-            self.buzzer_led.led_on('STATUS_LED')
-            time.sleep(SYSTEM['MEASUREMENT_INTERVAL'])
-            self.buzzer_led.led_off('STATUS_LED')
+            # System status LED (only now and then when idle), lit for the measurement interval
+            if governor.status_blink_due():
+                self.buzzer_led.led_on('STATUS_LED')
+                scheduler.wait_offset(ping_offset + cfg.system.measurement_interval)
+                self.buzzer_led.led_off('STATUS_LED')
+        
+        self.db.flush_sweep_frame()
+    
+    def step_period(self, angle=None):
+        """Nominal sweep step: servo move to `angle`, settle, measurement interval"""
+        cfg = self.config
+        move = cfg.servo.speed_delay
+        if angle is not None and self.servo:
+            move = self.servo.move_time(angle)
+        return move + cfg.scheduler.settle_time + cfg.system.measurement_interval
+    
+    def _next_sweep_position(self, cfg):
+        return next_position(cfg, self.current_angle, self.sweep_direction, self.sweep_index,
+                             self.governor.step_multiplier())
+    
+    def _report_sweep_pattern(self):
+        stats = pattern_statistics(self.config)
+        print(f"Sweep pattern: {stats['pattern']} | {stats['readings']} readings per cycle "
+              f"({stats['cycle_time']:.1f}s) | coarse view {stats['coarse_view']:.1f}s, "
+              f"full view {stats['full_coverage']:.1f}s | worst revisit {stats['worst_revisit']:.1f}s")
+    
+    def _parked_step(self):
+        governor = self.governor
+        distance = self.ultrasonic.measure_distance()
+        governor.observe(distance)
+        angle = self.servo.get_current_angle()
+        self.record_frame_reading(angle, distance)
+        
+        if distance > 0:
+            self._process_measurement(distance, angle, "AUTO")
+        
+        if governor.status_blink_due():
+            self.buzzer_led.led_blink('STATUS_LED', 1, 0.05, 0)
     
     def manual_mode(self, button_handler):
-        """Manual mode - wait at center position"""
-        self.servo.move_to_center()
+        """Manual mode - hold the servo straight ahead"""
+        self.servo.set_angle(forward_angle(self.config))
+        
+        if self.config.manual.streaming:
+            self._manual_stream(button_handler)
+            return
         
         while button_handler.system_running and button_handler.manual_mode:
             distance = self.ultrasonic.measure_distance()
@@ -69,31 +164,172 @@ class Scanner:
             
             time.sleep(0.5)
     
-    def _process_measurement(self, distance, angle, mode):
-        self.measurement_count += 1
-        direction_name, direction_code = self.direction.get_direction_info(angle)
+    def _manual_stream(self, button_handler):
+        """Continuous ranging straight ahead, one ping per sensor cycle"""
+        angle = self.servo.get_current_angle()
+        scheduler = self.scheduler
+        scheduler.config = self.config
+        scheduler.reset()
+        
+        while button_handler.system_running and button_handler.manual_mode:
+            scheduler.set_period(self.config.manual.cycle_time)
+            scheduler.wait_next()
+            ping_time = time.time()
+            distance = self.ultrasonic.measure_distance()
+            self.stream_reading(distance, angle, ping_time)
+        
+        self.finish_stream()
+    
+    def _start_stream(self, now):
+        self.trend.reset()
+        self.stream_started = now
+        self.stream_cycles = 0
+        self.stream_window_start = now
+        self.stream_window_cycles = 0
+        self.stream_rate = 0.0
+        # Starts of the runs of raw readings inside the threshold
+        self.stream_crossings = collections.deque(maxlen=16)
+        self.stream_inside = False
+        self.stream_alerting = set()
+        self.stream_latencies = []
+        self.stream_trend_latencies = []
+        self.stream_last_print = 0
+    
+    def stream_reading(self, distance, angle, ping_time):
+        """One manual-mode ping: filter, trend, threshold and trend alerts, throttled output"""
+        if self.stream_started is None:
+            self._start_stream(ping_time)
         
-        alert_status = 0
+        cfg = self.config
+        manual = cfg.manual
+        self.trend.config = cfg
+        self.stream_cycles += 1
+        self.stream_window_cycles += 1
         
-        if self.ultrasonic.is_object_detected(distance):
-            # Object detected!
-            self.buzzer_led.alert_signal(direction_code)
-            alert_status = 1
+        filtered = self.trend.update(distance, ping_time)
+        if distance > 0 and filtered is not None:
+            direction_name = self.direction.get_direction_info(angle)[0]
             
-            print(f"OBJECT DETECTED! {distance:.1f}cm at {angle}° ({direction_name})")
+            # Detection latency: first raw reading inside the threshold until the alert
+            inside = distance < cfg.distance.threshold
+            if inside and not self.stream_inside:
+                self.stream_crossings.append(ping_time)
+            self.stream_inside = inside
             
-            # Save to database
-            self.db.save_measurement(distance, angle, direction_name, direction_code, alert_status, mode)
+            # Filtered reading through the usual alert and storage stages
+            self._process_measurement(filtered, angle, "MANUAL", ping_time)
             
-            # Short wait
-            time.sleep(0.5)
-        else:
-            # Periodic recording (every 20 measurements)
-            if self.measurement_count % 20 == 0:
-                self.db.save_measurement(distance, angle, direction_name, direction_code, alert_status, mode)
+            # Closing in fast while still beyond the threshold
+            if (not self.alert_manager.is_zone_active(direction_name) and
+                    self.trend.trend_alert_due(ping_time)):
+                # Trend alerts are timed from the start of the approach, kept apart
+                # from the threshold crossings above
+                if self.trend.approach_started is not None:
+                    self._record_latency(self.stream_trend_latencies,
+                                         ping_time - self.trend.approach_started)
+                print(f"OBJECT APPROACHING FAST! {filtered:.1f}cm, closing at "
+                      f"{self.trend.rate:.0f}cm/s, contact in {self.trend.time_to_contact:.1f}s")
+                # Signal and storage go through the pipeline like any other alert
+                self.pipeline.submit(filtered, angle, "MANUAL", ping_time, AlertManager.TREND)
+                if self.callbacks['trend_alert']:
+                    self.callbacks['trend_alert'](filtered, angle, direction_name,
+                                                  self.trend.rate, self.trend.time_to_contact)
+        
+        now = time.time()
+        if filtered is not None and now - self.stream_last_print >= manual.print_interval:
+            self.stream_last_print = now
+            if self.trend.rate >= manual.approach_rate and self.trend.time_to_contact is not None:
+                print(f"Manual: {filtered:.1f}cm | approaching {self.trend.rate:.0f}cm/s, "
+                      f"contact in {self.trend.time_to_contact:.1f}s")
+            else:
+                label = "Detection" if filtered < cfg.distance.threshold else "Reading"
+                print(f"Manual {label}: {filtered:.1f}cm")
+        
+        if now - self.stream_window_start >= manual.stats_interval:
+            self.stream_rate = self.stream_window_cycles / (now - self.stream_window_start)
+            self.stream_window_start = now
+            self.stream_window_cycles = 0
+            self._report_stream()
+    
+    def _stream_latency_sink(self, reading):
+        """Time the first alert of each approach against the run of raw readings it ends"""
+        if self.stream_started is None or reading.mode != "MANUAL":
+            return reading
+        
+        zone = reading.direction_name
+        if reading.decision == AlertManager.CLEAR:
+            self.stream_alerting.discard(zone)
+        elif reading.decision in (AlertManager.EMIT, AlertManager.ESCALATE, AlertManager.SUPPRESS):
+            if zone not in self.stream_alerting:
+                self.stream_alerting.add(zone)
+                crossings = [start for start in list(self.stream_crossings) if start <= reading.timestamp]
+                # A zone that turns active under the cooldown sounds nothing, so nothing to time
+                if crossings and reading.decision != AlertManager.SUPPRESS:
+                    # Filter delay in whole cycles - alerting starts with this ping
+                    self._record_latency(self.stream_latencies, reading.timestamp - crossings[-1])
+        return reading
+    
+    def _record_latency(self, latencies, latency):
+        latencies.append(latency)
+        if len(latencies) > 100:
+            del latencies[0]
+    
+    def get_stream_statistics(self):
+        if self.stream_started is None:
+            return {}
+        
+        latencies = self.stream_latencies
+        trend_latencies = self.stream_trend_latencies
+        return {
+            'rate': self.stream_rate,
+            'target_rate': 1 / self.config.manual.cycle_time,
+            'cycles': self.stream_cycles,
+            'latency_avg': sum(latencies) / len(latencies) if latencies else 0,
+            'latency_max': max(latencies) if latencies else 0,
+            'trend_alerts': self.trend.trend_alerts,
+            'trend_latency_avg': sum(trend_latencies) / len(trend_latencies) if trend_latencies else 0,
+            'trend_latency_max': max(trend_latencies) if trend_latencies else 0
+        }
+    
+    def _report_stream(self):
+        stats = self.get_stream_statistics()
+        print(f"Manual stream: {stats['rate']:.1f} Hz (target {stats['target_rate']:.1f}) | "
+              f"Detection latency: avg {stats['latency_avg'] * 1000:.0f}ms, "
+              f"max {stats['latency_max'] * 1000:.0f}ms | Trend alerts: {stats['trend_alerts']} "
+              f"(avg {stats['trend_latency_avg'] * 1000:.0f}ms after the approach began)")
+    
+    def finish_stream(self):
+        if self.stream_started is None:
+            return
+        
+        elapsed = time.time() - self.stream_started
+        if elapsed > 0:
+            self.stream_rate = self.stream_cycles / elapsed
+        self._report_stream()
+        self.stream_started = None
+    
+    def record_frame_reading(self, angle, distance, timestamp=None):
+        """Every AUTO reading goes into the sweep frame, no-echo included"""
+        alert_status = 0 < distance < self.config.distance.threshold
+        self.db.record_sweep_reading(angle, distance, alert_status, "AUTO", timestamp)
+    
+    def _process_measurement(self, distance, angle, mode, timestamp=None):
+        self.measurement_count += 1
+        # Classification, alert decision and storage happen in the pipeline stages
+        self.pipeline.submit(distance, angle, mode, timestamp)
+    
+    def set_callback(self, event_type, callback):
+        if event_type in self.callbacks:
+            self.callbacks[event_type] = callback
+    
+    def add_sink(self, name, handler, capacity=None, policy=None):
+        """Receive every classified reading, e.g. add_sink('telemetry', send)"""
+        return self.pipeline.add_sink(name, handler, capacity, policy)
     
     def _is_scan_complete(self, current_angle, direction):
-        return (current_angle == SERVO['MIN_ANGLE'] and direction == 1 and 
+        if self.config.sweep.pattern != 'linear':
+            return self.sweep_wrapped and self.scan_cycle > 0 and self.measurement_count > 10
+        return (current_angle == self.config.servo.min_angle and direction == 1 and 
                 self.scan_cycle > 0 and self.measurement_count > 10)
     
     def _show_scan_results(self):
@@ -102,18 +338,18 @@ class Scanner:
         self.scan_cycle = 0
     
     def _show_dashboard(self):
-        from config import DISPLAY
+        display = self.config.display
         
-        recent_data = self.db.get_recent_measurements(DISPLAY['RECENT_RECORDS'])
+        recent_data = self.db.get_recent_measurements(display.recent_records)
         stats = self.db.get_statistics()
         
-        print("\n" + DISPLAY['SEPARATOR'] * DISPLAY['DASHBOARD_WIDTH'])
+        print("\n" + display.separator * display.dashboard_width)
         print("OBJECT DETECTION SYSTEM DASHBOARD")
-        print(DISPLAY['SEPARATOR'] * DISPLAY['DASHBOARD_WIDTH'])
+        print(display.separator * display.dashboard_width)
         
         # Recent measurements
         print(f"{'Time':<20} {'Distance':<12} {'Angle':<8} {'Direction':<12} {'Status':<8} {'Mode':<6}")
-        print("-" * DISPLAY['DASHBOARD_WIDTH'])
+        print("-" * display.dashboard_width)
         
         for row in recent_data:
             date_time, distance, angle, direction, alert, mode = row
@@ -122,11 +358,71 @@ class Scanner:
             print(f"{time_str:<20} {distance:<12.2f} {angle:<8}° {direction:<12} {status_icon:<8} {mode:<6}")
         
         # Statistics
-        print("-" * DISPLAY['DASHBOARD_WIDTH'])
+        print("-" * display.dashboard_width)
         print(f"Total: {stats.get('total_records', 0)} | "
               f"Alerts: {stats.get('alert_count', 0)} | "
               f"Avg Distance: {stats.get('avg_distance', 0):.1f}cm")
         
+        quantiles = stats.get('distance_quantiles')
+        if quantiles:
+            print("Distance p5/p50/p95: " + " | ".join(
+                f"{zone} {q['p5']:.0f}/{q['p50']:.0f}/{q['p95']:.0f}cm"
+                for zone, q in quantiles.items()))
+        
+        alert_stats = self.alert_manager.get_statistics()
+        print(f"Alerts Emitted: {alert_stats['emitted']} "
+              f"(Escalated: {alert_stats['escalated']}) | "
+              f"Suppressed Repeats: {alert_stats['suppressed']}")
+        
+        if self.config.background.enabled:
+            background = self.pipeline.background.get_statistics()
+            verdicts = background['verdicts']
+            print(f"Background: {background['suppressed']} close readings suppressed vs "
+                  f"{alert_stats['emitted']} alerts emitted | Flagged: {verdicts['deviation']} deviating, "
+                  f"{verdicts['approach']} approaching, {verdicts['too_close']} too close | "
+                  f"{background['learned_bins']} angles learned")
+        
+        power = self.governor.get_statistics()
+        print(f"Power: {power['level']} | Duty Cycle: {power['duty_cycle'] * 100:.0f}% | "
+              f"Wake-ups: {power['wakeups_per_minute']:.0f}/min | "
+              f"Reaction After Idle: avg {power['wake_latency_avg']:.2f}s, "
+              f"max {power['wake_latency_max']:.2f}s")
+        
+        timing = self.scheduler.get_statistics()
+        print(f"Step Timing: {timing['period'] * 1000:.0f}ms target, "
+              f"{timing['actual_period'] * 1000:.0f}ms actual (±{timing['jitter'] * 1000:.0f}ms) | "
+              f"Late: p95 {timing['lateness_p95'] * 1000:.0f}ms, max {timing['lateness_max'] * 1000:.0f}ms | "
+              f"Missed: {timing['missed']} ({timing['missed_ratio'] * 100:.1f}%), skipped {timing['skipped']}")
+        
+        if self.health and self.health.breakers:
+            health_parts = []
+            for name, breaker in self.health.get_statistics().items():
+                if breaker['state'] == 'closed':
+                    health_parts.append(f"{name} OK")
+                else:
+                    health_parts.append(f"{name} {breaker['state'].upper()} ({breaker['last_error']}, "
+                                        f"retry in {breaker['next_probe']:.0f}s)")
+                if breaker['trips']:
+                    health_parts[-1] += f" trips {breaker['trips']}, down {breaker['state_time']['open']:.0f}s"
+            print("Health: " + " | ".join(health_parts))
+        
+        gpio_writes = self.buzzer_led.gpio.get_write_statistics()
+        if gpio_writes:
+            print("GPIO Writes: " + " | ".join(
+                f"{pin_name} {counts['writes']} (skipped {counts['skipped']})"
+                for pin_name, counts in gpio_writes.items()))
+        
+        if self.pipeline.threaded:
+            print("Pipeline: " + " | ".join(
+                f"{name} {stage['depth']}/{stage['capacity']} "
+                f"{stage['throughput']:.1f}/s drop {stage['dropped']}"
+                for name, stage in self.pipeline.get_statistics().items()))
+        
+        recent_alerts = self.db.get_alert_counts(30)
+        if recent_alerts:
+            print("Alerts (last 30s): " +
+                  " ".join(f"{zone}({count})" for zone, count in recent_alerts.items()))
+        
         danger_zones = stats.get('danger_zones', [])
         if danger_zones:
             print("Danger Zones: ", end="")
@@ -134,11 +430,29 @@ class Scanner:
                 print(f"{zone}({count}) ", end="")
             print()
         
-        print(DISPLAY['SEPARATOR'] * DISPLAY['DASHBOARD_WIDTH'] + "\n")
+        print(display.separator * display.dashboard_width + "\n")
     
     def get_measurement_count(self):
         return self.measurement_count
     
+    def get_state(self):
+        """Sweep position and counters for checkpoints"""
+        return {
+            'angle': self.current_angle,
+            'direction': self.sweep_direction,
+            'sweep_index': self.sweep_index,
+            'measurement_count': self.measurement_count,
+            'scan_cycle': self.scan_cycle
+        }
+    
+    def restore_state(self, state):
+        servo = self.config.servo
+        self.current_angle = max(servo.min_angle, min(servo.max_angle, state['angle']))
+        self.sweep_direction = 1 if state['direction'] >= 0 else -1
+        self.sweep_index = state.get('sweep_index', 0)
+        self.measurement_count = state['measurement_count']
+        self.scan_cycle = state['scan_cycle']
+    
     def reset_counters(self):
         self.measurement_count = 0
         self.scan_cycle = 0
\ No newline at end of file
@@ -0,0 +1,122 @@
+# Periodic scheduler - scan steps on absolute deadlines with overrun accounting
+import math
+import time
+from array import array
+from runtime_config import get_config
+
+class PeriodicScheduler:
+    """Runs steps on a fixed grid of monotonic deadlines
+
+    Chained sleeps drift by whatever each step costs; here a slow step only
+    makes that step late. When a step overruns, 'catch_up' keeps the grid and
+    runs the following steps back to back (at most MAX_CATCH_UP periods behind),
+    'skip' drops the missed slots and continues on the grid from now.
+    """
+    CATCH_UP = 'catch_up'
+    SKIP = 'skip'
+
+    def __init__(self, period, config=None, sleep=None):
+        self.config = config or get_config()
+        self.period = period
+        self.sleep = sleep or time.sleep
+        history = self.config.scheduler.lateness_history
+        self.lateness = array('d', [0.0] * history)
+        self.intervals = array('d', [0.0] * history)   # Step-to-step time minus period
+        self.reset()
+
+    def reset(self):
+        """Start a new run - the next wait_next() returns immediately"""
+        self.deadline = None
+        self.step_start = None
+        self.steps = 0
+        self.missed = 0
+        self.skipped = 0
+        self.lateness_count = 0
+        self.interval_count = 0
+
+    def set_period(self, period):
+        """Takes effect from the next deadline"""
+        self.period = period
+
+    def wait_next(self):
+        """Block until the next step is due - returns how late it starts (seconds)"""
+        now = time.monotonic()
+
+        if self.deadline is None:
+            self.deadline = now
+        else:
+            self.deadline += self.period
+
+        late = now - self.deadline
+        if late > self.config.scheduler.late_tolerance:
+            self.missed += 1
+            behind = math.floor(late / self.period) if self.period > 0 else 0
+            if self.config.scheduler.policy == self.SKIP:
+                dropped = behind
+            else:
+                dropped = max(0, behind - self.config.scheduler.max_catch_up)
+            if dropped:
+                self.deadline += dropped * self.period
+                self.skipped += dropped
+        elif late < 0:
+            self.sleep(-late)
+            now = time.monotonic()
+
+        lateness = max(0.0, now - self.deadline)
+        self._record(self.lateness, self.lateness_count, lateness)
+        self.lateness_count += 1
+
+        if self.step_start is not None:
+            # Deviation from the period in force, so period changes do not count as jitter
+            self._record(self.intervals, self.interval_count, now - self.step_start - self.period)
+            self.interval_count += 1
+        self.step_start = now
+        self.steps += 1
+        return lateness
+
+    def wait_offset(self, offset):
+        """Sleep until `offset` seconds after the current step's deadline
+
+        Never past LATE_TOLERANCE before the next deadline, so the rest of the
+        step still fits and an in-step wait cannot make the next step late.
+        """
+        if self.deadline is None:
+            return
+        offset = min(offset, self.period - self.config.scheduler.late_tolerance)
+        remaining = self.deadline + offset - time.monotonic()
+        if remaining > 0:
+            self.sleep(remaining)
+
+    def _record(self, values, count, value):
+        values[count % len(values)] = value
+
+    @staticmethod
+    def _recent(values, count):
+        return sorted(values[:min(count, len(values))])
+
+    def get_statistics(self):
+        lateness = self._recent(self.lateness, self.lateness_count)
+        intervals = self._recent(self.intervals, self.interval_count)
+
+        mean_deviation = sum(intervals) / len(intervals) if intervals else 0
+        jitter = (math.sqrt(sum((value - mean_deviation) ** 2 for value in intervals) / len(intervals))
+                  if intervals else 0)
+
+        def percentile(fraction):
+            if not lateness:
+                return 0
+            return lateness[min(len(lateness) - 1, int(fraction * len(lateness)))]
+
+        return {
+            'policy': self.config.scheduler.policy,
+            'period': self.period,
+            'steps': self.steps,
+            'missed': self.missed,
+            'missed_ratio': self.missed / self.steps if self.steps else 0,
+            'skipped': self.skipped,
+            'lateness_p50': percentile(0.5),
+            'lateness_p95': percentile(0.95),
+            'lateness_max': lateness[-1] if lateness else 0,
+            'actual_period': self.period + mean_deviation,
+            'jitter': jitter
+        }
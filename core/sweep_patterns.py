@@ -0,0 +1,222 @@
+# Sweep patterns - precomputed servo angle orders and their coverage timing
+import functools
+from array import array
+from runtime_config import get_config
+
+PATTERNS = ('linear', 'interleaved', 'bit_reversed', 'zone_priority')
+
+def angle_grid(min_angle, max_angle, step):
+    """Every angle a sweep can stop at - the far edge is always included"""
+    angles = list(range(min_angle, max_angle + 1, step))
+    if angles[-1] != max_angle:
+        angles.append(max_angle)
+    return angles
+
+def move_time(delta, servo):
+    """Servo move plus settle time for a move of `delta` degrees"""
+    return servo.speed_delay + max(0, abs(delta) - servo.step) * servo.travel_time
+
+def _travel(positions):
+    return sum(abs(b - a) for a, b in zip(positions, positions[1:]))
+
+def _join_mirrored(cycle, n):
+    """Cycle followed by its mirror image when that saves servo travel
+
+    The mirrored copy visits the same angles from the other side, so the
+    repeat starts near where the first copy ended instead of jumping back.
+    """
+    mirrored = [n - 1 - i for i in cycle]
+    plain_cost = abs(cycle[0] - cycle[-1])
+    mirrored_cost = abs(mirrored[0] - cycle[-1]) + abs(cycle[0] - mirrored[-1])
+    if mirrored_cost < 2 * plain_cost:
+        return cycle + mirrored
+    return cycle
+
+def _linear(n):
+    # Forward then back without repeating the end points
+    return list(range(n)) + list(range(n - 2, 0, -1))
+
+def _interleaved(n, coarse_stride):
+    """Every coarse_stride-th angle first, then the gaps at half the spacing..."""
+    order = []
+    seen = set()
+    stride = coarse_stride
+    ascending = True
+    while True:
+        level = [i for i in range(n) if i % stride == 0 and i not in seen]
+        if stride == coarse_stride and n - 1 not in seen and (n - 1) not in level:
+            level.append(n - 1)   # Far edge in the first pass too
+        if not ascending:
+            level.reverse()
+        order.extend(level)
+        seen.update(level)
+        ascending = not ascending
+        if stride == 1:
+            break
+        stride = max(1, stride // 2)
+    return _join_mirrored(order, n)
+
+def _bit_reversed(n):
+    """Van der Corput order - every prefix is spread evenly over the field"""
+    bits = max(1, (n - 1).bit_length())
+    order = []
+    for k in range(1 << bits):
+        index = int(format(k, f'0{bits}b')[::-1], 2)
+        if index < n:
+            order.append(index)
+    return _join_mirrored(order, n)
+
+def _zone_priority(angles, priority, stride):
+    """Back-and-forth passes that read priority angles on every pass
+
+    The rest of the field is read at every stride-th angle, with the offset
+    shifted each pass so all angles are covered after `stride` round trips.
+    """
+    n = len(angles)
+    order = []
+    for phase in range(stride):
+        for forward in (True, False):
+            indices = range(n) if forward else range(n - 1, -1, -1)
+            for i in indices:
+                if angles[i] in priority or i % stride == phase or i in (0, n - 1):
+                    if not order or order[-1] != i:
+                        order.append(i)
+    if len(order) > 1 and order[0] == order[-1]:
+        order.pop()
+    return order
+
+@functools.lru_cache(maxsize=16)
+def build_pattern(name, min_angle, max_angle, step, coarse_step=8, priority=(), stride=2):
+    """One full cycle of servo angles as array('h') - cached, do not modify"""
+    angles = angle_grid(min_angle, max_angle, step)
+    n = len(angles)
+
+    if name == 'linear' or n < 3:
+        order = _linear(n) if n > 1 else [0]
+    elif name == 'interleaved':
+        coarse_stride = max(1, coarse_step // step)
+        # Power of two so each pass halves the spacing exactly
+        coarse_stride = 1 << (coarse_stride.bit_length() - 1)
+        order = _interleaved(n, coarse_stride)
+    elif name == 'bit_reversed':
+        order = _bit_reversed(n)
+    elif name == 'zone_priority':
+        order = _zone_priority(angles, frozenset(priority), max(1, stride))
+    else:
+        raise ValueError(f"Unknown sweep pattern '{name}'")
+
+    return array('h', (angles[i] for i in order))
+
+def priority_angles(config):
+    zones = config.direction.zones
+    priority = set()
+    for zone_name in config.sweep.priority_zones:
+        zone = zones.get(zone_name)
+        if zone:
+            priority.update(range(zone['min'], zone['max'] + 1))
+    return tuple(sorted(priority))
+
+def pattern_for(config, name=None):
+    """The angle cycle for the configured (or named) pattern"""
+    servo = config.servo
+    sweep = config.sweep
+    return build_pattern(name or sweep.pattern, servo.min_angle, servo.max_angle, servo.step,
+                         sweep.coarse_step, priority_angles(config), sweep.priority_stride)
+
+def next_position(config, angle, direction, index, multiplier=1):
+    """Where the sweep goes next - returns (angle, direction, index, wrapped)
+
+    'linear' keeps the original back-and-forth stepping (the governor's
+    multiplier widens the step). Other patterns walk the cached cycle, the
+    multiplier skips entries, and `wrapped` marks the start of a new cycle.
+    """
+    servo = config.servo
+    if config.sweep.pattern == 'linear':
+        angle += direction * servo.step * multiplier
+        wrapped = False
+        if angle >= servo.max_angle:
+            angle = servo.max_angle
+            direction = -1
+            wrapped = True
+        elif angle <= servo.min_angle:
+            angle = servo.min_angle
+            direction = 1
+        return angle, direction, index, wrapped
+
+    angles = pattern_for(config)
+    index += max(1, multiplier)
+    wrapped = index >= len(angles)
+    index %= len(angles)
+    next_angle = angles[index]
+    direction = 1 if next_angle >= angle else -1
+    return next_angle, direction, index, wrapped
+
+def pattern_statistics(config, name=None):
+    """Coverage timing of one pattern over two repeated cycles
+
+    full_coverage: time from the start until every angle was read once
+    worst_revisit: longest gap between readings of the same angle (per angle)
+    """
+    servo = config.servo
+    cycle = pattern_for(config, name)
+    fixed = config.scheduler.settle_time + config.system.measurement_interval
+
+    # Time at which each reading happens, cycle repeated so gaps can wrap around
+    times = []
+    now = 0.0
+    previous = cycle[0]
+    for angle in list(cycle) * 2:
+        now += move_time(angle - previous, servo) + fixed
+        times.append((now, angle))
+        previous = angle
+    cycle_time = times[len(cycle)][0] - times[0][0]
+
+    grid = angle_grid(servo.min_angle, servo.max_angle, servo.step)
+    coarse_reach = config.sweep.coarse_step / 2
+    first_seen = {}
+    last_seen = {}
+    worst = {}
+    coarse_view = None
+    for timestamp, angle in times:
+        first_seen.setdefault(angle, timestamp)
+        if angle in last_seen:
+            worst[angle] = max(worst.get(angle, 0.0), timestamp - last_seen[angle])
+        last_seen[angle] = timestamp
+        if coarse_view is None and all(
+                any(abs(angle - seen) <= coarse_reach for seen in first_seen) for angle in grid):
+            coarse_view = timestamp
+
+    revisit_by_angle = {angle: worst.get(angle, cycle_time) for angle in grid}
+    priority = set(priority_angles(config))
+    priority_revisits = [revisit for angle, revisit in revisit_by_angle.items() if angle in priority]
+    return {
+        'pattern': name or config.sweep.pattern,
+        'readings': len(cycle),
+        'cycle_time': cycle_time,
+        'travel': _travel(list(cycle)),
+        'coarse_view': coarse_view,
+        'full_coverage': max(first_seen.get(angle, float('inf')) for angle in grid),
+        'worst_revisit': max(revisit_by_angle.values()),
+        'priority_revisit': max(priority_revisits) if priority_revisits else None,
+        'revisit_by_angle': revisit_by_angle
+    }
+
+def report(config=None):
+    """Compare every pattern for the current servo settings"""
+    config = config or get_config()
+    servo = config.servo
+    print(f"Sweep {servo.min_angle}-{servo.max_angle}° every {servo.step}°, "
+          f"coarse view = no angle more than {config.sweep.coarse_step / 2:g}° from a reading, "
+          f"priority = {', '.join(config.sweep.priority_zones)}")
+    print(f"{'Pattern':<14} {'Readings':>8} {'Cycle':>7} {'Travel':>7} {'Coarse view':>12} "
+          f"{'Full view':>10} {'Worst revisit':>14} {'Priority revisit':>17}")
+    for name in PATTERNS:
+        stats = pattern_statistics(config, name)
+        priority = stats['priority_revisit']
+        print(f"{name:<14} {stats['readings']:>8} {stats['cycle_time']:>6.1f}s "
+              f"{stats['travel']:>6}° {stats['coarse_view']:>11.1f}s "
+              f"{stats['full_coverage']:>9.1f}s {stats['worst_revisit']:>13.1f}s "
+              f"{'-' if priority is None else f'{priority:.1f}s':>17}")
+
+if __name__ == "__main__":
+    report()
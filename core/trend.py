@@ -0,0 +1,92 @@
+# Trend tracking - filtered distance, approach rate and time to contact
+import collections
+import time
+from runtime_config import get_config
+
+class TrendTracker:
+    """Follows one direction at a high ping rate
+
+    Readings go through a short median filter (drops single-ping spikes), the
+    approach rate is the least-squares slope of the filtered distance over the
+    last TREND_WINDOW seconds, and time to contact is distance / rate.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.reset()
+
+    def reset(self):
+        manual = self.config.manual
+        self.window = collections.deque(maxlen=manual.filter_window)
+        self.history = collections.deque()
+        self.filtered = None
+        self.rate = 0.0
+        self.time_to_contact = None
+        self.approach_started = None
+        self.last_trend_alert = 0
+        self.trend_alerts = 0
+
+    def update(self, distance, now=None):
+        """Feed a raw reading (<= 0 means no echo) - returns the filtered distance"""
+        if now is None:
+            now = time.time()
+        manual = self.config.manual
+
+        # Drop history that is too old to describe the current motion
+        while self.history and now - self.history[0][0] > manual.trend_window:
+            self.history.popleft()
+
+        if distance <= 0:
+            return self.filtered
+
+        if self.window.maxlen != manual.filter_window:
+            self.window = collections.deque(self.window, maxlen=manual.filter_window)
+        self.window.append(distance)
+        ordered = sorted(self.window)
+        self.filtered = ordered[len(ordered) // 2]
+        self.history.append((now, self.filtered))
+
+        slope = self._slope()
+        # Positive rate = getting closer
+        alpha = manual.rate_smoothing
+        self.rate = alpha * -slope + (1 - alpha) * self.rate
+        self.time_to_contact = self.filtered / self.rate if self.rate > 0 else None
+
+        # When the current approach began - trend alert latency is measured from here
+        if self.rate >= manual.approach_rate:
+            if self.approach_started is None:
+                self.approach_started = now
+        else:
+            self.approach_started = None
+        return self.filtered
+
+    def _slope(self):
+        n = len(self.history)
+        if n < 3:
+            return 0.0
+        t0 = self.history[0][0]
+        mean_t = sum(t - t0 for t, _ in self.history) / n
+        mean_d = sum(d for _, d in self.history) / n
+        numerator = 0.0
+        denominator = 0.0
+        for t, d in self.history:
+            dt = t - t0 - mean_t
+            numerator += dt * (d - mean_d)
+            denominator += dt * dt
+        return numerator / denominator if denominator else 0.0
+
+    def trend_alert_due(self, now=None):
+        """Closing fast enough that contact is near - once per alert cooldown"""
+        if now is None:
+            now = time.time()
+        manual = self.config.manual
+
+        if (self.time_to_contact is None or self.rate < manual.approach_rate or
+                self.time_to_contact > manual.ttc_alert):
+            return False
+        if now - self.last_trend_alert < self.config.alert.cooldown:
+            return False
+
+        self.last_trend_alert = now
+        self.trend_alerts += 1
+        return True
@@ -0,0 +1,398 @@
+# Offline analytics - columnar NumPy aggregates over the measurement history
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runtime_config import get_config
+from database.snapshot import read_path
+from database.sweep_frames import frames_to_arrays
+
+CACHE_VERSION = 1
+
+def _local_seconds(date_strings):
+    """'YYYY-MM-DD HH:MM:SS' (local time, as stored) -> int64 seconds"""
+    return np.asarray(date_strings, dtype='datetime64[s]').astype(np.int64)
+
+class MeasurementAnalytics:
+    """Heatmaps, zone distributions, alert rates and sessions without rescanning the table
+
+    Rows are read in chunks of CHUNK_SIZE into NumPy columns and folded into
+    mergeable aggregates (per angle/hour counts, per-zone histograms, per-minute
+    totals). The aggregates are cached with the last processed row ids, so a
+    rerun only reads rows added since. Timestamps are local wall-clock seconds,
+    like the date_time column.
+
+    With sweep frames in the database, automatic-mode readings come from the
+    frames (every reading) and AUTO rows in measurements after the first frame
+    are skipped so alerts are not counted twice.
+    """
+
+    def __init__(self, db_path=None, config=None, cache_path=None):
+        self.config = config or get_config()
+        analytics = self.config.analytics
+        # Heavy scans read the snapshot replica when there is one
+        self.db_path = db_path or read_path(self.config)
+        if cache_path is None:
+            # Another database gets its own cache next to it
+            cache_path = (analytics.cache_file if db_path is None
+                          else os.path.splitext(db_path)[0] + '_analytics.npz')
+        self.cache_path = cache_path
+
+        self.angle_bin = analytics.angle_bin
+        self.distance_bin = analytics.distance_bin
+        self.angle_bins = 180 // self.angle_bin + 1
+        self.distance_bins = int(self.config.distance.max_valid // self.distance_bin) + 1
+        zones = self.config.direction.zones
+        self.zone_names = {zone['code']: zone['name'] for zone in zones.values()}
+        self.zone_count = max(self.zone_names) + 1
+        self.reset()
+        self.load_cache()
+
+    def reset(self):
+        self.last_measurement_id = 0
+        self.last_frame_id = 0
+        self.first_frame_time = None
+        self.heat_total = np.zeros((self.angle_bins, 24), dtype=np.int64)
+        self.heat_hits = np.zeros((self.angle_bins, 24), dtype=np.int64)
+        self.zone_hist = np.zeros((self.zone_count, self.distance_bins), dtype=np.int64)
+        self.minute_keys = np.empty(0, dtype=np.int64)
+        self.minute_total = np.empty(0, dtype=np.int64)
+        self.minute_alerts = np.empty(0, dtype=np.int64)
+        self.minute_min = np.empty(0, dtype=np.float32)
+
+    # Cache
+
+    def load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with np.load(self.cache_path) as cache:
+                if (int(cache['version']) != CACHE_VERSION or
+                        cache['heat_total'].shape != self.heat_total.shape or
+                        cache['zone_hist'].shape != self.zone_hist.shape):
+                    return False
+                self.last_measurement_id = int(cache['last_measurement_id'])
+                self.last_frame_id = int(cache['last_frame_id'])
+                first_frame_time = float(cache['first_frame_time'])
+                self.first_frame_time = None if np.isnan(first_frame_time) else first_frame_time
+                for name in ('heat_total', 'heat_hits', 'zone_hist', 'minute_keys',
+                             'minute_total', 'minute_alerts', 'minute_min'):
+                    setattr(self, name, cache[name])
+            return True
+        except Exception as e:
+            print(f"Analytics cache ignored: {e}")
+            self.reset()
+            return False
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        tmp_path = self.cache_path + '.tmp.npz'
+        np.savez(tmp_path, version=CACHE_VERSION,
+                 last_measurement_id=self.last_measurement_id,
+                 last_frame_id=self.last_frame_id,
+                 first_frame_time=np.nan if self.first_frame_time is None else self.first_frame_time,
+                 heat_total=self.heat_total, heat_hits=self.heat_hits, zone_hist=self.zone_hist,
+                 minute_keys=self.minute_keys, minute_total=self.minute_total,
+                 minute_alerts=self.minute_alerts, minute_min=self.minute_min)
+        os.replace(tmp_path, self.cache_path)
+
+    # Incremental update
+
+    def _connect(self):
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                               timeout=self.config.database.connection_timeout)
+
+    def update(self):
+        """Fold rows added since the last run into the aggregates - returns rows read"""
+        conn = self._connect()
+        try:
+            if self._source_shrank(conn):
+                print("Database is older than the analytics cache - rebuilding")
+                self.reset()
+
+            processed = 0
+            if self.config.analytics.include_frames and self._has_table(conn, 'sweep_frames'):
+                if self.first_frame_time is None:
+                    row = conn.execute("SELECT MIN(start_time) FROM sweep_frames").fetchone()
+                    if row[0] is not None:
+                        self.first_frame_time = row[0] + time.localtime(row[0]).tm_gmtoff
+                processed += self._update_frames(conn)
+            processed += self._update_measurements(conn)
+        finally:
+            conn.close()
+
+        self.save_cache()
+        return processed
+
+    def _has_table(self, conn, name):
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                            (name,)).fetchone() is not None
+
+    def _source_shrank(self, conn):
+        # A replaced database restarts its ids below what was processed
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM measurements").fetchone()[0]
+        return max_id < self.last_measurement_id
+
+    def _update_measurements(self, conn):
+        chunk_size = self.config.analytics.chunk_size
+        processed = 0
+
+        while True:
+            rows = conn.execute("""
+            SELECT id, date_time, distance, angle, direction_code, alert_status, scan_mode
+            FROM measurements WHERE id > ? ORDER BY id LIMIT ?
+            """, (self.last_measurement_id, chunk_size)).fetchall()
+            if not rows:
+                break
+
+            ids, dates, distances, angles, codes, alerts, modes = zip(*rows)
+            seconds = _local_seconds(dates)
+            distances = np.asarray(distances, dtype=np.float32)
+            angles = np.asarray(angles, dtype=np.int16)
+            codes = np.asarray(codes, dtype=np.int16)
+            alerts = np.asarray(alerts, dtype=np.int8)
+
+            if self.first_frame_time is not None:
+                keep = (np.asarray(modes) != 'AUTO') | (seconds < self.first_frame_time)
+                seconds, distances, angles, codes, alerts = (
+                    column[keep] for column in (seconds, distances, angles, codes, alerts))
+
+            self._fold(seconds, distances, angles, codes, alerts)
+            self.last_measurement_id = ids[-1]
+            processed += len(rows)
+
+        return processed
+
+    def _update_frames(self, conn):
+        chunk_rows = max(1, self.config.analytics.chunk_size // 64)
+        threshold = self.config.distance.threshold
+        zone_table = self.config.direction.zone_table
+        code_lookup = np.array([code for _, code in zone_table], dtype=np.int16)
+        processed = 0
+        conn.row_factory = sqlite3.Row
+
+        # Copies made before sweep patterns have no angles column
+        columns = [column[1] for column in conn.execute("PRAGMA table_info(sweep_frames)")]
+        angles_column = ", angles" if 'angles' in columns else ""
+
+        while True:
+            frames = [dict(row) for row in conn.execute(f"""
+            SELECT id, start_time, end_time, angle_start, angle_step, count, encoding, distances{angles_column}
+            FROM sweep_frames WHERE id > ? ORDER BY id LIMIT ?
+            """, (self.last_frame_id, chunk_rows)).fetchall()]
+            if not frames:
+                break
+
+            timestamps, angles, distances = frames_to_arrays(frames)
+            # Epoch -> local wall clock, the same scale as date_time
+            offset = time.localtime(frames[0]['start_time']).tm_gmtoff
+            seconds = (timestamps + offset).astype(np.int64)
+            angles = angles.astype(np.int16)
+            codes = code_lookup[np.clip(angles, 0, 180)]
+            valid = ~np.isnan(distances)
+            alerts = (valid & (np.nan_to_num(distances, nan=np.inf) < threshold)).astype(np.int8)
+            distances = np.nan_to_num(distances, nan=0.0)
+
+            self._fold(seconds, distances, angles, codes, alerts)
+            self.last_frame_id = frames[-1]['id']
+            processed += len(seconds)
+
+        conn.row_factory = None
+        return processed
+
+    def _fold(self, seconds, distances, angles, codes, alerts):
+        """Add one chunk of readings to every aggregate"""
+        if len(seconds) == 0:
+            return
+
+        valid = distances > 0
+        hours = (seconds // 3600) % 24
+        angle_index = np.clip(angles, 0, 180) // self.angle_bin
+        np.add.at(self.heat_total, (angle_index[valid], hours[valid]), 1)
+        np.add.at(self.heat_hits, (angle_index, hours), alerts)
+
+        distance_index = np.clip(distances[valid] // self.distance_bin, 0, self.distance_bins - 1).astype(np.int64)
+        zone_index = np.clip(codes[valid], 0, self.zone_count - 1)
+        np.add.at(self.zone_hist, (zone_index, distance_index), 1)
+
+        # Per-minute totals, merged with what is already there
+        minutes = seconds // 60
+        keys, inverse = np.unique(minutes, return_inverse=True)
+        totals = np.bincount(inverse, minlength=len(keys))
+        alert_counts = np.bincount(inverse, weights=alerts, minlength=len(keys)).astype(np.int64)
+        minimum = np.full(len(keys), np.inf, dtype=np.float32)
+        np.minimum.at(minimum, inverse[valid], distances[valid])
+
+        all_keys = np.concatenate([self.minute_keys, keys])
+        merged_keys, merged_inverse = np.unique(all_keys, return_inverse=True)
+        self.minute_total = np.bincount(merged_inverse, weights=np.concatenate(
+            [self.minute_total, totals]), minlength=len(merged_keys)).astype(np.int64)
+        self.minute_alerts = np.bincount(merged_inverse, weights=np.concatenate(
+            [self.minute_alerts, alert_counts]), minlength=len(merged_keys)).astype(np.int64)
+        merged_min = np.full(len(merged_keys), np.inf, dtype=np.float32)
+        np.minimum.at(merged_min, merged_inverse, np.concatenate([self.minute_min, minimum]))
+        self.minute_keys = merged_keys
+        self.minute_min = merged_min
+
+    # Results
+
+    def heatmap(self):
+        """(angle bin starts, obstacle share per angle bin x hour of day) - NaN where never scanned"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            share = np.where(self.heat_total > 0, self.heat_hits / self.heat_total, np.nan)
+        return np.arange(self.angle_bins) * self.angle_bin, share
+
+    def zone_distributions(self):
+        """Distance distribution per zone from the histograms"""
+        edges = np.arange(self.distance_bins + 1) * self.distance_bin
+        centers = (edges[:-1] + edges[1:]) / 2
+        result = {}
+
+        for code, name in sorted(self.zone_names.items()):
+            histogram = self.zone_hist[code]
+            count = int(histogram.sum())
+            if not count:
+                continue
+            cumulative = np.cumsum(histogram) / count
+            result[name] = {
+                'count': count,
+                'mean': float((histogram * centers).sum() / count),
+                'p10': float(edges[np.searchsorted(cumulative, 0.10) + 1]),
+                'p50': float(edges[np.searchsorted(cumulative, 0.50) + 1]),
+                'p90': float(edges[np.searchsorted(cumulative, 0.90) + 1]),
+                'histogram': histogram
+            }
+        return result
+
+    def alert_rate_series(self, interval=3600):
+        """(bucket start datetimes, alerts, readings, alerts per reading) per `interval` seconds"""
+        if not len(self.minute_keys):
+            empty = np.empty(0, dtype=np.int64)
+            return empty.astype('datetime64[s]'), empty, empty, np.empty(0)
+
+        buckets = (self.minute_keys * 60) // interval
+        keys, inverse = np.unique(buckets, return_inverse=True)
+        alerts = np.bincount(inverse, weights=self.minute_alerts).astype(np.int64)
+        totals = np.bincount(inverse, weights=self.minute_total).astype(np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate = np.where(totals > 0, alerts / totals, 0.0)
+        return (keys * interval).astype('datetime64[s]'), alerts, totals, rate
+
+    def sessions(self):
+        """Scanning sessions from AUTO_SCAN_START to SYSTEM_SHUTDOWN in system_logs"""
+        conn = self._connect()
+        try:
+            events = conn.execute("""
+            SELECT date_time, event_type FROM system_logs
+            WHERE event_type IN ('AUTO_SCAN_START', 'SYSTEM_SHUTDOWN', 'SYSTEM_START', 'SYSTEM_WARM_START')
+            ORDER BY id
+            """).fetchall()
+        finally:
+            conn.close()
+
+        bounds = []
+        start = None
+        for date_time, event_type in events:
+            moment = int(_local_seconds([date_time])[0])
+            if event_type == 'AUTO_SCAN_START':
+                if start is None:
+                    start = moment
+            elif event_type == 'SYSTEM_SHUTDOWN':
+                if start is not None:
+                    bounds.append((start, moment, 'shutdown'))
+                    start = None
+            elif event_type == 'SYSTEM_START' and start is not None:
+                # Started again without a shutdown in between - the run crashed
+                bounds.append((start, moment, 'restart'))
+                start = None
+        if start is not None:
+            bounds.append((start, int(self.minute_keys[-1] * 60 + 60) if len(self.minute_keys) else start, 'open'))
+
+        minutes = self.minute_keys
+        total_cumulative = np.concatenate([[0], np.cumsum(self.minute_total)])
+        alert_cumulative = np.concatenate([[0], np.cumsum(self.minute_alerts)])
+        result = []
+
+        for start, end, ended_by in bounds:
+            first = np.searchsorted(minutes, start // 60)
+            last = np.searchsorted(minutes, end // 60, side='right')
+            readings = int(total_cumulative[last] - total_cumulative[first])
+            alerts = int(alert_cumulative[last] - alert_cumulative[first])
+            closest = float(self.minute_min[first:last].min()) if last > first else np.inf
+            duration = max(end - start, 1)
+            result.append({
+                'start': np.datetime64(start, 's'),
+                'end': np.datetime64(end, 's'),
+                'duration': end - start,
+                'ended_by': ended_by,
+                'readings': readings,
+                'alerts': alerts,
+                'alerts_per_minute': alerts * 60 / duration,
+                'closest': None if np.isinf(closest) else closest
+            })
+        return result
+
+    def report(self, interval=3600):
+        angles, share = self.heatmap()
+        print("=" * 70)
+        print("MEASUREMENT ANALYTICS")
+        print("=" * 70)
+        print(f"Readings: {int(self.minute_total.sum())} | Alerts: {int(self.minute_alerts.sum())} | "
+              f"Rows processed up to measurement #{self.last_measurement_id}, frame #{self.last_frame_id}")
+
+        print("\nDistance by zone (cm):")
+        for name, stats in self.zone_distributions().items():
+            print(f"   • {name:<12} n={stats['count']:<8} mean {stats['mean']:6.1f} | "
+                  f"p10 {stats['p10']:5.0f} | p50 {stats['p50']:5.0f} | p90 {stats['p90']:5.0f}")
+
+        scanned = ~np.isnan(share)
+        if scanned.any():
+            print("\nObstacle heatmap (share of readings inside the threshold):")
+            hours = np.where(scanned.any(axis=0))[0]
+            print("   angle  " + " ".join(f"{hour:>4}" for hour in hours))
+            for index in np.where(scanned.any(axis=1))[0]:
+                cells = " ".join("   ." if np.isnan(value) else f"{value * 100:3.0f}%"
+                                 for value in share[index, hours])
+                print(f"   {angles[index]:>4}°  {cells}")
+
+        starts, alerts, totals, rate = self.alert_rate_series(interval)
+        if len(starts):
+            print(f"\nAlert rate (per {interval // 60} min):")
+            for moment, alert_count, total, value in list(zip(starts, alerts, totals, rate))[-12:]:
+                print(f"   {str(moment).replace('T', ' ')}  {alert_count:>6} / {total:<8} {value * 100:5.1f}%")
+
+        sessions = self.sessions()
+        if sessions:
+            print("\nSessions:")
+            for session in sessions[-10:]:
+                closest = f"{session['closest']:.0f}cm" if session['closest'] is not None else "-"
+                print(f"   {str(session['start']).replace('T', ' ')}  {session['duration'] / 60:6.1f} min  "
+                      f"{session['readings']:>7} readings  {session['alerts']:>5} alerts "
+                      f"({session['alerts_per_minute']:.1f}/min)  closest {closest}  [{session['ended_by']}]")
+        print("=" * 70)
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics over the measurement history")
+    parser.add_argument('--db', help="database file (default: snapshot replica, else the configured database)")
+    parser.add_argument('--interval', type=int, default=3600, help="alert rate bucket (seconds)")
+    parser.add_argument('--rebuild', action='store_true', help="ignore the cache and read everything")
+    args = parser.parse_args()
+
+    analytics = MeasurementAnalytics(args.db)
+    if args.rebuild:
+        analytics.reset()
+
+    start = time.time()
+    processed = analytics.update()
+    print(f"Read {processed} new readings in {time.time() - start:.2f}s")
+    analytics.report(args.interval)
+
+if __name__ == "__main__":
+    main()
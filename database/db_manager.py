@@ -2,19 +2,40 @@
 import sqlite3
 import datetime
 import os
+import time
 from pathlib import Path
-from config import DATABASE, DB_PATH
+from runtime_config import get_config
+from core.health import CircuitBreaker
+from .recent_cache import RecentMeasurements
+from .snapshot import read_path, connect_read_only
+from .sweep_frames import DISTANCE_SCALE, SweepFrameBuilder, encode_angles, encode_distances
 
 class DatabaseManager:
-    def __init__(self):
-        self.db_path = DB_PATH
+    def __init__(self, config=None, check_schema=True, breaker=None):
+        self.config = config or get_config()
+        self.breaker = breaker or CircuitBreaker('database', self.config)
+        # Database location is fixed for the lifetime of the manager
+        self.folder = self.config.database.folder
+        self.db_path = self.config.database.path
         self.connection = None
-        self.create_database()
+        self.recent = RecentMeasurements(self.config.database.recent_capacity,
+                                         self.config.direction.zones)
+        self.frames = None
+        if self.config.database.sweep_frames:
+            self.frames = SweepFrameBuilder(self.config.database.frame_max_readings)
+        self.quantiles = None
+        self.quantiles_saved = time.time()
+        if self.config.quantiles.enabled:
+            self.quantiles = self._load_quantiles()
+        
+        # A warm restart trusts the schema the previous run already checked
+        if check_schema or not os.path.exists(self.db_path):
+            self.create_database()
     
     def create_records_folder(self):
         try:
-            Path(DATABASE['FOLDER']).mkdir(parents=True, exist_ok=True)
-            print(f"Records folder ready: '{DATABASE['FOLDER']}'")
+            Path(self.folder).mkdir(parents=True, exist_ok=True)
+            print(f"Records folder ready: '{self.folder}'")
             return True
         except Exception as e:
             print(f"Error creating records folder: {e}")
@@ -37,6 +58,8 @@ class DatabaseManager:
             else:
                 self._create_new_tables(cursor)
             
+            self._create_frame_table(cursor)
+            
             conn.commit()
             conn.close()
             print(f"Database '{self.db_path}' ready")
@@ -95,23 +118,123 @@ class DatabaseManager:
         
         print("New tables created")
     
+    def _create_frame_table(self, cursor):
+        # One row per sweep: distances packed as uint16 millimetres
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sweep_frames (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_time REAL NOT NULL,
+            end_time REAL NOT NULL,
+            angle_start INTEGER NOT NULL,
+            angle_step INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            encoding INTEGER NOT NULL,
+            distances BLOB NOT NULL,
+            alert_count INTEGER NOT NULL DEFAULT 0,
+            scan_mode TEXT DEFAULT 'AUTO',
+            angles BLOB,
+            echo_count INTEGER,
+            distance_sum REAL
+        )
+        ''')
+        
+        # Explicit angles arrived with sweep patterns, the echo totals for the
+        # statistics after that - older tables lack the columns
+        cursor.execute("PRAGMA table_info(sweep_frames)")
+        existing = [column[1] for column in cursor.fetchall()]
+        for column_name, column_def in (('angles', 'BLOB'), ('echo_count', 'INTEGER'),
+                                        ('distance_sum', 'REAL')):
+            if column_name not in existing:
+                print(f"Adding '{column_name}' column to sweep_frames...")
+                cursor.execute(f"ALTER TABLE sweep_frames ADD COLUMN {column_name} {column_def}")
+    
     def get_connection(self):
-        max_retries = DATABASE['MAX_RETRIES']
+        database = self.config.database
+        max_retries = database.max_retries
         
         for attempt in range(max_retries):
+            # Fails fast while the database keeps failing, instead of retrying every call
+            if not self.breaker.allow():
+                return None
             try:
-                conn = sqlite3.connect(self.db_path, timeout=DATABASE['CONNECTION_TIMEOUT'])
+                conn = sqlite3.connect(self.db_path, timeout=database.connection_timeout)
                 return conn
             except Exception as e:
                 print(f"Connection attempt {attempt + 1} failed: {e}")
-                if attempt < max_retries - 1:
-                    import time
+                self.breaker.record_failure('connect')
+                if attempt < max_retries - 1 and self.breaker.state == CircuitBreaker.CLOSED:
                     time.sleep(1)
         
         print("Failed to establish database connection")
         return None
     
+    def get_read_connection(self):
+        """Connection for heavy reads - the snapshot replica when there is one"""
+        path = read_path(self.config)
+        if path == self.db_path:
+            return self.get_connection()
+        try:
+            return connect_read_only(path, self.config.database.connection_timeout)
+        except Exception as e:
+            print(f"Replica unavailable, reading the live database: {e}")
+            return self.get_connection()
+    
+    def _load_quantiles(self):
+        # Imported here so `python -m database.quantiles` runs without a double import
+        from .quantiles import ZoneQuantiles
+        path = self.config.quantiles.file
+        if os.path.exists(path):
+            try:
+                return ZoneQuantiles.load(path, self.config)
+            except Exception as e:
+                print(f"Distance quantiles not restored, starting empty: {e}")
+        return ZoneQuantiles(self.config)
+    
+    def _observe_distance(self, distance, direction, scan_mode):
+        """Every reading, saved or not, goes into the quantile sketches"""
+        if self.quantiles is None:
+            return
+        now = time.time()
+        self.quantiles.add(direction, scan_mode, distance, now)
+        if now - self.quantiles_saved >= self.config.quantiles.save_interval:
+            self.save_quantiles()
+    
+    def save_quantiles(self):
+        if self.quantiles is None:
+            return False
+        self.quantiles_saved = time.time()
+        try:
+            self.quantiles.save(self.config.quantiles.file)
+            return True
+        except Exception as e:
+            print(f"Distance quantiles save error: {e}")
+            return False
+    
+    def get_distance_quantiles(self, since=None):
+        """p5/p50/p95 distance per zone, all scan modes - since the first run or `since`"""
+        if self.quantiles is None:
+            return {}
+        result = {}
+        for zone in self.config.direction.zones:
+            digest = self.quantiles.digest(zone, since=since)
+            if digest.count:
+                result[zone] = {
+                    'count': digest.count,
+                    'p5': round(digest.quantile(0.05), 1),
+                    'p50': round(digest.quantile(0.5), 1),
+                    'p95': round(digest.quantile(0.95), 1)
+                }
+        return result
+    
+    def record_measurement(self, distance, angle, direction, direction_code, alert_status, scan_mode):
+        """Keep a reading in memory only"""
+        self.recent.append(distance, angle, direction_code, alert_status, scan_mode)
+        self._observe_distance(distance, direction, scan_mode)
+    
     def save_measurement(self, distance, angle, direction, direction_code, alert_status, scan_mode):
+        self.recent.append(distance, angle, direction_code, alert_status, scan_mode)
+        self._observe_distance(distance, direction, scan_mode)
+        
         conn = self.get_connection()
         if not conn:
             return False
@@ -126,14 +249,97 @@ class DatabaseManager:
             )
             
             conn.commit()
+            self.breaker.record_success()
             return True
             
         except Exception as e:
             print(f"Data saving error: {e}")
+            self.breaker.record_failure('write')
+            return False
+        finally:
+            conn.close()
+    
+    def record_sweep_reading(self, angle, distance, alert_status, scan_mode, timestamp=None):
+        """Add a reading to the current sweep frame, writing the frame once it is finished"""
+        if self.frames is None:
+            return False
+        # Sweep patterns jump around - their frames keep every angle
+        explicit_angles = self.config.sweep.pattern != 'linear'
+        frame = self.frames.add(angle, distance, alert_status, scan_mode, timestamp, explicit_angles)
+        if frame:
+            return self.save_sweep_frame(frame)
+        return True
+    
+    def flush_sweep_frame(self):
+        if self.frames is None:
+            return False
+        frame = self.frames.flush()
+        if frame:
+            return self.save_sweep_frame(frame)
+        return True
+    
+    def save_sweep_frame(self, frame):
+        database = self.config.database
+        blob, encoding = encode_distances(frame['values'], database.frame_delta_encoding,
+                                          database.frame_compression)
+        angles = encode_angles(frame['angles']) if frame['angles'] is not None else None
+        # Totals over the echoes, so statistics need not decode every frame
+        echoes = [value for value in frame['values'] if value]
+        distance_sum = sum(echoes) / DISTANCE_SCALE
+        
+        conn = self.get_connection()
+        if not conn:
+            return False
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO sweep_frames (start_time, end_time, angle_start, angle_step, count, encoding, distances, alert_count, scan_mode, angles, echo_count, distance_sum) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (frame['start_time'], frame['end_time'], frame['angle_start'], frame['angle_step'],
+                 frame['count'], encoding, blob, frame['alert_count'], frame['scan_mode'], angles,
+                 len(echoes), distance_sum)
+            )
+            
+            conn.commit()
+            self.breaker.record_success()
+            return True
+            
+        except Exception as e:
+            print(f"Sweep frame saving error: {e}")
+            self.breaker.record_failure('write')
             return False
         finally:
             conn.close()
     
+    def get_sweep_frames(self, limit=100, after_id=0):
+        """Stored frames as dicts, oldest first - decode with sweep_frames.frame_to_arrays"""
+        conn = self.get_read_connection()
+        if not conn:
+            return []
+        
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT id, start_time, end_time, angle_start, angle_step, count,
+                   encoding, distances, alert_count, scan_mode, angles
+            FROM sweep_frames
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+            """, (after_id, limit))
+            
+            frames = [dict(row) for row in cursor.fetchall()]
+            self.breaker.record_success()
+            return frames
+            
+        except Exception as e:
+            print(f"Error fetching sweep frames: {e}")
+            self.breaker.record_failure('read')
+            return []
+        finally:
+            conn.close()
+    
     def log_system_event(self, event_type, description, system_mode):
         conn = self.get_connection()
         if not conn:
@@ -149,16 +355,22 @@ class DatabaseManager:
             )
             
             conn.commit()
+            self.breaker.record_success()
             return True
             
         except Exception as e:
             print(f"Event logging error: {e}")
+            self.breaker.record_failure('write')
             return False
         finally:
             conn.close()
     
     def get_recent_measurements(self, limit=8):
-        conn = self.get_connection()
+        # Served from memory once this session has readings
+        if len(self.recent):
+            return self.recent.latest(limit)
+        
+        conn = self.get_read_connection()
         if not conn:
             return []
         
@@ -171,16 +383,23 @@ class DatabaseManager:
             LIMIT ?
             """, (limit,))
             
-            return cursor.fetchall()
+            rows = cursor.fetchall()
+            self.breaker.record_success()
+            return rows
             
         except Exception as e:
             print(f"Error fetching measurements: {e}")
+            self.breaker.record_failure('read')
             return []
         finally:
             conn.close()
     
+    def get_alert_counts(self, window=30):
+        """Alerts per zone in the last `window` seconds, from memory"""
+        return self.recent.alerts_by_zone(window)
+    
     def get_statistics(self):
-        conn = self.get_connection()
+        conn = self.get_read_connection()
         if not conn:
             return {}
         
@@ -188,18 +407,41 @@ class DatabaseManager:
             cursor = conn.cursor()
             stats = {}
             
-            # Total record count
-            cursor.execute("SELECT COUNT(*) FROM measurements")
-            stats['total_records'] = cursor.fetchone()[0]
+            # Measurement rows: alerts, manual readings, periodic rows from before sweep frames
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(distance), 0) FROM measurements")
+            row_count, row_distance = cursor.fetchone()
+            
+            # Automatic readings kept in sweep frames
+            cursor.execute("""
+            SELECT COUNT(*), COALESCE(SUM(count), 0), COALESCE(SUM(echo_count), 0),
+                   COALESCE(SUM(distance_sum), 0), MIN(start_time)
+            FROM sweep_frames
+            """)
+            frame_count, frame_readings, frame_echoes, frame_distance, first_frame = cursor.fetchone()
+            
+            # Automatic alerts since the first frame are in both tables - count them once
+            overlap_count, overlap_distance = 0, 0
+            if first_frame is not None:
+                since = datetime.datetime.fromtimestamp(first_frame).strftime('%Y-%m-%d %H:%M:%S')
+                cursor.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(distance), 0) FROM measurements WHERE scan_mode = 'AUTO' AND date_time >= ?",
+                    (since,)
+                )
+                overlap_count, overlap_distance = cursor.fetchone()
+            
+            # Total reading count - readings with an echo, as measurement rows always were
+            readings = row_count - overlap_count + frame_echoes
+            stats['total_records'] = readings
+            stats['frame_count'] = frame_count
+            stats['frame_readings'] = frame_readings
             
             # Alert count
             cursor.execute("SELECT COUNT(*) FROM measurements WHERE alert_status = 1")
             stats['alert_count'] = cursor.fetchone()[0]
             
-            # Average distance
-            cursor.execute("SELECT AVG(distance) FROM measurements")
-            avg_distance = cursor.fetchone()[0]
-            stats['avg_distance'] = round(avg_distance, 2) if avg_distance else 0
+            # Average distance over echoes (frames from before the echo totals are left out)
+            distance = row_distance - overlap_distance + frame_distance
+            stats['avg_distance'] = round(distance / readings, 2) if readings > 0 else 0
             
             # Danger zones
             cursor.execute("""
@@ -211,10 +453,15 @@ class DatabaseManager:
             """)
             stats['danger_zones'] = cursor.fetchall()
             
+            # Percentiles come from the in-memory sketches, not a sort of the table
+            stats['distance_quantiles'] = self.get_distance_quantiles()
+            
+            self.breaker.record_success()
             return stats
             
         except Exception as e:
             print(f"Error fetching statistics: {e}")
+            self.breaker.record_failure('read')
             return {}
         finally:
             conn.close()
@@ -238,6 +485,12 @@ class DatabaseManager:
                 (cutoff_date.strftime('%Y-%m-%d %H:%M:%S'),)
             )
             
+            # Frames are keyed by epoch seconds
+            cursor.execute(
+                "DELETE FROM sweep_frames WHERE start_time < ?",
+                (cutoff_date.timestamp(),)
+            )
+            
             conn.commit()
             print(f"Cleaned records older than {days} days")
             return True
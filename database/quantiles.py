@@ -0,0 +1,295 @@
+# Distance quantiles - mergeable t-digest sketches per direction zone and scan mode
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runtime_config import get_config
+
+QUANTILES_VERSION = 1
+
+class TDigest:
+    """Merging t-digest - approximate quantiles in bounded memory
+
+    Values are buffered and merged into sorted centroids whose size is capped
+    by the arcsine scale function, so the tails stay exact-ish while the
+    middle is summarised coarsely. A digest holds about COMPRESSION / 2
+    centroids no matter how many values went in, and two digests merge into
+    one with the same error bounds.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = array('d')
+        self.weights = array('d')
+        self.buffer = array('d')
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.buffer.append(value)
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self.buffer) >= 2 * self.compression:
+            self.compress()
+
+    def merge(self, other):
+        """Fold another digest into this one - returns self"""
+        if not other.count:
+            return self
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        points = list(zip(other.means, other.weights))
+        points.extend((value, 1.0) for value in other.buffer)
+        self._compress(points)
+        return self
+
+    def compress(self):
+        if self.buffer:
+            self._compress([])
+
+    def _weight_limit(self, done, total):
+        """Largest cumulative weight the centroid starting after `done` may reach"""
+        half_span = self.compression / (2 * math.pi)
+        k = half_span * math.asin(2 * done / total - 1) + 1
+        if k >= self.compression / 4:
+            return total
+        return (math.sin(k / half_span) + 1) / 2 * total
+
+    def _compress(self, points):
+        points.extend((value, 1.0) for value in self.buffer)
+        points.extend(zip(self.means, self.weights))
+        self.buffer = array('d')
+        if not points:
+            return
+        points.sort()
+
+        total = sum(weight for _, weight in points)
+        means = array('d')
+        weights = array('d')
+        mean, weight = points[0]
+        done = 0.0
+        limit = self._weight_limit(done, total)
+        for value, value_weight in points[1:]:
+            if done + weight + value_weight <= limit:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                done += weight
+                limit = self._weight_limit(done, total)
+                mean, weight = value, value_weight
+        means.append(mean)
+        weights.append(weight)
+        self.means = means
+        self.weights = weights
+
+    def quantile(self, q):
+        """Value below which a fraction q of the data lies (None when empty)"""
+        if not self.count:
+            return None
+        self.compress()
+        q = min(1.0, max(0.0, q))
+        if len(self.means) == 1:
+            return self.means[0]
+
+        # Interpolate between centroid centres, with min/max at the two ends
+        total = sum(self.weights)
+        target = q * total
+        cumulative = 0.0
+        previous_position = 0.0
+        previous_mean = self.min
+        for mean, weight in zip(self.means, self.weights):
+            position = cumulative + weight / 2
+            if target < position:
+                span = position - previous_position
+                return previous_mean + (mean - previous_mean) * (target - previous_position) / span
+            previous_position = position
+            previous_mean = mean
+            cumulative += weight
+        span = total - previous_position
+        if span <= 0:
+            return self.max
+        return previous_mean + (self.max - previous_mean) * (target - previous_position) / span
+
+    def to_dict(self):
+        self.compress()
+        return {
+            'compression': self.compression,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'means': list(self.means),
+            'weights': list(self.weights)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(data['compression'])
+        digest.count = data['count']
+        digest.min = data['min']
+        digest.max = data['max']
+        digest.means = array('d', data['means'])
+        digest.weights = array('d', data['weights'])
+        return digest
+
+class ZoneQuantiles:
+    """Distance sketches per (zone, scan mode), for all time and per WINDOW
+
+    Every reading goes into the lifetime digest of its key and into the
+    digest of the current time window. Windows older than KEEP_WINDOWS are
+    dropped, so memory stays bounded. Windows and whole sets merge, which is
+    how longer periods and several devices are combined.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.lock = threading.Lock()
+        self.total = {}
+        self.windows = {}   # window start -> {(zone, mode): TDigest}
+
+    def add(self, zone, mode, distance, now=None):
+        settings = self.config.quantiles
+        if now is None:
+            now = time.time()
+        start = int(now // settings.window) * settings.window
+        key = (zone, mode)
+
+        with self.lock:
+            window = self.windows.get(start)
+            if window is None:
+                window = self.windows[start] = {}
+                self._close_windows(start)
+            for sketches in (self.total, window):
+                digest = sketches.get(key)
+                if digest is None:
+                    digest = sketches[key] = TDigest(settings.compression)
+                digest.add(distance)
+
+    def _close_windows(self, current):
+        # Caller holds the lock
+        settings = self.config.quantiles
+        oldest = current - (settings.keep_windows - 1) * settings.window
+        for start in list(self.windows):
+            if start < oldest:
+                del self.windows[start]
+            elif start != current:
+                # Finished window - no more values, drop its buffers
+                for digest in self.windows[start].values():
+                    digest.compress()
+
+    def digest(self, zone=None, mode=None, since=None):
+        """One merged digest for the matching keys - all time, or the windows reaching past `since`"""
+        result = TDigest(self.config.quantiles.compression)
+        with self.lock:
+            if since is None:
+                sources = [self.total]
+            else:
+                sources = [window for start, window in self.windows.items()
+                           if start + self.config.quantiles.window > since]
+            for sketches in sources:
+                for (key_zone, key_mode), digest in sketches.items():
+                    if (zone is None or key_zone == zone) and (mode is None or key_mode == mode):
+                        result.merge(digest)
+        return result
+
+    def zones(self):
+        with self.lock:
+            return sorted({zone for zone, _ in self.total})
+
+    def merge(self, other):
+        """Add another set (an earlier save, another device) to this one"""
+        with self.lock:
+            for key, digest in other.total.items():
+                self.total.setdefault(key, TDigest(digest.compression)).merge(digest)
+            for start, window in other.windows.items():
+                own = self.windows.setdefault(start, {})
+                for key, digest in window.items():
+                    own.setdefault(key, TDigest(digest.compression)).merge(digest)
+            if self.windows:
+                self._close_windows(max(self.windows))
+        return self
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'version': QUANTILES_VERSION,
+                'window': self.config.quantiles.window,
+                'total': [{'zone': zone, 'mode': mode, 'digest': digest.to_dict()}
+                          for (zone, mode), digest in self.total.items()],
+                'windows': [{'start': start, 'zone': zone, 'mode': mode, 'digest': digest.to_dict()}
+                            for start, window in self.windows.items()
+                            for (zone, mode), digest in window.items()]
+            }
+
+    @classmethod
+    def from_dict(cls, data, config=None):
+        quantiles = cls(config)
+        for entry in data['total']:
+            quantiles.total[(entry['zone'], entry['mode'])] = TDigest.from_dict(entry['digest'])
+        for entry in data['windows']:
+            window = quantiles.windows.setdefault(entry['start'], {})
+            window[(entry['zone'], entry['mode'])] = TDigest.from_dict(entry['digest'])
+        return quantiles
+
+    def save(self, path):
+        """Atomic replace - a crash mid-write leaves the previous file intact"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, config=None):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != QUANTILES_VERSION:
+            raise ValueError(f"unsupported quantile file version {data.get('version')}")
+        return cls.from_dict(data, config)
+
+def main():
+    parser = argparse.ArgumentParser(description="Distance percentiles per zone, merged over saved sketch files")
+    parser.add_argument('files', nargs='*', help="sketch files to merge (default: QUANTILES['FILE'])")
+    parser.add_argument('--hours', type=float, help="only the last N hours of windows")
+    parser.add_argument('--mode', help="only this scan mode (AUTO or MANUAL)")
+    parser.add_argument('--out', help="write the merged sketches to this file")
+    args = parser.parse_args()
+
+    config = get_config()
+    merged = ZoneQuantiles(config)
+    for path in args.files or [config.quantiles.file]:
+        try:
+            merged.merge(ZoneQuantiles.load(path, config))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Skipping {path}: {e}")
+
+    since = time.time() - args.hours * 3600 if args.hours else None
+    print(f"{'Zone':<12} {'Readings':>9} {'p5':>8} {'p50':>8} {'p95':>8} {'Min':>8} {'Max':>8}")
+    for zone in merged.zones():
+        digest = merged.digest(zone, args.mode, since)
+        if not digest.count:
+            continue
+        print(f"{zone:<12} {digest.count:>9} {digest.quantile(0.05):>7.1f}cm {digest.quantile(0.5):>7.1f}cm "
+              f"{digest.quantile(0.95):>7.1f}cm {digest.min:>7.1f}cm {digest.max:>7.1f}cm")
+
+    if args.out:
+        merged.save(args.out)
+        print(f"Merged sketches written to {args.out}")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
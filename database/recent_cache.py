@@ -0,0 +1,115 @@
+# In-memory recent measurement history
+import threading
+import time
+from array import array
+
+class RecentMeasurements:
+    """Fixed-capacity ring of recent readings stored in parallel typed arrays
+
+    Every reading is appended here, persisted or not, so dashboard and windowed
+    queries never need the database. Appends are O(1) and the footprint is
+    fixed at roughly 20 bytes per slot.
+    """
+
+    def __init__(self, capacity, zones):
+        self.capacity = capacity
+        self.timestamps = array('d', [0.0]) * capacity
+        self.distances = array('f', [0.0]) * capacity
+        self.angles = array('h', [0]) * capacity
+        self.codes = array('b', [0]) * capacity
+        self.alerts = array('b', [0]) * capacity
+        self.modes = array('b', [0]) * capacity
+        self.count = 0   # Total readings ever appended
+        self.lock = threading.Lock()
+
+        self.direction_names = {zone['code']: zone['name'] for zone in zones.values()}
+        self.mode_names = ['AUTO', 'MANUAL']
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _mode_code(self, scan_mode):
+        try:
+            return self.mode_names.index(scan_mode)
+        except ValueError:
+            self.mode_names.append(scan_mode)
+            return len(self.mode_names) - 1
+
+    def append(self, distance, angle, direction_code, alert_status, scan_mode, timestamp=None):
+        with self.lock:
+            slot = self.count % self.capacity
+            self.timestamps[slot] = timestamp or time.time()
+            self.distances[slot] = distance
+            self.angles[slot] = int(angle)
+            self.codes[slot] = direction_code
+            self.alerts[slot] = 1 if alert_status else 0
+            self.modes[slot] = self._mode_code(scan_mode)
+            self.count += 1
+
+    def _slots_newest_first(self):
+        # Caller holds the lock
+        for index in range(self.count - 1, self.count - 1 - len(self), -1):
+            yield index % self.capacity
+
+    def latest(self, limit=8):
+        """Newest readings first, in the same row format as the measurements table"""
+        rows = []
+        with self.lock:
+            for slot in self._slots_newest_first():
+                if len(rows) >= limit:
+                    break
+                rows.append((
+                    time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.timestamps[slot])),
+                    round(self.distances[slot], 2),
+                    self.angles[slot],
+                    self.direction_names.get(self.codes[slot], 'FRONT'),
+                    self.alerts[slot],
+                    self.mode_names[self.modes[slot]]
+                ))
+        return rows
+
+    def snapshot(self, limit=None):
+        """Raw readings oldest first - (timestamp, distance, angle, code, alert, mode)"""
+        rows = []
+        with self.lock:
+            for slot in self._slots_newest_first():
+                if limit is not None and len(rows) >= limit:
+                    break
+                rows.append((self.timestamps[slot], self.distances[slot], self.angles[slot],
+                             self.codes[slot], self.alerts[slot], self.mode_names[self.modes[slot]]))
+        rows.reverse()
+        return rows
+
+    def restore(self, rows):
+        """Append readings saved by snapshot()"""
+        for timestamp, distance, angle, code, alert, mode in rows:
+            self.append(distance, angle, code, alert, mode, timestamp)
+
+    def alerts_by_zone(self, window=30, now=None):
+        """Alert readings per zone within the last `window` seconds"""
+        cutoff = (now or time.time()) - window
+        counts = {}
+        with self.lock:
+            for slot in self._slots_newest_first():
+                if self.timestamps[slot] < cutoff:
+                    break
+                if self.alerts[slot]:
+                    name = self.direction_names.get(self.codes[slot], 'FRONT')
+                    counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def window(self, seconds, now=None):
+        """(timestamp, distance, angle, direction_code, alert_status) newest first"""
+        cutoff = (now or time.time()) - seconds
+        rows = []
+        with self.lock:
+            for slot in self._slots_newest_first():
+                if self.timestamps[slot] < cutoff:
+                    break
+                rows.append((self.timestamps[slot], self.distances[slot], self.angles[slot],
+                             self.codes[slot], self.alerts[slot]))
+        return rows
+
+    def clear(self):
+        with self.lock:
+            self.count = 0
@@ -0,0 +1,151 @@
+# Database snapshots - read-only replica for heavy reads, copied with the online backup API
+import os
+import sqlite3
+import threading
+import time
+from runtime_config import get_config
+
+class SnapshotRestarted(Exception):
+    """The live database kept changing under the copy - try again next round"""
+
+def read_path(config=None):
+    """Where heavy readers should look - the replica once one exists"""
+    config = config or get_config()
+    snapshot = config.snapshot
+    if snapshot.enabled and os.path.exists(snapshot.file):
+        return snapshot.file
+    return config.database.path
+
+def connect_read_only(path, timeout):
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=timeout)
+
+class SnapshotService:
+    """Copies the live database to SNAPSHOT['FILE'] every INTERVAL seconds
+
+    The backup runs in batches of PAGES pages with a PAUSE after each; the
+    live database is only read-locked during a batch, so a writer waits at
+    most one batch. A write from another connection makes SQLite restart the
+    copy; each restart doubles the batch so the copy outruns the writer, and
+    the snapshot is given up after MAX_RESTARTS. The copy goes to a temporary file that
+    replaces the replica in one rename, so readers always see a whole
+    snapshot and keep their old one until they reconnect.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.source = self.config.database.path
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.snapshots = 0
+        self.abandoned = 0
+        self.errors = 0
+        self.restarts = 0
+        self.last_time = None
+        self.last_duration = 0
+        self.last_pages = 0
+        self.last_batch = 0
+        self.max_batch_time = 0
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="snapshot", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=10)
+            self.thread = None
+
+    def _run(self):
+        # First copy right away so readers have a replica soon after boot
+        while True:
+            self.take_snapshot()
+            if self.stop_event.wait(self.config.snapshot.interval):
+                break
+
+    def take_snapshot(self):
+        snapshot = self.config.snapshot
+        target = snapshot.file
+        temp_path = target + '.tmp'
+        started = time.time()
+        progress = {'last': None, 'remaining': None, 'busy': False, 'total': 0}
+
+        def on_progress(status, remaining, total):
+            # Called after every batch, with the source lock already released
+            if not progress['busy']:
+                self.max_batch_time = max(self.max_batch_time, time.monotonic() - progress['last'])
+            # The writer held the lock - SQLite waits `sleep` before the next try
+            progress['busy'] = status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+            if progress['remaining'] is not None and remaining > progress['remaining']:
+                raise SnapshotRestarted()
+            progress['remaining'] = remaining
+            progress['total'] = total
+            # Room for the writer between batches
+            if remaining and self.stop_event.wait(snapshot.pause):
+                raise SnapshotRestarted()
+            progress['last'] = time.monotonic()
+
+        source = None
+        destination = None
+        restarts = 0
+        pages = snapshot.pages
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            source = sqlite3.connect(self.source, timeout=self.config.database.connection_timeout)
+            destination = sqlite3.connect(temp_path)
+            while True:
+                progress.update(last=time.monotonic(), remaining=None, busy=False)
+                try:
+                    source.backup(destination, pages=pages, progress=on_progress, sleep=snapshot.pause)
+                    break
+                except SnapshotRestarted:
+                    if self.stop_event.is_set() or restarts >= snapshot.max_restarts:
+                        raise
+                    # A write restarted the copy - bigger batches finish before the next one
+                    restarts += 1
+                    self.restarts += 1
+                    pages *= 2
+            destination.close()
+            destination = None
+            os.replace(temp_path, target)
+
+            self.snapshots += 1
+            self.last_time = time.time()
+            self.last_duration = self.last_time - started
+            self.last_pages = progress['total']
+            self.last_batch = pages
+            return True
+        except SnapshotRestarted:
+            self.abandoned += 1
+            if not self.stop_event.is_set():
+                print(f"Snapshot abandoned after {restarts} restarts - database busy")
+            return False
+        except Exception as e:
+            self.errors += 1
+            print(f"Snapshot error: {e}")
+            return False
+        finally:
+            if destination is not None:
+                destination.close()
+            if source is not None:
+                source.close()
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def get_statistics(self):
+        return {
+            'snapshots': self.snapshots,
+            'abandoned': self.abandoned,
+            'errors': self.errors,
+            'restarts': self.restarts,
+            'age': time.time() - self.last_time if self.last_time else None,
+            'duration': self.last_duration,
+            'pages': self.last_pages,
+            'batch': self.last_batch,
+            'max_batch_time': self.max_batch_time
+        }
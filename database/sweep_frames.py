@@ -0,0 +1,174 @@
+# Sweep frames - one packed row per servo pass instead of one row per reading
+import sys
+import time
+import zlib
+from array import array
+
+# Distances are stored as uint16 millimetres, 0 = no echo
+DISTANCE_SCALE = 10
+MAX_STORED = 0xFFFF
+
+# Encoding flags (sweep_frames.encoding)
+ENCODING_RAW = 0
+ENCODING_DELTA = 1   # First value, then differences modulo 2^16
+ENCODING_ZLIB = 2    # Payload compressed after delta/raw packing
+
+def pack_distance(distance):
+    if distance is None or distance <= 0:
+        return 0
+    return min(MAX_STORED, int(round(distance * DISTANCE_SCALE)))
+
+def encode_distances(values, delta=True, compress=True):
+    """Pack uint16 values into a BLOB - returns (blob, encoding)"""
+    packed = array('H', values)
+    encoding = ENCODING_RAW
+
+    if delta and len(packed) > 1:
+        previous = packed[0]
+        for i in range(1, len(packed)):
+            current = packed[i]
+            packed[i] = (current - previous) & MAX_STORED
+            previous = current
+        encoding |= ENCODING_DELTA
+
+    # Stored little-endian regardless of the host
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    blob = packed.tobytes()
+
+    if compress:
+        compressed = zlib.compress(blob, 6)
+        if len(compressed) < len(blob):
+            blob = compressed
+            encoding |= ENCODING_ZLIB
+
+    return blob, encoding
+
+def decode_distances(blob, encoding):
+    """Stored values as a NumPy uint16 array (millimetres, 0 = no echo)"""
+    import numpy as np
+
+    if encoding & ENCODING_ZLIB:
+        blob = zlib.decompress(blob)
+    values = np.frombuffer(blob, dtype='<u2')
+    if encoding & ENCODING_DELTA:
+        # uint16 accumulation wraps exactly like the encoder
+        values = np.cumsum(values, dtype=np.uint16)
+    return values.astype(np.uint16)
+
+def frame_to_arrays(frame):
+    """(timestamps, angles, distances_cm) for a sweep_frames row given as a dict
+
+    No-echo readings come back as NaN so they drop out of NumPy statistics.
+    """
+    import numpy as np
+
+    count = frame['count']
+    raw = decode_distances(frame['distances'], frame['encoding'])
+    distances = raw.astype(np.float32) / DISTANCE_SCALE
+    distances[raw == 0] = np.nan
+    if frame.get('angles') is not None:
+        angles = np.frombuffer(frame['angles'], dtype=np.uint8).astype(np.int16)
+    else:
+        angles = frame['angle_start'] + frame['angle_step'] * np.arange(count, dtype=np.int16)
+    timestamps = np.linspace(frame['start_time'], frame['end_time'], count)
+    return timestamps, angles, distances
+
+def frames_to_arrays(frames):
+    """Concatenate many frames into flat (timestamps, angles, distances_cm) arrays"""
+    import numpy as np
+
+    parts = [frame_to_arrays(frame) for frame in frames]
+    if not parts:
+        empty = np.empty(0)
+        return empty, empty.astype(np.int16), empty.astype(np.float32)
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+def encode_angles(angles):
+    """Angles of an explicit-order frame, one byte each"""
+    return array('B', angles).tobytes()
+
+class SweepFrameBuilder:
+    """Collects evenly stepped readings and hands back finished frames
+
+    A frame ends when a reading does not continue the current angle step
+    (direction change, step change, parking) or the frame is full. Readings
+    added with explicit_angles (sweep patterns that jump around) keep their
+    angles in the frame instead, so a whole pattern cycle still fits one row.
+    """
+
+    def __init__(self, max_readings=256):
+        self.max_readings = max_readings
+        self._reset()
+
+    def _reset(self):
+        self.start_time = None
+        self.end_time = None
+        self.angle_start = None
+        self.angle_step = None
+        self.values = []
+        self.angles = None
+        self.alert_count = 0
+        self.scan_mode = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def _continues(self, angle, scan_mode, explicit_angles):
+        if not self.values:
+            return True
+        if scan_mode != self.scan_mode or len(self.values) >= self.max_readings:
+            return False
+        if explicit_angles != (self.angles is not None):
+            return False
+        if explicit_angles or self.angle_step is None:
+            return True
+        return angle == self.angle_start + self.angle_step * len(self.values)
+
+    def add(self, angle, distance, alert, scan_mode, now=None, explicit_angles=False):
+        """Add one reading - returns a finished frame dict or None"""
+        if now is None:
+            now = time.time()
+        angle = int(angle)
+
+        finished = None
+        if not self._continues(angle, scan_mode, explicit_angles):
+            finished = self.flush()
+
+        if not self.values:
+            self.start_time = now
+            self.angle_start = angle
+            self.scan_mode = scan_mode
+            if explicit_angles:
+                self.angles = []
+        elif self.angle_step is None and not explicit_angles:
+            self.angle_step = angle - self.angle_start
+
+        if explicit_angles:
+            self.angles.append(angle)
+
+        self.values.append(pack_distance(distance))
+        self.end_time = now
+        if alert:
+            self.alert_count += 1
+
+        return finished
+
+    def flush(self):
+        """Finish the current frame (None when empty)"""
+        if not self.values:
+            return None
+
+        frame = {
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'angle_start': self.angle_start,
+            'angle_step': self.angle_step or 0,
+            'count': len(self.values),
+            'values': self.values,
+            'angles': self.angles,
+            'alert_count': self.alert_count,
+            'scan_mode': self.scan_mode
+        }
+        self._reset()
+        return frame
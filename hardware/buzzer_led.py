@@ -1,10 +1,11 @@
 #Buzzer and Led Control
 import time
-from config import AUDIO
+from runtime_config import get_config
 
 class BuzzerLED:
-    def __init__(self, gpio_controller):
+    def __init__(self, gpio_controller, config=None):
         self.gpio = gpio_controller
+        self.config = config or get_config()
     
     def led_on(self, led_type='LED'):
         return self.gpio.write_pin(led_type, True)
@@ -18,6 +19,10 @@ class BuzzerLED:
     def buzzer_off(self):
         return self.gpio.write_pin('BUZZER', False)
     
+    def status_and_buzzer(self, state):
+        """Status LED and buzzer switched together in one GPIO call"""
+        return self.gpio.write_pins({'STATUS_LED': state, 'BUZZER': state})
+    
     def beep(self, duration=0.1, pause=0.05):
         """Single beep sound"""
         self.buzzer_on()
@@ -45,13 +50,11 @@ class BuzzerLED:
             self.led_blink('STATUS_LED', 1, 0.1, 0.1)
         
         # Music sequence
-        for duration, pause in AUDIO['STARTUP_NOTES']:
-            self.led_on('STATUS_LED')
-            self.buzzer_on()
+        for duration, pause in self.config.audio.startup_notes:
+            self.status_and_buzzer(True)
             time.sleep(duration)
             
-            self.buzzer_off()
-            self.led_off('STATUS_LED')
+            self.status_and_buzzer(False)
             time.sleep(pause)
         
         # Final signal
@@ -64,13 +67,11 @@ class BuzzerLED:
     def shutdown_sequence(self):
         print("Playing shutdown sequence...")
         
-        for duration, pause in AUDIO['SHUTDOWN_NOTES']:
-            self.led_on('STATUS_LED')
-            self.buzzer_on()
+        for duration, pause in self.config.audio.shutdown_notes:
+            self.status_and_buzzer(True)
             time.sleep(duration)
             
-            self.buzzer_off()
-            self.led_off('STATUS_LED')
+            self.status_and_buzzer(False)
             time.sleep(pause)
         
         # Final blinking
@@ -79,35 +80,42 @@ class BuzzerLED:
         
         print("Shutdown sequence completed")
     
+    def warm_start_signal(self):
+        """Short chirp instead of the startup melody after a warm restart"""
+        self.status_and_buzzer(True)
+        time.sleep(0.05)
+        self.status_and_buzzer(False)
+    
+    def degraded_signal(self):
+        """Long-long-short - a device failed and is being skipped"""
+        for duration, pause in self.config.audio.degraded_notes:
+            self.status_and_buzzer(True)
+            time.sleep(duration)
+            self.status_and_buzzer(False)
+            time.sleep(pause)
+    
     def system_start_signal(self):
         for _ in range(2):
-            self.led_on('STATUS_LED')
-            self.buzzer_on()
+            self.status_and_buzzer(True)
             time.sleep(0.15)
-            self.led_off('STATUS_LED')
-            self.buzzer_off()
+            self.status_and_buzzer(False)
             time.sleep(0.1)
     
     def system_pause_signal(self):
-        self.led_on('STATUS_LED')
-        self.buzzer_on()
+        self.status_and_buzzer(True)
         time.sleep(0.5)
-        self.led_off('STATUS_LED')
-        self.buzzer_off()
+        self.status_and_buzzer(False)
     
     def mode_change_signal(self):
         for _ in range(3):
-            self.led_on('STATUS_LED')
-            self.buzzer_on()
+            self.status_and_buzzer(True)
             time.sleep(0.1)
-            self.led_off('STATUS_LED')
-            self.buzzer_off()
+            self.status_and_buzzer(False)
             time.sleep(0.1)
     
     def alert_signal(self, direction_code):
-        from config import DIRECTION
-        
-        pattern = DIRECTION['BEEP_PATTERNS'].get(direction_code, [(0.15, 0.05)])
+        direction = self.config.direction
+        pattern = direction.beep_patterns.get(direction_code, direction.default_pattern)
         
         # LED and buzzer together
         self.led_on('LED')
@@ -123,5 +131,4 @@ class BuzzerLED:
     def all_off(self):
         """Turn off all LEDs and buzzer"""
         self.led_off('LED')
-        self.led_off('STATUS_LED')
-        self.buzzer_off()
\ No newline at end of file
+        self.status_and_buzzer(False)
\ No newline at end of file
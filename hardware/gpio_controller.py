@@ -1,11 +1,27 @@
 #GPIO controller
 
 import RPi.GPIO as GPIO
+import threading
 import time
-from config import PINS
+from runtime_config import get_config
+
+# Output pins driven low at startup and cleanup
+OUTPUT_PINS = ('TRIG', 'LED', 'BUZZER', 'STATUS_LED')
 
 class GPIOController:
-    def __init__(self):
+    def __init__(self, config=None, pin_names=None):
+        self.config = config or get_config()
+        # Pins are fixed for the lifetime of the controller, reloads do not move them
+        self.pins = self.config.pins
+        # Only these pins are set up and cleaned up - lets two processes share the header
+        self.pin_names = tuple(pin_names) if pin_names else tuple(self.pins)
+        # Shadow copy of the output levels - writes that change nothing are skipped
+        self.output_state = {}
+        # Button callback, scan loop, alert and control threads all write outputs -
+        # the shadow compare, the hardware write and the shadow update happen under this lock
+        self.output_lock = threading.Lock()
+        self.write_counts = {pin_name: 0 for pin_name in self.pin_names}
+        self.skipped_writes = {pin_name: 0 for pin_name in self.pin_names}
         self.initialized = False
         self.setup_gpio()
     
@@ -14,22 +30,25 @@ class GPIOController:
             GPIO.setmode(GPIO.BCM)
             GPIO.setwarnings(False)
             
+            pins = self.pins
+            owned = self.pin_names
+            
             # Input pins
-            GPIO.setup(PINS['ECHO'], GPIO.IN)
-            GPIO.setup(PINS['BUTTON'], GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            if 'ECHO' in owned:
+                GPIO.setup(pins['ECHO'], GPIO.IN)
+            if 'BUTTON' in owned:
+                GPIO.setup(pins['BUTTON'], GPIO.IN, pull_up_down=GPIO.PUD_UP)
             
             # Output pins
-            GPIO.setup(PINS['TRIG'], GPIO.OUT)
-            GPIO.setup(PINS['LED'], GPIO.OUT)
-            GPIO.setup(PINS['BUZZER'], GPIO.OUT)
-            GPIO.setup(PINS['SERVO'], GPIO.OUT)
-            GPIO.setup(PINS['STATUS_LED'], GPIO.OUT)
+            for pin_name in ('TRIG', 'LED', 'BUZZER', 'SERVO', 'STATUS_LED'):
+                if pin_name in owned:
+                    GPIO.setup(pins[pin_name], GPIO.OUT)
             
             # Initial 
-            GPIO.output(PINS['TRIG'], False)
-            GPIO.output(PINS['LED'], False)
-            GPIO.output(PINS['BUZZER'], False)
-            GPIO.output(PINS['STATUS_LED'], False)
+            for pin_name in OUTPUT_PINS:
+                if pin_name in owned:
+                    GPIO.output(pins[pin_name], False)
+                    self.output_state[pin_name] = False
             
             self.initialized = True
             print("GPIO pins initialized successfully")
@@ -42,7 +61,7 @@ class GPIOController:
         if not self.initialized:
             return None
         try:
-            return GPIO.input(PINS[pin_name])
+            return GPIO.input(self.pins[pin_name])
         except Exception as e:
             print(f"Error reading pin {pin_name}: {e}")
             return None
@@ -50,18 +69,59 @@ class GPIOController:
     def write_pin(self, pin_name, state):
         if not self.initialized:
             return False
+        with self.output_lock:
+            return self._write_states({pin_name: state})
+    
+    def write_pins(self, states):
+        """Set several outputs in one library call, e.g. {'LED': True, 'BUZZER': True}"""
+        if not self.initialized:
+            return False
+        with self.output_lock:
+            return self._write_states(states)
+    
+    def _write_states(self, states):
+        """Write the outputs whose shadow level differs - caller holds output_lock"""
+        changed = []
+        for pin_name, state in states.items():
+            state = bool(state)
+            if self.output_state.get(pin_name) is state:
+                self.skipped_writes[pin_name] += 1
+            else:
+                changed.append((pin_name, state))
+        
+        if not changed:
+            return True
+        
         try:
-            GPIO.output(PINS[pin_name], state)
+            if len(changed) == 1:
+                GPIO.output(self.pins[changed[0][0]], changed[0][1])
+            else:
+                GPIO.output([self.pins[pin_name] for pin_name, _ in changed],
+                            [state for _, state in changed])
+            for pin_name, state in changed:
+                self.output_state[pin_name] = state
+                self.write_counts[pin_name] += 1
             return True
         except Exception as e:
-            print(f"Error writing to pin {pin_name}: {e}")
+            # Level unknown now - the next write goes to the hardware
+            for pin_name, _ in changed:
+                self.output_state.pop(pin_name, None)
+            print(f"Error writing to pins {', '.join(pin_name for pin_name, _ in changed)}: {e}")
             return False
     
+    def get_write_statistics(self):
+        """Hardware writes and skipped no-op writes per pin"""
+        return {
+            pin_name: {'writes': self.write_counts[pin_name], 'skipped': self.skipped_writes[pin_name]}
+            for pin_name in self.pin_names
+            if self.write_counts[pin_name] or self.skipped_writes[pin_name]
+        }
+    
     def setup_interrupt(self, pin_name, callback, edge=GPIO.FALLING, bouncetime=300):
         if not self.initialized:
             return False
         try:
-            GPIO.add_event_detect(PINS[pin_name], edge, callback=callback, bouncetime=bouncetime)
+            GPIO.add_event_detect(self.pins[pin_name], edge, callback=callback, bouncetime=bouncetime)
             return True
         except Exception as e:
             print(f"Error setting up interrupt for {pin_name}: {e}")
@@ -69,17 +129,23 @@ class GPIOController:
     
     def remove_interrupt(self, pin_name):
         try:
-            GPIO.remove_event_detect(PINS[pin_name])
+            GPIO.remove_event_detect(self.pins[pin_name])
         except Exception as e:
             print(f"Error removing interrupt for {pin_name}: {e}")
     
     def cleanup(self):
         if self.initialized:
             try:
-                for pin_name in ['LED', 'BUZZER', 'STATUS_LED', 'TRIG']:
-                    self.write_pin(pin_name, False)
-                
-                GPIO.cleanup()
+                with self.output_lock:
+                    self._write_states({pin_name: False for pin_name in OUTPUT_PINS
+                                        if pin_name in self.pin_names})
+                    
+                    if len(self.pin_names) == len(self.pins):
+                        GPIO.cleanup()
+                    else:
+                        GPIO.cleanup([self.pins[pin_name] for pin_name in self.pin_names])
+                    self.initialized = False
+                    self.output_state.clear()
                 print("GPIO cleanup completed")
             except Exception as e:
                 print(f"GPIO cleanup error: {e}")
@@ -1,52 +1,74 @@
 #Servo motor controller
 import RPi.GPIO as GPIO
 import time
-from config import PINS, SERVO
+from runtime_config import get_config
+from core.health import CircuitBreaker
+from core.sweep_patterns import build_pattern, move_time, priority_angles
 
 class ServoMotor:
-    def __init__(self, gpio_controller):
+    def __init__(self, gpio_controller, config=None, breaker=None):
         self.gpio = gpio_controller
+        self.config = config or get_config()
+        self.breaker = breaker or CircuitBreaker('servo', self.config)
         self.pwm = None
         self.current_angle = 90
         self.setup_servo()
         
     def setup_servo(self):
         try:
-            self.pwm = GPIO.PWM(PINS['SERVO'], SERVO['PWM_FREQUENCY'])
+            self.pwm = GPIO.PWM(self.gpio.pins['SERVO'], self.config.servo.pwm_frequency)
             self.pwm.start(0)
             print("Servo motor initialized")
         except Exception as e:
             print(f"Servo initialization error: {e}")
         
     def set_angle(self, angle):
-        if not self.pwm:
+        if not self.pwm or not self.breaker.allow():
             return False
             
+        servo = self.config.servo
+        
         # Limit angle to valid range
-        angle = max(SERVO['MIN_ANGLE'], min(SERVO['MAX_ANGLE'], angle))
+        angle = max(servo.min_angle, min(servo.max_angle, angle))
             
         try:
-            # Calculate duty cycle (for SG90 servo)
-            duty_cycle = 2 + (angle / 180) * 10
+            # Duty cycle (for SG90 servo) - precomputed for whole angles
+            try:
+                duty_cycle = servo.duty_table[angle]
+            except (IndexError, TypeError):
+                duty_cycle = 2 + (angle / 180) * 10
                 
             self.pwm.ChangeDutyCycle(duty_cycle)
-            time.sleep(SERVO['SPEED_DELAY'])
+            # Long jumps need longer before the pulses stop
+            time.sleep(move_time(angle - self.current_angle, servo))
                 
             # Stop PWM to reduce servo jitter
             self.pwm.ChangeDutyCycle(0)
                 
             self.current_angle = angle
+            self.breaker.record_success()
             return True
                 
         except Exception as e:
             print(f"Servo angle setting error: {e}")
+            self.breaker.record_failure('error')
             return False
         
-    def sweep(self, start_angle=None, end_angle=None, step=None):
-        """Angle scanning"""
-        start_angle = start_angle or SERVO['MIN_ANGLE']
-        end_angle = end_angle or SERVO['MAX_ANGLE']
-        step = step or SERVO['STEP']
+    def move_time(self, angle):
+        """How long set_angle(angle) will take from the current position"""
+        return move_time(angle - self.current_angle, self.config.servo)
+    
+    def sweep(self, start_angle=None, end_angle=None, step=None, pattern='linear'):
+        """Angle scanning - one cycle of the given pattern (see core.sweep_patterns)"""
+        servo = self.config.servo
+        start_angle = start_angle or servo.min_angle
+        end_angle = end_angle or servo.max_angle
+        step = step or servo.step
+        
+        if pattern != 'linear':
+            sweep = self.config.sweep
+            return list(build_pattern(pattern, start_angle, end_angle, step, sweep.coarse_step,
+                                      priority_angles(self.config), sweep.priority_stride))
             
         angles = []
             
@@ -66,8 +88,7 @@ class ServoMotor:
         
     def move_to_center(self):
         """Go to center position"""
-        center = (SERVO['MIN_ANGLE'] + SERVO['MAX_ANGLE']) // 2
-        return self.set_angle(center)
+        return self.set_angle(self.config.servo.center_angle)
         
     def get_current_angle(self):
         """Return current angle"""
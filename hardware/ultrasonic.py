@@ -1,14 +1,25 @@
 # Ultrasonic sensor control 
 import time
-from config import DISTANCE
+from runtime_config import get_config
+from core.health import CircuitBreaker
 
 class UltrasonicSensor:
-    def __init__(self, gpio_controller):
+    def __init__(self, gpio_controller, config=None, breaker=None):
         self.gpio = gpio_controller
+        self.config = config or get_config()
+        self.breaker = breaker or CircuitBreaker('sensor', self.config)
         self.last_distance = 0
+        self.last_error = None  # 'timeout', 'out_of_range', 'error' or 'circuit_open' for the last -1
         
     def measure_distance(self):
+        # A disconnected sensor is not pinged again until the next probe
+        if not self.breaker.allow():
+            self.last_error = 'circuit_open'
+            return -1
+        
         try:
+            echo_timeout = self.config.distance.echo_timeout
+            
             # Send trigger signal
             self.gpio.write_pin('TRIG', True)
             time.sleep(0.00001)  # 10 microseconds
@@ -16,38 +27,51 @@ class UltrasonicSensor:
             
             # Wait for echo start
             timeout_start = time.time()
+            start_time = timeout_start
             while self.gpio.read_pin('ECHO') == 0:
-                if time.time() - timeout_start > 1:
-                    return -1
                 start_time = time.time()
+                if start_time - timeout_start > echo_timeout:
+                    return self._failed('timeout')
                 
-            # Wait for echo end
+            # Wait for echo end - no echo at all still ends after about 38ms
+            end_time = start_time
             while self.gpio.read_pin('ECHO') == 1:
                 end_time = time.time()
-                if end_time - start_time > 1:
-                    return -1
+                if end_time - start_time > echo_timeout:
+                    return self._failed('timeout')
                 
             # Distance calculation
             duration = end_time - start_time
             distance = (duration * 34300) / 2  # Speed of sound: 343 m/s
+            
+            # The sensor answered - out of range is not a fault
+            self.breaker.record_success()
                 
             # Valid range check
-            if DISTANCE['MIN_VALID'] <= distance <= DISTANCE['MAX_VALID']:
+            limits = self.config.distance
+            if limits.min_valid <= distance <= limits.max_valid:
                 self.last_distance = distance
+                self.last_error = None
                 return round(distance, 2)
             else:
+                self.last_error = 'out_of_range'
                 return -1
                 
         except Exception as e:
             print(f"Distance measurement error: {e}")
-            return -1
+            return self._failed('error')
+    
+    def _failed(self, reason):
+        self.last_error = reason
+        self.breaker.record_failure(reason)
+        return -1
         
     def is_object_detected(self, distance=None):
         if distance is None:
             distance = self.measure_distance()
                 
         if distance > 0:
-            return distance < DISTANCE['THRESHOLD']
+            return distance < self.config.distance.threshold
         return False
         
     def get_last_distance(self):
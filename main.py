@@ -19,10 +19,25 @@ from database.db_manager import DatabaseManager
 from core.direction import DirectionDetector
 from core.button_handler import ButtonHandler
 from core.scanner import Scanner
-from config import SYSTEM
+from core.alert_manager import AlertManager
+from core.activity_governor import ActivityGovernor
+from core.pipeline import MeasurementPipeline
+from core.control_server import ControlServer
+from core.health import HealthMonitor
+from database.snapshot import SnapshotService
+from core.checkpoint import Checkpointer, load_checkpoint, clear_checkpoint, CHECKPOINT_VERSION
+from core.acquisition import AcquisitionProcess, ACQUISITION_PINS
+from runtime_config import get_config, ConfigWatcher, RESTART_SECTIONS
 
 class ObjectDetectionSystem:
-    def __init__(self):
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.config_watcher = None
+        self.checkpointer = None
+        self.snapshots = None
+        self.control_server = None
+        self.acquisition = None
+        self.health = None
         self.gpio = None
         self.servo = None
         self.ultrasonic = None
@@ -30,31 +45,54 @@ class ObjectDetectionSystem:
         self.db = None
         self.direction = None
         self.button_handler = None
+        self.alert_manager = None
+        self.governor = None
+        self.pipeline = None
         self.scanner = None
         self.initialized = False
     
-    def initialize(self):
-        """System initialization"""
+    def initialize(self, warm_state=None):
+        """System initialization - a warm restart skips the schema check"""
         print("Initializing Object Detection System...")
         
         try:
             # Hardware components
-            self.gpio = GPIOController()
+            cfg = self.config
+            self.health = HealthMonitor(cfg)
+            if cfg.acquisition.separate_process:
+                # Servo and ranging live in their own process
+                self.acquisition = AcquisitionProcess(cfg)
+                self.acquisition.start()
+                local_pins = [name for name in cfg.pins if name not in ACQUISITION_PINS]
+                self.gpio = GPIOController(cfg, pin_names=local_pins)
+            else:
+                self.gpio = GPIOController(cfg)
             if not self.gpio.initialized:
                 raise Exception("GPIO initialization failed")
             
-            self.servo = ServoMotor(self.gpio)
-            self.ultrasonic = UltrasonicSensor(self.gpio)
-            self.buzzer_led = BuzzerLED(self.gpio)
+            if not self.acquisition:
+                self.servo = ServoMotor(self.gpio, cfg, self.health.breaker('servo'))
+                self.ultrasonic = UltrasonicSensor(self.gpio, cfg, self.health.breaker('sensor'))
+            self.buzzer_led = BuzzerLED(self.gpio, cfg)
             
             # Database
-            self.db = DatabaseManager()
+            self.db = DatabaseManager(cfg, check_schema=warm_state is None,
+                                      breaker=self.health.breaker('database'))
+            self.health.set_callback('degraded', self.device_degraded)
+            self.health.set_callback('recovered', self.device_recovered)
             
             # Core components
-            self.direction = DirectionDetector()
-            self.button_handler = ButtonHandler(self.gpio, self.buzzer_led)
+            self.direction = DirectionDetector(cfg)
+            self.button_handler = ButtonHandler(self.gpio, self.buzzer_led, cfg)
+            self.alert_manager = AlertManager(cfg)
+            self.governor = ActivityGovernor(cfg)
+            self.pipeline = MeasurementPipeline(self.direction, self.alert_manager,
+                                                self.buzzer_led, self.db, cfg)
+            if cfg.pipeline.enabled:
+                self.pipeline.start()
             self.scanner = Scanner(self.servo, self.ultrasonic, self.buzzer_led, 
-                                 self.direction, self.db)
+                                 self.direction, self.db, self.alert_manager, cfg,
+                                 self.governor, self.pipeline, self.health)
             
             # Setup button interrupt
             if not self.button_handler.setup_interrupt():
@@ -70,20 +108,20 @@ class ObjectDetectionSystem:
     
     def show_system_info(self):
         """Show system information"""
-        from config import PINS, SERVO, DISTANCE, DIRECTION
+        cfg = self.config
         
         print("=" * 70)
         print("SMART GLASSES FOR BLIND SYSTEM")
         print("=" * 70)
-        print(f"Detection Range: {DISTANCE['THRESHOLD']}cm threshold")
-        print(f"Servo Range: {SERVO['MIN_ANGLE']}° to {SERVO['MAX_ANGLE']}°")
-        print(f"Step Size: {SERVO['STEP']}° per movement")
-        print(f"Control Button: GPIO{PINS['BUTTON']}")
+        print(f"Detection Range: {cfg.distance.threshold}cm threshold")
+        print(f"Servo Range: {cfg.servo.min_angle}° to {cfg.servo.max_angle}°")
+        print(f"Step Size: {cfg.servo.step}° per movement")
+        print(f"Control Button: GPIO{cfg.pins.button}")
         print("Direction Zones:")
         
-        for zone_name, zone_info in DIRECTION['ZONES'].items():
+        for zone_name, zone_info in cfg.direction.zones.items():
             print(f"   • {zone_name} ({zone_info['min']}-{zone_info['max']}°): "
-                  f"{len(DIRECTION['BEEP_PATTERNS'][zone_info['code']])} beeps")
+                  f"{len(cfg.direction.beep_patterns[zone_info['code']])} beeps")
         
         print("\nControls:")
         print("   • Short Press: Start/Stop system")
@@ -93,8 +131,9 @@ class ObjectDetectionSystem:
     def startup_sequence(self):
         """Startup sequence"""
         # Servo to center position
-        self.servo.move_to_center()
-        time.sleep(SYSTEM['STARTUP_DELAY'])
+        if self.servo:
+            self.servo.move_to_center()
+        time.sleep(self.config.system.startup_delay)
         
         # Sound and light show
         self.buzzer_led.startup_sequence()
@@ -102,18 +141,120 @@ class ObjectDetectionSystem:
         print("System ready! Press button to start scanning...")
         print("Status: STANDBY (Press button to begin)")
     
+    def device_degraded(self, name, reason):
+        """A breaker tripped - tell the user, the device is skipped until it answers again"""
+        self.buzzer_led.degraded_signal()
+        self.db.log_system_event("DEVICE_DEGRADED", f"{name} failing ({reason})", "AUTO")
+    
+    def device_recovered(self, name):
+        self.db.log_system_event("DEVICE_RECOVERED", f"{name} working again", "AUTO")
+    
+    def collect_state(self):
+        """Runtime state worth resuming after a crash or watchdog restart"""
+        state = self.button_handler.get_system_state()
+        return {
+            'version': CHECKPOINT_VERSION,
+            'saved_at': time.time(),
+            'running': state['running'],
+            'auto_mode': state['auto_mode'],
+            'scanner': self.scanner.get_state(),
+            'recent': self.db.recent.snapshot(self.config.checkpoint.recent_readings)
+        }
+    
+    def restore_state(self, state):
+        """Resume from a checkpoint instead of the cold start path"""
+        button = self.button_handler
+        button.system_running = state['running']
+        button.auto_mode = state['auto_mode']
+        button.manual_mode = not state['auto_mode']
+        self.scanner.restore_state(state['scanner'])
+        self.db.recent.restore(state['recent'])
+        
+        self.buzzer_led.warm_start_signal()
+        mode_text = "AUTO SCAN" if state['auto_mode'] else "MANUAL CONTROL"
+        status = "running" if state['running'] else "paused"
+        print(f"Warm restart: {mode_text}, {status}, sweep at {self.scanner.current_angle}°")
+    
+    def start_checkpointer(self):
+        checkpoint = self.config.checkpoint
+        if not checkpoint.enabled:
+            return
+        
+        self.checkpointer = Checkpointer(checkpoint.file, self.collect_state,
+                                         checkpoint.interval, checkpoint.refresh)
+        self.checkpointer.start()
+    
+    def start_snapshots(self):
+        if not self.config.snapshot.enabled:
+            return
+        
+        self.snapshots = SnapshotService(self.config)
+        self.snapshots.start()
+    
+    def start_control_server(self):
+        if not self.config.control.enabled:
+            return
+        
+        self.control_server = ControlServer(self, self.config)
+        if self.control_server.start():
+            # Pushed readings leave through their own drop_oldest sink
+            self.scanner.add_sink('control', self.control_server.reading_sink)
+            self.scanner.set_callback('trend_alert', self.control_server.trend_alert)
+        else:
+            self.control_server = None
+    
+    def apply_config(self, new_config):
+        """Hand a reloaded configuration to every component"""
+        restart_needed = [name for name in new_config.changed_sections(self.config)
+                          if name in RESTART_SECTIONS]
+        if restart_needed:
+            print(f"Changes to {', '.join(restart_needed)} take effect after restart")
+        
+        self.config = new_config
+        
+        # Plain attribute swaps - the scan loop picks them up on its next step
+        breakers = tuple(self.health.breakers.values()) if self.health else ()
+        background = self.pipeline.background if self.pipeline else None
+        quantiles = self.db.quantiles if self.db else None
+        for component in (self.gpio, self.servo, self.ultrasonic, self.buzzer_led, self.db,
+                          self.direction, self.button_handler, self.alert_manager, self.governor,
+                          self.pipeline, self.scanner, self.control_server, self.health,
+                          self.snapshots, background, quantiles) + breakers:
+            if component is not None:
+                component.config = new_config
+        
+        # The acquisition process holds its own copy - it is sent over
+        if self.acquisition:
+            self.acquisition.apply_config(new_config)
+    
+    def start_config_watcher(self):
+        runtime = self.config.runtime
+        if not runtime.hot_reload or not runtime.config_file:
+            return
+        
+        self.config_watcher = ConfigWatcher(runtime.config_file, self.apply_config,
+                                            runtime.reload_interval)
+        self.config_watcher.start()
+        print(f"Watching {runtime.config_file} for configuration changes")
+    
     def main_loop(self):
         """Main operation loop"""
         print("System initialized. Waiting for user input...")
         
         try:
+            if self.acquisition:
+                # Readings arrive from the acquisition process
+                self.acquisition.run_consumer(self.scanner, self.button_handler)
+                self.shutdown()
+                return
+            
             while True:
                 state = self.button_handler.get_system_state()
                 
                 if not state['running']:
-                    # System pause state
+                    # System pause state - sleep until the button changes something
                     self.buzzer_led.status_blink(False)
-                    time.sleep(0.8)
+                    self.governor.wait_for_state_change(self.button_handler)
                     continue
                 
                 if state['auto_mode']:
@@ -130,19 +271,48 @@ class ObjectDetectionSystem:
             self.shutdown()
         except Exception as e:
             print(f"Unexpected error: {e}")
-            self.shutdown()
+            # Keep the checkpoint so a restart resumes where this run failed
+            self.shutdown(clean=False)
     
-    def shutdown(self):
+    def shutdown(self, clean=True):
         """System shutdown"""
         print("Shutting down system...")
         
+        if self.config_watcher:
+            self.config_watcher.stop()
+        
+        if self.checkpointer:
+            self.checkpointer.stop()
+            if clean:
+                clear_checkpoint(self.checkpointer.path)
+        
+        if self.control_server:
+            self.control_server.stop()
+        
+        if self.snapshots:
+            self.snapshots.stop()
+        
+        # Pending device warnings play before the shutdown sequence
+        if self.health:
+            self.health.stop()
+        
         # Servo to center position
         if self.servo:
             self.servo.move_to_center()
             time.sleep(1)
         
+        # Stop the acquisition process (it centers and releases the servo itself)
+        if self.acquisition:
+            self.acquisition.stop()
+        
+        # Let queued readings reach the alert stage and the database
+        if self.pipeline:
+            self.pipeline.stop()
+        
         # Final database operations
         if self.db:
+            self.db.flush_sweep_frame()
+            self.db.save_quantiles()
             self.db.log_system_event("SYSTEM_SHUTDOWN", "System shutdown by user", "MANUAL")
             self.scanner._show_dashboard()  # Final dashboard
         
@@ -168,18 +338,36 @@ class ObjectDetectionSystem:
     
     def run(self):
         """Main execution function"""
-        if not self.initialize():
+        checkpoint = self.config.checkpoint
+        warm_state = None
+        if checkpoint.enabled:
+            warm_state = load_checkpoint(checkpoint.file, checkpoint.max_age)
+        
+        if not self.initialize(warm_state):
             print("Failed to initialize system. Exiting...")
             return False
         
-        # Show system information
-        self.show_system_info()
-        
-        # Startup sequence
-        self.startup_sequence()
+        if warm_state:
+            # Crash or watchdog restart - pick up where the last run stopped
+            self.restore_state(warm_state)
+            self.db.log_system_event("SYSTEM_WARM_START", "Resumed from checkpoint", "AUTO")
+        else:
+            # Show system information
+            self.show_system_info()
+            
+            # Startup sequence
+            self.startup_sequence()
+            
+            # Log system start in system log
+            self.db.log_system_event("SYSTEM_START", "Object detection system started", "AUTO")
         
-        # Log system start in system log
-        self.db.log_system_event("SYSTEM_START", "Object detection system started", "AUTO")
+        # Device warnings off the scan loop, live configuration reload, runtime checkpoints,
+        # database snapshots and the control socket
+        self.health.start()
+        self.start_config_watcher()
+        self.start_checkpointer()
+        self.start_snapshots()
+        self.start_control_server()
         
         # Main loop
         self.main_loop()
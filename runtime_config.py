@@ -0,0 +1,404 @@
+"""
+Runtime configuration - frozen, validated settings with hot reload
+
+config.py holds the defaults. An optional JSON file (RUNTIME['CONFIG_FILE'])
+overrides any of them, e.g. {"DISTANCE": {"THRESHOLD": 60}}. The merged result
+is validated and frozen into a RuntimeConfig whose sections allow both
+dict-style (cfg.servo['STEP']) and attribute access (cfg.servo.step), plus
+values precomputed for the hot paths (duty table, zone table, seconds).
+"""
+import copy
+import json
+import os
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+
+import config
+
+# Sections that cannot change while the hardware and database are open
+RESTART_SECTIONS = ('PINS', 'DATABASE', 'PIPELINE', 'CONTROL')
+
+# Tables that accept new entries from the config file
+OPEN_TABLES = ('DIRECTION.ZONES', 'PIPELINE.STAGES')
+
+# Tables replaced as a whole (JSON cannot express their integer keys)
+REPLACED_TABLES = ('DIRECTION.BEEP_PATTERNS',)
+
+class ConfigError(ValueError):
+    """Raised when a configuration fails validation"""
+
+class ConfigSection(Mapping):
+    """Read-only view of one settings dict with attribute access"""
+
+    def __init__(self, name, values, derived=None):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_values', MappingProxyType(values))
+        for key, value in values.items():
+            object.__setattr__(self, key.lower(), value)
+        for key, value in (derived or {}).items():
+            object.__setattr__(self, key, value)
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"Config section '{self._name}' is read-only")
+
+    def __delattr__(self, key):
+        raise AttributeError(f"Config section '{self._name}' is read-only")
+
+    def __repr__(self):
+        return f"ConfigSection({self._name}, {dict(self._values)})"
+
+class RuntimeConfig:
+    """Immutable snapshot of all settings"""
+
+    def __init__(self, sections, source=None, version=0):
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, '_raw', sections)
+
+        frozen = {}
+        derived = _derive(sections)
+        for name, values in sections.items():
+            frozen[name] = ConfigSection(name, _freeze(values), derived.get(name))
+            object.__setattr__(self, name.lower(), frozen[name])
+        object.__setattr__(self, 'sections', MappingProxyType(frozen))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("RuntimeConfig is read-only")
+
+    def __delattr__(self, key):
+        raise AttributeError("RuntimeConfig is read-only")
+
+    def to_dict(self):
+        """Mutable deep copy of the settings - starting point for overrides"""
+        return copy.deepcopy(self._raw)
+
+    def changed_sections(self, other):
+        """Names of sections that differ from another config"""
+        return [name for name in self._raw if self._raw[name] != other._raw.get(name)]
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _derive(sections):
+    """Precompute values used on every ping, step and alert"""
+    derived = {}
+
+    distance = sections['DISTANCE']
+    servo = sections['SERVO']
+    system = sections['SYSTEM']
+    direction = sections['DIRECTION']
+    database = sections['DATABASE']
+
+    derived['SERVO'] = {
+        'center_angle': (servo['MIN_ANGLE'] + servo['MAX_ANGLE']) // 2,
+        # SG90 duty cycle for every whole angle
+        'duty_table': tuple(2 + (angle / 180) * 10 for angle in range(181))
+    }
+
+    derived['SYSTEM'] = {
+        'button_debounce_s': system['BUTTON_DEBOUNCE'] / 1000
+    }
+
+    # Zone lookup for every whole angle, first matching zone wins
+    zone_table = []
+    for angle in range(181):
+        zone = ('FRONT', 3)
+        for zone_info in direction['ZONES'].values():
+            if zone_info['min'] <= angle <= zone_info['max']:
+                zone = (zone_info['name'], zone_info['code'])
+                break
+        zone_table.append(zone)
+
+    derived['DIRECTION'] = {
+        'zone_table': tuple(zone_table),
+        'default_pattern': ((0.15, 0.05),)
+    }
+
+    derived['DATABASE'] = {
+        'path': os.path.join(database['FOLDER'], database['FILE'])
+    }
+
+    derived['ALERT'] = {
+        'enter_threshold': distance['THRESHOLD'],
+        'exit_threshold': distance['THRESHOLD'] + sections['ALERT']['EXIT_MARGIN']
+    }
+
+    return derived
+
+def _validate(sections):
+    errors = []
+
+    def check(condition, message):
+        if not condition:
+            errors.append(message)
+
+    try:
+        pins = sections['PINS']
+        check(all(isinstance(pin, int) and 0 <= pin <= 27 for pin in pins.values()),
+              "PINS must be BCM numbers between 0 and 27")
+        check(len(set(pins.values())) == len(pins), "PINS must not share a GPIO")
+
+        distance = sections['DISTANCE']
+        check(0 < distance['MIN_VALID'] < distance['MAX_VALID'],
+              "DISTANCE requires 0 < MIN_VALID < MAX_VALID")
+        check(distance['MIN_VALID'] < distance['THRESHOLD'] <= distance['MAX_VALID'],
+              "DISTANCE['THRESHOLD'] must lie inside the valid range")
+        check(distance['ECHO_TIMEOUT'] > 0, "DISTANCE['ECHO_TIMEOUT'] must be positive")
+
+        servo = sections['SERVO']
+        check(0 <= servo['MIN_ANGLE'] < servo['MAX_ANGLE'] <= 180,
+              "SERVO requires 0 <= MIN_ANGLE < MAX_ANGLE <= 180")
+        check(servo['STEP'] > 0, "SERVO['STEP'] must be positive")
+        check(servo['SPEED_DELAY'] >= 0, "SERVO['SPEED_DELAY'] must not be negative")
+        check(servo['PWM_FREQUENCY'] > 0, "SERVO['PWM_FREQUENCY'] must be positive")
+
+        system = sections['SYSTEM']
+        check(system['MEASUREMENT_INTERVAL'] >= 0, "SYSTEM['MEASUREMENT_INTERVAL'] must not be negative")
+        check(system['BUTTON_DEBOUNCE'] >= 0, "SYSTEM['BUTTON_DEBOUNCE'] must not be negative")
+        check(system['LONG_PRESS_TIME'] > 0, "SYSTEM['LONG_PRESS_TIME'] must be positive")
+
+        direction = sections['DIRECTION']
+        for zone_name, zone_info in direction['ZONES'].items():
+            check(0 <= zone_info['min'] <= zone_info['max'] <= 180,
+                  f"Zone {zone_name} must satisfy 0 <= min <= max <= 180")
+            check(zone_info['code'] in direction['BEEP_PATTERNS'],
+                  f"Zone {zone_name} has no beep pattern for code {zone_info['code']}")
+
+        check(all(value >= 0 for value in sections['ALERT'].values()),
+              "ALERT settings must not be negative")
+
+        scheduler = sections['SCHEDULER']
+        check(scheduler['POLICY'] in ('catch_up', 'skip'),
+              "SCHEDULER['POLICY'] must be 'catch_up' or 'skip'")
+        check(scheduler['SETTLE_TIME'] >= 0, "SCHEDULER['SETTLE_TIME'] must not be negative")
+        check(scheduler['LATENESS_HISTORY'] > 0, "SCHEDULER['LATENESS_HISTORY'] must be positive")
+        check(scheduler['LATE_TOLERANCE'] >= 0, "SCHEDULER['LATE_TOLERANCE'] must not be negative")
+
+        sweep = sections['SWEEP']
+        check(sweep['PATTERN'] in ('linear', 'interleaved', 'bit_reversed', 'zone_priority'),
+              "SWEEP['PATTERN'] must be 'linear', 'interleaved', 'bit_reversed' or 'zone_priority'")
+        check(sweep['COARSE_STEP'] >= servo['STEP'], "SWEEP['COARSE_STEP'] must be at least SERVO['STEP']")
+        check(sweep['PRIORITY_STRIDE'] >= 1, "SWEEP['PRIORITY_STRIDE'] must be at least 1")
+        check(servo['TRAVEL_TIME'] >= 0, "SERVO['TRAVEL_TIME'] must not be negative")
+
+        manual = sections['MANUAL']
+        check(manual['CYCLE_TIME'] > 0, "MANUAL['CYCLE_TIME'] must be positive")
+        check(manual['FILTER_WINDOW'] >= 1, "MANUAL['FILTER_WINDOW'] must be at least 1")
+        check(0 < manual['RATE_SMOOTHING'] <= 1, "MANUAL['RATE_SMOOTHING'] must be in (0, 1]")
+
+        pipeline = sections['PIPELINE']
+        stage_settings = [{'CAPACITY': pipeline['DEFAULT_CAPACITY'], 'POLICY': pipeline['DEFAULT_POLICY']}]
+        stage_settings.extend(pipeline['STAGES'].values())
+        check(all(stage['POLICY'] in ('block', 'drop_oldest') for stage in stage_settings),
+              "PIPELINE policies must be 'block' or 'drop_oldest'")
+        check(all(stage['CAPACITY'] > 0 for stage in stage_settings),
+              "PIPELINE queue capacities must be positive")
+        check(pipeline['BLOCK_TIMEOUT'] >= 0, "PIPELINE['BLOCK_TIMEOUT'] must not be negative")
+
+        health = sections['HEALTH']
+        check(health['FAILURE_THRESHOLD'] >= 1, "HEALTH['FAILURE_THRESHOLD'] must be at least 1")
+        check(0 < health['ERROR_RATE'] <= 1, "HEALTH['ERROR_RATE'] must be in (0, 1]")
+        check(health['WINDOW'] >= 1, "HEALTH['WINDOW'] must be at least 1")
+        check(0 < health['PROBE_INTERVAL'] <= health['MAX_PROBE_INTERVAL'],
+              "HEALTH requires 0 < PROBE_INTERVAL <= MAX_PROBE_INTERVAL")
+        check(health['PROBE_BACKOFF'] >= 1, "HEALTH['PROBE_BACKOFF'] must be at least 1")
+
+        snapshot = sections['SNAPSHOT']
+        check(snapshot['INTERVAL'] > 0, "SNAPSHOT['INTERVAL'] must be positive")
+        check(snapshot['PAGES'] > 0, "SNAPSHOT['PAGES'] must be positive")
+        check(snapshot['PAUSE'] >= 0, "SNAPSHOT['PAUSE'] must not be negative")
+        check(snapshot['MAX_RESTARTS'] >= 0, "SNAPSHOT['MAX_RESTARTS'] must not be negative")
+        check(snapshot['FILE'] != os.path.join(sections['DATABASE']['FOLDER'], sections['DATABASE']['FILE']),
+              "SNAPSHOT['FILE'] must not be the live database")
+
+        quantiles = sections['QUANTILES']
+        check(quantiles['COMPRESSION'] >= 20, "QUANTILES['COMPRESSION'] must be at least 20")
+        check(quantiles['WINDOW'] > 0, "QUANTILES['WINDOW'] must be positive")
+        check(quantiles['KEEP_WINDOWS'] >= 1, "QUANTILES['KEEP_WINDOWS'] must be at least 1")
+        check(quantiles['SAVE_INTERVAL'] > 0, "QUANTILES['SAVE_INTERVAL'] must be positive")
+
+        background = sections['BACKGROUND']
+        check(1 <= background['ANGLE_BIN'] <= 180, "BACKGROUND['ANGLE_BIN'] must be between 1 and 180")
+        check(background['MIN_SAMPLES'] >= 1, "BACKGROUND['MIN_SAMPLES'] must be at least 1")
+        check(0 < background['ADAPT_RATE'] <= 1, "BACKGROUND['ADAPT_RATE'] must be in (0, 1]")
+        check(0 <= background['FOREGROUND_RATE'] <= 1, "BACKGROUND['FOREGROUND_RATE'] must be in [0, 1]")
+        check(background['DEVIATION'] > 0 and background['MIN_DEVIATION'] > 0,
+              "BACKGROUND deviation limits must be positive")
+        check(background['INITIAL_SPREAD'] > 0, "BACKGROUND['INITIAL_SPREAD'] must be positive")
+        check(background['APPROACH_RATE'] > 0, "BACKGROUND['APPROACH_RATE'] must be positive")
+        check(background['ALWAYS_ALERT_BELOW'] <= sections['DISTANCE']['THRESHOLD'],
+              "BACKGROUND['ALWAYS_ALERT_BELOW'] must not exceed DISTANCE['THRESHOLD']")
+        check(background['MAX_AGE'] > 0, "BACKGROUND['MAX_AGE'] must be positive")
+
+        scenario = sections['SCENARIO']
+        check(0 < scenario['BEAM_WIDTH'] < 90, "SCENARIO['BEAM_WIDTH'] must be between 0 and 90 degrees")
+        check(scenario['RAYS'] >= 1, "SCENARIO['RAYS'] must be at least 1")
+        check(0 < scenario['MAX_INCIDENCE'] <= 90, "SCENARIO['MAX_INCIDENCE'] must be in (0, 90]")
+        check(scenario['RANGE_NOISE'] >= 0, "SCENARIO['RANGE_NOISE'] must not be negative")
+        check(scenario['TRUTH_STEP'] > 0, "SCENARIO['TRUTH_STEP'] must be positive")
+
+        tuner = sections['TUNER']
+        check(len(tuner['SPACE']) > 0, "TUNER['SPACE'] must name at least one setting")
+        for name, values in tuner['SPACE'].items():
+            section, _, key = name.partition('.')
+            check(key in sections.get(section, {}), f"TUNER['SPACE'] names unknown setting {name}")
+            check(len(values) > 0, f"TUNER['SPACE'] needs at least one value for {name}")
+        check(tuner['WORKERS'] >= 0, "TUNER['WORKERS'] must not be negative")
+        check(tuner['TOP'] >= 1, "TUNER['TOP'] must be at least 1")
+
+        control = sections['CONTROL']
+        check(control['MAX_CLIENTS'] > 0, "CONTROL['MAX_CLIENTS'] must be positive")
+        check(control['SUBSCRIBER_QUEUE'] > 0, "CONTROL['SUBSCRIBER_QUEUE'] must be positive")
+        check(control['STATE_POLL'] > 0, "CONTROL['STATE_POLL'] must be positive")
+
+    except (KeyError, TypeError) as e:
+        errors.append(f"Missing or malformed setting: {e}")
+
+    if errors:
+        raise ConfigError("Invalid configuration: " + "; ".join(errors))
+
+def default_sections():
+    """Deep copy of every settings dict defined in config.py"""
+    return {
+        name: copy.deepcopy(value)
+        for name, value in vars(config).items()
+        if name.isupper() and isinstance(value, dict)
+    }
+
+def _merge(base, overrides, path=''):
+    for key, value in overrides.items():
+        if key not in base:
+            if path.rstrip('.') not in OPEN_TABLES:
+                raise ConfigError(f"Unknown setting '{path}{key}'")
+            base[key] = value
+        elif (isinstance(base[key], dict) and isinstance(value, dict) and
+              path + key not in REPLACED_TABLES):
+            _merge(base[key], value, f"{path}{key}.")
+        else:
+            base[key] = value
+
+def _normalize(sections):
+    # JSON object keys are strings, beep patterns are keyed by direction code
+    patterns = sections['DIRECTION']['BEEP_PATTERNS']
+    sections['DIRECTION']['BEEP_PATTERNS'] = {int(code): pattern for code, pattern in patterns.items()}
+
+_version = 0
+_active = None
+_lock = threading.Lock()
+
+def load_config(path=None, overrides=None):
+    """Build a validated RuntimeConfig from defaults, the JSON file and overrides"""
+    global _version
+
+    sections = default_sections()
+
+    if path and os.path.exists(path):
+        try:
+            with open(path) as f:
+                file_overrides = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"Cannot read config file '{path}': {e}")
+        _merge(sections, file_overrides)
+
+    if overrides:
+        _merge(sections, copy.deepcopy(overrides))
+
+    _normalize(sections)
+    _validate(sections)
+
+    with _lock:
+        _version += 1
+        version = _version
+
+    return RuntimeConfig(sections, source=path, version=version)
+
+def get_config():
+    """Process-wide active configuration, loaded on first use"""
+    global _active
+
+    if _active is None:
+        path = config.RUNTIME['CONFIG_FILE']
+        try:
+            cfg = load_config(path)
+        except ConfigError as e:
+            print(f"Config error, using defaults: {e}")
+            cfg = load_config()
+        with _lock:
+            if _active is None:
+                _active = cfg
+
+    return _active
+
+def set_config(cfg):
+    global _active
+    with _lock:
+        _active = cfg
+
+class ConfigWatcher:
+    """Polls the config file and hands every valid new version to a callback"""
+
+    def __init__(self, path, on_reload, interval=None):
+        self.path = path
+        self.on_reload = on_reload
+        self.interval = interval or config.RUNTIME['RELOAD_INTERVAL']
+        self.reload_count = 0
+        self.error_count = 0
+        self._signature = self._file_signature()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Reload if the file changed - returns the new config or None"""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return None
+        self._signature = signature
+
+        try:
+            cfg = load_config(self.path)
+        except ConfigError as e:
+            self.error_count += 1
+            print(f"Config reload rejected, keeping current settings: {e}")
+            return None
+
+        self.reload_count += 1
+        set_config(cfg)
+        print(f"Configuration reloaded (version {cfg.version})")
+        self.on_reload(cfg)
+        return cfg
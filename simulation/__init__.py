@@ -0,0 +1,5 @@
+#Simulation - fake hardware, virtual clock and long-running test harnesses
+from .clock import VirtualClock
+from .fake_gpio import FakeGPIO
+
+__all__ = ['VirtualClock', 'FakeGPIO']
\ No newline at end of file
@@ -0,0 +1,87 @@
+# Virtual clock - runs hours of device time in seconds of real time
+import heapq
+import itertools
+import time
+
+class VirtualClock:
+    """Replaces time.time/time.sleep/time.monotonic with a simulated clock
+
+    sleep() advances virtual time instantly and fires any events scheduled
+    in between, which is how button presses and samplers reach the
+    single-threaded system under test. Events may sleep themselves.
+    """
+
+    def __init__(self, start=None):
+        self.now = start if start is not None else time.time()
+        self.start = self.now
+        self._events = []
+        self._counter = itertools.count()
+        self._originals = None
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now - self.start
+
+    def elapsed(self):
+        return self.now - self.start
+
+    def schedule(self, at, callback):
+        """Run callback() once virtual time reaches `at`"""
+        heapq.heappush(self._events, (at, next(self._counter), callback))
+
+    def schedule_in(self, delay, callback):
+        self.schedule(self.now + delay, callback)
+
+    def next_event_time(self):
+        return self._events[0][0] if self._events else None
+
+    def advance(self, seconds):
+        """Move time forward without firing events (used for polling costs)"""
+        self.now += seconds
+
+    def sleep(self, seconds):
+        target = self.now + max(0, seconds)
+
+        while self._events and self._events[0][0] <= target:
+            at, _, callback = heapq.heappop(self._events)
+            self.now = max(self.now, at)
+            callback()
+
+        self.now = max(self.now, target)
+
+    def wait_event(self, event, timeout=None):
+        """threading.Event.wait in virtual time - jumps to the next scheduled event"""
+        deadline = None if timeout is None else self.now + timeout
+
+        while not event.is_set():
+            next_time = self.next_event_time()
+            if next_time is None and deadline is None:
+                raise RuntimeError("Waiting forever with no scheduled events")
+            if deadline is not None and (next_time is None or next_time > deadline):
+                self.sleep(deadline - self.now)
+                break
+            self.sleep(next_time - self.now)
+
+        return event.is_set()
+
+    def install(self):
+        if self._originals is None:
+            self._originals = (time.time, time.sleep, time.monotonic)
+            time.time = self.time
+            time.sleep = self.sleep
+            time.monotonic = self.monotonic
+
+    def uninstall(self):
+        if self._originals is not None:
+            time.time, time.sleep, time.monotonic = self._originals
+            self._originals = None
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.uninstall()
+        return False
@@ -0,0 +1,175 @@
+# Fake RPi.GPIO backend - HC-SR04, SG90 and push button models for tests off the Pi
+import sys
+import time
+import types
+
+# Speed of sound (cm/s) and sensor timing
+SOUND_SPEED = 34300
+ECHO_LATENCY = 0.0005      # Trigger to echo start (seconds)
+NO_ECHO_PULSE = 0.038      # Echo pulse when nothing reflects (seconds)
+
+class FakePWM:
+    def __init__(self, gpio, channel, frequency):
+        self.gpio = gpio
+        self.channel = channel
+        self.frequency = frequency
+        self.duty_cycle = 0
+        self.running = False
+
+    def start(self, duty_cycle):
+        self.running = True
+        self.ChangeDutyCycle(duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        if duty_cycle > 0:
+            # Inverse of the SG90 mapping in ServoMotor.set_angle
+            self.gpio.servo_angle = (duty_cycle - 2) * 18
+            self.gpio.servo_moves += 1
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.running = False
+
+class FakeGPIO:
+    """Stands in for the RPi.GPIO module
+
+    distance_fn(angle, now) returns the distance (cm) the sensor would see at
+    a servo angle, or None when nothing reflects. With a VirtualClock every
+    ECHO poll costs `poll_cost` virtual seconds, so the busy-wait loop in
+    UltrasonicSensor.measure_distance terminates in simulated time.
+    """
+    BCM = 11
+    BOARD = 10
+    IN = 1
+    OUT = 0
+    HIGH = 1
+    LOW = 0
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self, pins, distance_fn=None, clock=None, poll_cost=0.00005):
+        self.pins = dict(pins)
+        self.distance_fn = distance_fn or (lambda angle, now: None)
+        self.clock = clock
+        self.poll_cost = poll_cost
+        self.mode = None
+        self.channels = {}
+        self.levels = {}
+        self.write_counts = {}
+        self.event_callbacks = {}
+        self.servo_angle = 90
+        self.servo_moves = 0
+        self.pings = 0
+        self.echo_start = None
+        self.echo_end = None
+        self.button_release = 0
+        self.PWM = lambda channel, frequency: FakePWM(self, channel, frequency)
+
+    def _now(self):
+        return self.clock.time() if self.clock else time.time()
+
+    # RPi.GPIO API
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, channel, direction, pull_up_down=None, initial=None):
+        self.channels[channel] = direction
+        if direction == self.IN:
+            self.levels[channel] = 1 if pull_up_down == self.PUD_UP else 0
+        else:
+            self.levels[channel] = initial or 0
+
+    def output(self, channel, value):
+        if isinstance(channel, (list, tuple)):
+            values = value if isinstance(value, (list, tuple)) else [value] * len(channel)
+            for single_channel, single_value in zip(channel, values):
+                self.output(single_channel, single_value)
+            return
+
+        if channel not in self.channels:
+            raise RuntimeError(f"The GPIO channel {channel} has not been set up as an OUTPUT")
+
+        value = 1 if value else 0
+        self.write_counts[channel] = self.write_counts.get(channel, 0) + 1
+
+        if channel == self.pins['TRIG'] and self.levels.get(channel) == 1 and value == 0:
+            self._fire_ping()
+        self.levels[channel] = value
+
+    def input(self, channel):
+        if channel not in self.channels:
+            raise RuntimeError(f"You must setup() the GPIO channel {channel} first")
+
+        now = self._now()
+        if channel == self.pins['ECHO']:
+            if self.clock:
+                self.clock.advance(self.poll_cost)
+            if self.echo_start is None:
+                return 0
+            return 1 if self.echo_start <= now < self.echo_end else 0
+
+        if channel == self.pins['BUTTON']:
+            return 0 if now < self.button_release else 1
+
+        return self.levels.get(channel, 0)
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        self.event_callbacks[channel] = callback
+
+    def remove_event_detect(self, channel):
+        self.event_callbacks.pop(channel, None)
+
+    def cleanup(self, channel=None):
+        if channel is None:
+            self.channels.clear()
+            self.levels.clear()
+            self.event_callbacks.clear()
+            return
+
+        for single_channel in (channel if isinstance(channel, (list, tuple)) else [channel]):
+            self.channels.pop(single_channel, None)
+            self.levels.pop(single_channel, None)
+            self.event_callbacks.pop(single_channel, None)
+
+    # Sensor and button models
+
+    def _fire_ping(self):
+        now = self._now()
+        self.pings += 1
+        distance = self.distance_fn(self.servo_angle, now)
+        pulse = NO_ECHO_PULSE if distance is None else 2 * distance / SOUND_SPEED
+        self.echo_start = now + ECHO_LATENCY
+        self.echo_end = self.echo_start + pulse
+
+    def press_button(self, hold=0.2):
+        """Hold the button for `hold` seconds and deliver the falling-edge interrupt"""
+        self.button_release = self._now() + hold
+        callback = self.event_callbacks.get(self.pins['BUTTON'])
+        if callback:
+            callback(self.pins['BUTTON'])
+
+    def get_output_level(self, pin_name):
+        return self.levels.get(self.pins[pin_name], 0)
+
+def install(fake):
+    """Make `import RPi.GPIO` return the fake, including in already imported modules"""
+    package = types.ModuleType('RPi')
+    package.GPIO = fake
+    sys.modules['RPi'] = package
+    sys.modules['RPi.GPIO'] = fake
+
+    for module_name in ('hardware.gpio_controller', 'hardware.servo_motor'):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            module.GPIO = fake
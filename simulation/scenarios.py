@@ -0,0 +1,457 @@
+# Scenario library - scripted obstacles around the wearer, scored on detection quality
+import argparse
+import contextlib
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runtime_config import load_config
+from core.direction import forward_angle
+from simulation.clock import VirtualClock
+from simulation.fake_gpio import FakeGPIO, install
+
+# Decisions that reach the user as a beep
+ALERT_DECISIONS = ('EMIT', 'ESCALATE')
+
+class ScenarioComplete(BaseException):
+    """Ends the run from inside the system's own loops (not caught as Exception)"""
+
+class Obstacle:
+    """Something the sensor can hit - positions in cm, x to the right, y ahead
+
+    velocity is in cm/s and applies until `stop_at` seconds into the scenario.
+    reflectivity is the chance that one ping gets an echo back at all.
+    """
+
+    def __init__(self, name, velocity=(0, 0), stop_at=None, reflectivity=1.0):
+        self.name = name
+        self.velocity = velocity
+        self.stop_at = stop_at
+        self.reflectivity = reflectivity
+
+class Wall(Obstacle):
+    """Flat surface from `start` to `end` - reflects away when hit at a steep angle"""
+
+    def __init__(self, name, start, end, **kwargs):
+        super().__init__(name, **kwargs)
+        self.start = start
+        self.end = end
+
+class Pole(Obstacle):
+    def __init__(self, name, center, radius=4, **kwargs):
+        super().__init__(name, **kwargs)
+        self.center = center
+        self.radius = radius
+
+class Person(Pole):
+    """A wide, soft target - clothing swallows some of the pings"""
+
+    def __init__(self, name, center, radius=20, reflectivity=0.6, **kwargs):
+        super().__init__(name, center, radius, reflectivity=reflectivity, **kwargs)
+
+class Scenario:
+    """Obstacles plus the wearer's own movement
+
+    The wearer stands at the origin facing +y and walks ahead at walk_speed
+    (cm/s) until walk_until seconds. ghost_rate is the chance of a stray echo
+    (another sensor, multipath) at a random short distance on any ping.
+    """
+
+    def __init__(self, name, description, duration, obstacles, mode='auto',
+                 walk_speed=0, walk_until=None, ghost_rate=0.0):
+        self.name = name
+        self.description = description
+        self.duration = duration
+        self.obstacles = obstacles
+        self.mode = mode
+        self.walk_speed = walk_speed
+        self.walk_until = walk_until
+        self.ghost_rate = ghost_rate
+
+def _around(bearing, distance):
+    """Point `distance` cm away, `bearing` degrees left (+) or right (-) of straight ahead"""
+    radians = math.radians(bearing)
+    return (-distance * math.sin(radians), distance * math.cos(radians))
+
+SCENARIOS = {scenario.name: scenario for scenario in (
+    Scenario('pole_ahead', "Walk up to a pole just right of center and stop in front of it", 30,
+             [Pole('pole', (10, 300))], walk_speed=50, walk_until=5.4),
+    Scenario('wall_ahead', "Walk toward a wall and stop 40 cm short", 30,
+             [Wall('wall', (-150, 400), (150, 400))], walk_speed=50, walk_until=7.2),
+    Scenario('corridor', "Walk down a 90 cm corridor - nothing within the threshold", 20,
+             [Wall('left wall', (-45, -100), (-45, 1200)), Wall('right wall', (45, -100), (45, 1200))],
+             walk_speed=60),
+    Scenario('person_crossing', "Someone crosses 60 cm ahead from left to right", 10,
+             [Person('person', (-300, 60), velocity=(100, 0))]),
+    Scenario('person_from_left', "Someone walks up from the front left and stops close by", 20,
+             [Person('person', (-140, 160), velocity=(40, -40), stop_at=3)]),
+    Scenario('approaching_cart', "A wide cart rolls toward the standing wearer", 15,
+             [Wall('cart', (-60, 300), (60, 300), velocity=(0, -60), stop_at=4.5)]),
+    Scenario('cluttered', "Standing among thin poles 40 cm away in every zone", 40,
+             [Pole(f'pole {bearing:+d}°', _around(bearing, 40), radius=3)
+              for bearing in (-40, -15, 0, 14, 25)]),
+    Scenario('narrow_hallway', "Standing in a 70 cm hallway until someone walks up from ahead", 120,
+             [Wall('left wall', (-35, -100), (-35, 6000)), Wall('right wall', (35, -100), (35, 6000)),
+              Person('person', (0, 5465), velocity=(0, -60), stop_at=90)]),
+    Scenario('open_space_crosstalk', "Open room with another sensor's pings around", 60,
+             [Wall('far wall', (-400, 300), (400, 300))], ghost_rate=0.01),
+    Scenario('manual_approach', "Manual mode, walking toward a wall and stopping at 35 cm", 12,
+             [Wall('wall', (-150, 335), (150, 335))], mode='manual', walk_speed=60, walk_until=5)
+)}
+
+class ScenarioEnvironment:
+    """Ray-cast ultrasonic returns for a scenario
+
+    Each ping casts SCENARIO['RAYS'] rays across the sensor cone at the angle
+    the servo reports and returns the nearest echo. The obstacle and the
+    bearing that produced it are kept in `last_hit` for scoring.
+    """
+
+    def __init__(self, scenario, config, seed=1):
+        self.scenario = scenario
+        self.config = config
+        self.rng = np.random.default_rng(seed)
+        settings = config.scenario
+        self.forward = forward_angle(config)
+        half_beam = settings.beam_width / 2
+        self.ray_offsets = np.linspace(-half_beam, half_beam, settings.rays)
+        self.cos_incidence = math.cos(math.radians(settings.max_incidence))
+        self.start_time = None
+        self.last_hit = None
+        self.pings = 0
+
+        poles = [obstacle for obstacle in scenario.obstacles if isinstance(obstacle, Pole)]
+        walls = [obstacle for obstacle in scenario.obstacles if isinstance(obstacle, Wall)]
+        # Poles first, then walls - obstacle indices follow this order
+        self.obstacles = poles + walls
+        self.pole_count = len(poles)
+
+        def column(items, attribute, width=2):
+            return np.array([getattr(item, attribute) for item in items], dtype=float).reshape(-1, width)
+
+        def stops(items):
+            return np.array([math.inf if item.stop_at is None else item.stop_at for item in items])
+
+        self.pole_centers = column(poles, 'center')
+        self.pole_radii = column(poles, 'radius', 1)[:, 0]
+        self.pole_velocity = column(poles, 'velocity')
+        self.pole_stop = stops(poles)
+        self.wall_start = column(walls, 'start')
+        self.wall_vector = column(walls, 'end') - self.wall_start
+        self.wall_length = np.hypot(self.wall_vector[:, 0], self.wall_vector[:, 1])
+        self.wall_velocity = column(walls, 'velocity')
+        self.wall_stop = stops(walls)
+        self.reflectivity = np.array([obstacle.reflectivity for obstacle in self.obstacles])
+
+    def start(self, now):
+        self.start_time = now
+
+    def _offset(self, velocity, stop, t):
+        """Obstacle displacement relative to the (possibly walking) wearer"""
+        scenario = self.scenario
+        walk_until = math.inf if scenario.walk_until is None else scenario.walk_until
+        walked = scenario.walk_speed * min(t, walk_until)
+        return velocity * np.minimum(t, stop)[:, None] - np.array([0.0, walked])
+
+    def cast(self, t, bearings, ideal=False):
+        """Echo distance for every (ray, obstacle) pair, inf where nothing comes back
+
+        bearings are degrees left (+) or right (-) of straight ahead. `ideal`
+        ignores reflection angles, as for the ground truth.
+        """
+        radians = np.radians(bearings)
+        directions = np.stack([-np.sin(radians), np.cos(radians)], axis=1)
+        distances = np.full((len(bearings), len(self.obstacles)), np.inf)
+
+        if self.pole_count:
+            centers = self.pole_centers + self._offset(self.pole_velocity, self.pole_stop, t)
+            projection = directions @ centers.T
+            outside = np.einsum('ij,ij->i', centers, centers) - self.pole_radii ** 2
+            discriminant = projection ** 2 - outside
+            with np.errstate(invalid='ignore'):
+                hit = projection - np.sqrt(discriminant)
+            valid = (discriminant >= 0) & (hit > 0) & (outside > 0)
+            if not ideal:
+                # Surface normal at the hit point against the ray
+                points = hit[:, :, None] * directions[:, None, :]
+                normals = (points - centers[None]) / self.pole_radii[None, :, None]
+                facing = np.abs(np.einsum('rkj,rj->rk', normals, directions))
+                valid &= facing >= self.cos_incidence
+            distances[:, :self.pole_count] = np.where(valid, hit, np.inf)
+
+        if len(self.wall_start):
+            starts = self.wall_start + self._offset(self.wall_velocity, self.wall_stop, t)
+            vector = self.wall_vector
+            # origin + hit * direction = start + along * vector, solved with 2-D cross products
+            denominator = directions[:, :1] * vector[:, 1] - directions[:, 1:] * vector[:, 0]
+            start_cross = starts[:, 0] * vector[:, 1] - starts[:, 1] * vector[:, 0]
+            direction_cross = starts[:, 0] * directions[:, 1:] - starts[:, 1] * directions[:, :1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                hit = start_cross / denominator
+                along = direction_cross / denominator
+            valid = (np.abs(denominator) > 1e-9) & (hit > 0) & (along >= 0) & (along <= 1)
+            if not ideal:
+                valid &= np.abs(denominator) / self.wall_length >= self.cos_incidence
+            distances[:, self.pole_count:] = np.where(valid, hit, np.inf)
+
+        return distances
+
+    def distance(self, angle, now):
+        """FakeGPIO distance_fn - what one ping at servo `angle` hears back"""
+        self.pings += 1
+        self.last_hit = None
+        t = 0.0 if self.start_time is None else max(0.0, now - self.start_time)
+        settings = self.config.scenario
+        limits = self.config.distance
+
+        if self.rng.random() < self.scenario.ghost_rate:
+            return float(self.rng.uniform(limits.min_valid, limits.threshold * 3))
+        if not self.obstacles:
+            return None
+
+        bearings = angle - self.forward + self.ray_offsets
+        distances = self.cast(t, bearings)
+        distances[:, self.rng.random(len(self.obstacles)) >= self.reflectivity] = np.inf
+        ray, obstacle = np.unravel_index(np.argmin(distances), distances.shape)
+        nearest = distances[ray, obstacle]
+        if not nearest <= limits.max_valid:
+            return None
+
+        self.last_hit = (int(obstacle), float(bearings[ray]))
+        return max(limits.min_valid, float(nearest + self.rng.normal(0, settings.range_noise)))
+
+    def ground_truth(self):
+        """(times, distance, bearing) per obstacle, as an ideal sensor sees the sweep field
+
+        The field is the servo range widened by half the beam on each side.
+        distance/bearing have one column per obstacle (inf when out of view).
+        """
+        servo = self.config.servo
+        half_beam = self.config.scenario.beam_width / 2
+        fan = np.arange(servo.min_angle - half_beam, servo.max_angle + half_beam + 0.5) - self.forward
+        times = np.arange(0, self.scenario.duration, self.config.scenario.truth_step)
+        distance = np.full((len(times), len(self.obstacles)), np.inf)
+        bearing = np.zeros_like(distance)
+        for i, t in enumerate(times):
+            distances = self.cast(t, fan, ideal=True)
+            nearest = np.argmin(distances, axis=0)
+            distance[i] = distances[nearest, np.arange(len(self.obstacles))]
+            bearing[i] = fan[nearest]
+        return times, distance, bearing
+
+def score(environment, alerts, config, direction):
+    """Detection quality of one run
+
+    An obstacle needs an alert once an ideal sensor would see it inside the
+    threshold. It counts as detected when an alert traced to it (by the ray
+    that produced the echo) comes before its first approach ends. Alerts on
+    stray echoes, or on obstacles beyond the threshold plus the exit margin,
+    are false alerts (manual-mode approach warnings only on stray echoes). Direction accuracy compares the zone the user heard
+    with the zone of the bearing the echo really came from.
+    """
+    times, truth_distance, _ = environment.ground_truth()
+    threshold = config.distance.threshold
+    tolerance = threshold + config.alert.exit_margin
+    needed = truth_distance < threshold
+    step = config.scenario.truth_step
+
+    latencies = []
+    missed = []
+    for index, obstacle in enumerate(environment.obstacles):
+        inside = np.flatnonzero(needed[:, index])
+        if not len(inside):
+            continue
+        first = times[inside[0]]
+        gaps = np.flatnonzero(~needed[inside[0]:, index])
+        approach_end = times[inside[0] + gaps[0]] if len(gaps) else environment.scenario.duration
+        hits = [alert['time'] for alert in alerts
+                if alert['hit'] == index and alert['time'] <= approach_end + config.alert.release_time]
+        if hits:
+            latencies.append(max(0.0, min(hits) - first))
+        else:
+            missed.append(obstacle.name)
+
+    false_alerts = 0
+    correct_direction = 0
+    true_alerts = 0
+    for alert in alerts:
+        if alert['hit'] is None:
+            false_alerts += 1
+            continue
+        row = min(len(times) - 1, int(alert['time'] / step))
+        # Approach warnings are meant to come early, only stray echoes make them false
+        if alert['decision'] != 'APPROACHING' and not truth_distance[row, alert['hit']] < tolerance:
+            false_alerts += 1
+            continue
+        true_alerts += 1
+        heard_angle = min(180, max(0, int(round(environment.forward + alert['bearing']))))
+        if direction.get_direction_info(heard_angle)[0] == alert['direction']:
+            correct_direction += 1
+
+    return {
+        'scenario': environment.scenario.name,
+        'needed': len(latencies) + len(missed),
+        'detected': len(latencies),
+        'missed': missed,
+        'latency_mean': sum(latencies) / len(latencies) if latencies else None,
+        'latency_max': max(latencies) if latencies else None,
+        'alerts': len(alerts),
+        'false_alerts': false_alerts,
+        'direction_accuracy': correct_direction / true_alerts if true_alerts else None,
+        'pings': environment.pings,
+        'duration': environment.scenario.duration
+    }
+
+def _run_overrides(workdir, overrides):
+    """Scenario defaults under any caller overrides, e.g. {'SERVO': {'STEP': 4}}"""
+    sections = {
+        'DATABASE': {'FOLDER': workdir},
+        'SNAPSHOT': {'FILE': os.path.join(workdir, 'measurements_replica.db')},
+        'QUANTILES': {'FILE': os.path.join(workdir, 'distance_quantiles.json')},
+        'RUNTIME': {'HOT_RELOAD': False},
+        'ACQUISITION': {'SEPARATE_PROCESS': False},
+        # Inline stages so every reading is scored against the ping that produced it
+        'PIPELINE': {'ENABLED': False}
+    }
+    for section, values in (overrides or {}).items():
+        sections.setdefault(section, {}).update(values)
+    return sections
+
+def run_scenario(scenario, overrides=None, seed=1, verbose=False):
+    """Drive the real Scanner through one scenario under the fake GPIO - returns score()"""
+    if isinstance(scenario, str):
+        scenario = SCENARIOS[scenario]
+
+    workdir = tempfile.mkdtemp(prefix='scenario-')
+    cfg = load_config(overrides=_run_overrides(workdir, overrides))
+    clock = VirtualClock()
+    environment = ScenarioEnvironment(scenario, cfg, seed)
+    install(FakeGPIO(cfg.pins, environment.distance, clock))
+    alerts = []
+
+    def record(timestamp, distance, angle, direction_name, decision):
+        obstacle, bearing = environment.last_hit or (None, None)
+        alerts.append({'time': timestamp - environment.start_time, 'distance': distance,
+                       'angle': angle, 'direction': direction_name, 'decision': decision,
+                       'hit': obstacle, 'bearing': bearing})
+
+    def alert_sink(reading):
+        if reading.decision in ALERT_DECISIONS:
+            record(reading.timestamp, reading.distance, reading.angle, reading.direction_name, reading.decision)
+        return reading
+
+    def trend_alert(distance, angle, direction_name, rate, time_to_contact):
+        record(clock.time(), distance, angle, direction_name, 'APPROACHING')
+
+    def finish():
+        raise ScenarioComplete()
+
+    output = sys.stdout if verbose else open(os.devnull, 'w')
+    clock.install()
+    try:
+        with contextlib.redirect_stdout(output):
+            from main import ObjectDetectionSystem
+
+            system = ObjectDetectionSystem(cfg)
+            if not system.initialize():
+                raise RuntimeError("System initialization failed under the fake backend")
+            system.scanner.add_sink('scenario', alert_sink)
+            system.scanner.set_callback('trend_alert', trend_alert)
+            system.button_handler.set_auto_mode(scenario.mode == 'auto')
+            system.button_handler.set_system_running(True)
+
+            environment.start(clock.time())
+            clock.schedule_in(scenario.duration, finish)
+            try:
+                system.main_loop()
+            except ScenarioComplete:
+                pass
+            system.shutdown()
+    finally:
+        clock.uninstall()
+        if output is not sys.stdout:
+            output.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return score(environment, alerts, cfg, system.direction)
+
+def summarize(results):
+    """Totals over several scenario scores"""
+    needed = sum(result['needed'] for result in results)
+    detected = sum(result['detected'] for result in results)
+    latencies = [result['latency_mean'] for result in results if result['latency_mean'] is not None]
+    accuracies = [result['direction_accuracy'] for result in results
+                  if result['direction_accuracy'] is not None]
+    minutes = sum(result['duration'] for result in results) / 60
+    return {
+        'needed': needed,
+        'detected': detected,
+        'detection_rate': detected / needed if needed else 1.0,
+        'missed': needed - detected,
+        'latency_mean': sum(latencies) / len(latencies) if latencies else None,
+        'latency_max': max((result['latency_max'] for result in results
+                            if result['latency_max'] is not None), default=None),
+        'false_alerts': sum(result['false_alerts'] for result in results),
+        'false_alerts_per_minute': sum(result['false_alerts'] for result in results) / minutes,
+        'direction_accuracy': sum(accuracies) / len(accuracies) if accuracies else None
+    }
+
+def _seconds(value):
+    return '-' if value is None else f"{value:.1f}s"
+
+def _percent(value):
+    return '-' if value is None else f"{value * 100:.0f}%"
+
+def print_report(results):
+    print(f"{'Scenario':<22} {'Detected':>9} {'First alert':>12} {'Worst':>7} "
+          f"{'Alerts':>7} {'False':>6} {'Direction':>10}")
+    for result in results:
+        print(f"{result['scenario']:<22} {result['detected']:>4}/{result['needed']:<4} "
+              f"{_seconds(result['latency_mean']):>12} {_seconds(result['latency_max']):>7} "
+              f"{result['alerts']:>7} {result['false_alerts']:>6} "
+              f"{_percent(result['direction_accuracy']):>10}")
+        if result['missed']:
+            print(f"{'':<22} missed: {', '.join(result['missed'])}")
+
+    total = summarize(results)
+    print("-" * 78)
+    print(f"{'All scenarios':<22} {total['detected']:>4}/{total['needed']:<4} "
+          f"{_seconds(total['latency_mean']):>12} {_seconds(total['latency_max']):>7} "
+          f"{'':>7} {total['false_alerts']:>6} {_percent(total['direction_accuracy']):>10}")
+    print(f"Detection rate {_percent(total['detection_rate'])} | "
+          f"{total['false_alerts_per_minute']:.2f} false alerts per minute")
+
+def main():
+    parser = argparse.ArgumentParser(description="Score detection quality on scripted obstacle scenarios")
+    parser.add_argument('scenarios', nargs='*', help="scenario names (default: all)")
+    parser.add_argument('--list', action='store_true', help="list the scenarios and exit")
+    parser.add_argument('--set', dest='overrides', type=json.loads, default={},
+                        help='settings to try, e.g. \'{"DISTANCE": {"THRESHOLD": 60}}\'')
+    parser.add_argument('--seed', type=int, default=1, help="random seed for echoes and noise")
+    parser.add_argument('--verbose', action='store_true', help="show the system's own output")
+    args = parser.parse_args()
+
+    if args.list:
+        for scenario in SCENARIOS.values():
+            print(f"{scenario.name:<22} {scenario.mode:<7} {scenario.duration:>4}s  {scenario.description}")
+        return True
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (see --list)")
+        return False
+
+    names = args.scenarios or list(SCENARIOS)
+    results = [run_scenario(name, args.overrides, args.seed, args.verbose) for name in names]
+    print_report(results)
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,344 @@
+# Soak harness - a simulated day of use, watching for leaks and drift
+import argparse
+import contextlib
+import csv
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runtime_config import load_config
+from simulation.clock import VirtualClock
+from simulation.fake_gpio import FakeGPIO, install
+
+class SoakComplete(BaseException):
+    """Ends the run from inside the system's own loops (not caught as Exception)"""
+
+class SoakEnvironment:
+    """Changing surroundings: open space alternating with nearby obstacles"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.episode_end = 0
+        self.obstacles = []
+
+    def _new_episode(self, now):
+        self.episode_end = now + self.rng.uniform(30, 600)
+        self.obstacles = []
+
+        if self.rng.random() < 0.6:
+            for _ in range(self.rng.randint(1, 3)):
+                center = self.rng.uniform(70, 170)
+                width = self.rng.uniform(2, 10)
+                self.obstacles.append((center - width, center + width, self.rng.uniform(20, 120)))
+
+    def distance(self, angle, now):
+        if now >= self.episode_end:
+            self._new_episode(now)
+
+        for low, high, distance in self.obstacles:
+            if low <= angle <= high:
+                return distance + self.rng.uniform(-1.5, 1.5)
+
+        # Open space - far walls or nothing at all
+        return None if self.rng.random() < 0.3 else self.rng.uniform(150, 380)
+
+def _rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _open_fds():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def _slope(xs, ys):
+    """Least-squares slope of ys over xs"""
+    n = len(xs)
+    if n < 2:
+        return 0
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if denominator == 0:
+        return 0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator
+
+class SoakHarness:
+    def __init__(self, hours=None, seed=1, workdir=None, verbose=False):
+        self.settings = load_config().soak
+        self.hours = hours if hours is not None else self.settings.hours
+        self.seed = seed
+        self.workdir = workdir
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.samples = []
+        self.system = None
+        self.clock = None
+        self.db_path = None
+        self._step_latencies = []
+        self._last_step_real = None
+        self._steps = 0
+        self._connections = 0
+        self._window_steps = 0
+        self._window_connections = 0
+
+    # Instrumentation
+
+    def _instrument(self, system):
+        measure = system.ultrasonic.measure_distance
+        get_connection = system.db.get_connection
+
+        def timed_measure():
+            now = time.perf_counter()
+            if self._last_step_real is not None:
+                self._step_latencies.append(now - self._last_step_real)
+            self._last_step_real = now
+            self._steps += 1
+            self._window_steps += 1
+            return measure()
+
+        def counted_connection():
+            self._connections += 1
+            self._window_connections += 1
+            return get_connection()
+
+        system.ultrasonic.measure_distance = timed_measure
+        system.db.get_connection = counted_connection
+
+        # Paused waits jump straight to the next scheduled event
+        button_handler = system.button_handler
+
+        def virtual_wait(timeout=None):
+            changed = self.clock.wait_event(button_handler.state_changed, timeout)
+            button_handler.state_changed.clear()
+            return changed
+
+        button_handler.wait_for_state_change = virtual_wait
+
+    def _sample(self):
+        latencies = self._step_latencies
+        sample = {
+            'hours': self.clock.elapsed() / 3600,
+            'rss_kb': _rss_kb(),
+            'open_fds': _open_fds(),
+            'db_bytes': _file_size(self.db_path),
+            'wal_bytes': _file_size(self.db_path + '-wal'),
+            'steps': self._window_steps,
+            'connections': self._window_connections,
+            'connections_per_step': self._window_connections / max(1, self._window_steps),
+            'latency_p50_ms': _percentile(latencies, 0.5) * 1000,
+            'latency_p95_ms': _percentile(latencies, 0.95) * 1000,
+            'latency_max_ms': max(latencies) * 1000 if latencies else 0
+        }
+        self.samples.append(sample)
+        self._step_latencies = []
+        self._window_steps = 0
+        self._window_connections = 0
+
+        if self.verbose or len(self.samples) % 6 == 1:
+            print(f"[SOAK] {sample['hours']:6.2f}h | RSS {sample['rss_kb']} KB | "
+                  f"fds {sample['open_fds']} | DB {sample['db_bytes'] / 1024:.0f} KB | "
+                  f"p95 step {sample['latency_p95_ms']:.2f} ms", file=sys.__stdout__)
+
+        self.clock.schedule_in(self.settings.sample_interval, self._sample)
+
+    # Random user input
+
+    def _schedule_press(self):
+        delay = self.rng.expovariate(1 / self.settings.press_interval)
+        self.clock.schedule_in(delay, self._random_press)
+
+    def _random_press(self):
+        fake = sys.modules['RPi.GPIO']
+        if self.rng.random() < 0.35:
+            fake.press_button(self.system.config.system.long_press_time + 0.3)
+        else:
+            fake.press_button(0.2)
+        self._schedule_press()
+
+    def _finish(self):
+        raise SoakComplete()
+
+    # Run
+
+    def run(self):
+        workdir = self.workdir or tempfile.mkdtemp(prefix='soak-')
+        cfg = load_config(overrides={
+            'DATABASE': {'FOLDER': workdir},
+            'SNAPSHOT': {'FILE': os.path.join(workdir, 'measurements_replica.db')},
+            'QUANTILES': {'FILE': os.path.join(workdir, 'distance_quantiles.json')},
+            'RUNTIME': {'HOT_RELOAD': False},
+            'ACQUISITION': {'SEPARATE_PROCESS': False}
+        })
+        self.db_path = cfg.database.path
+
+        environment = SoakEnvironment(self.rng)
+        self.clock = VirtualClock()
+        fake = FakeGPIO(cfg.pins, environment.distance, self.clock)
+        install(fake)
+
+        start_real = time.perf_counter()
+        output = sys.stdout if self.verbose else open(os.devnull, 'w')
+
+        self.clock.install()
+        try:
+            with contextlib.redirect_stdout(output):
+                from main import ObjectDetectionSystem
+
+                self.system = ObjectDetectionSystem(cfg)
+                if not self.system.initialize():
+                    raise RuntimeError("System initialization failed under the fake backend")
+                self._instrument(self.system)
+                self.system.startup_sequence()
+
+                # Start scanning shortly after boot, then random presses
+                self.clock.schedule_in(2, lambda: fake.press_button(0.2))
+                self._schedule_press()
+                self.clock.schedule_in(self.settings.sample_interval, self._sample)
+                self.clock.schedule_in(self.hours * 3600, self._finish)
+
+                try:
+                    self.system.main_loop()
+                except SoakComplete:
+                    pass
+                self._sample()
+                self.system.shutdown()
+        finally:
+            self.clock.uninstall()
+            if output is not sys.stdout:
+                output.close()
+            if not self.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        report = self.analyze()
+        report['real_seconds'] = time.perf_counter() - start_real
+        report['steps'] = self._steps
+        report['connections'] = self._connections
+        return report
+
+    # Analysis
+
+    def analyze(self):
+        settings = self.settings
+        findings = []
+
+        # Ignore warm-up: RSS climbs a few hundred KB in the first simulated hour while the
+        # SQLite page cache, allocator arenas and quantile sketches fill, then stays flat.
+        # Left in, that climb alone reads as a leak on runs of an hour or less.
+        warmup_hours = settings.warmup / 3600
+        samples = [s for s in self.samples if s['hours'] >= warmup_hours]
+        if len(samples) < 4:
+            needed = warmup_hours + 3 * settings.sample_interval / 3600
+            return {'passed': True,
+                    'findings': [f"Too few samples after warm-up to judge drift - run at least {needed:.1f}h"],
+                    'samples': self.samples}
+
+        hours = [s['hours'] for s in samples]
+
+        rss_growth = _slope(hours, [s['rss_kb'] for s in samples])
+        if rss_growth > settings.max_rss_growth_kb_per_hour:
+            findings.append(f"Memory leak suspected: RSS grows {rss_growth:.0f} KB/h")
+
+        fd_growth = samples[-1]['open_fds'] - samples[0]['open_fds']
+        if fd_growth > settings.max_fd_growth:
+            findings.append(f"File handle leak suspected: +{fd_growth} open descriptors")
+
+        db_growth = _slope(hours, [s['db_bytes'] for s in samples]) / (1024 * 1024)
+        if db_growth > settings.max_db_growth_mb_per_hour:
+            findings.append(f"Database grows {db_growth:.1f} MB/h")
+
+        wal_max = max(s['wal_bytes'] for s in samples) / (1024 * 1024)
+        if wal_max > settings.max_wal_mb:
+            findings.append(f"WAL reached {wal_max:.1f} MB - checkpoints are not keeping up")
+
+        # Windows spent paused have no steps to judge
+        active = [s for s in samples if s['steps'] > 1] or samples
+        quarter = max(1, len(active) // 4)
+        first = sum(s['latency_p95_ms'] for s in active[:quarter]) / quarter
+        last = sum(s['latency_p95_ms'] for s in active[-quarter:]) / quarter
+        latency_drift = last / first if first else 1
+        if latency_drift > settings.max_latency_drift:
+            findings.append(f"Step latency drift: p95 {first:.2f} ms -> {last:.2f} ms")
+
+        churn = max(s['connections_per_step'] for s in active)
+        if churn > settings.max_connections_per_step:
+            findings.append(f"Connection churn: up to {churn:.2f} new DB connections per step")
+
+        return {
+            'passed': not findings,
+            'findings': findings,
+            'rss_growth_kb_per_hour': rss_growth,
+            'fd_growth': fd_growth,
+            'db_growth_mb_per_hour': db_growth,
+            'wal_max_mb': wal_max,
+            'latency_drift': latency_drift,
+            'max_connections_per_step': churn,
+            'samples': self.samples
+        }
+
+def write_csv(samples, path):
+    if not samples:
+        return
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(samples[0]))
+        writer.writeheader()
+        writer.writerows(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-duration soak test under simulated hardware")
+    parser.add_argument('--hours', type=float, help="simulated hours (default SOAK['HOURS'])")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for environment and presses")
+    parser.add_argument('--csv', help="write the resource samples to this file")
+    parser.add_argument('--workdir', help="keep the database in this folder")
+    parser.add_argument('--verbose', action='store_true', help="show the system's own output")
+    args = parser.parse_args()
+
+    harness = SoakHarness(args.hours, args.seed, args.workdir, args.verbose)
+    report = harness.run()
+
+    if args.csv:
+        write_csv(report['samples'], args.csv)
+
+    print(f"Simulated {harness.hours:.1f}h in {report['real_seconds']:.0f}s real time "
+          f"({report['steps']} steps, {report['connections']} DB connections)")
+    for key in ('rss_growth_kb_per_hour', 'fd_growth', 'db_growth_mb_per_hour',
+                'wal_max_mb', 'latency_drift', 'max_connections_per_step'):
+        if key in report:
+            print(f"   • {key}: {report[key]:.2f}")
+
+    if report['passed']:
+        print("SOAK PASSED")
+        for finding in report['findings']:
+            print(f"   • {finding}")
+    else:
+        print("SOAK FAILED")
+        for finding in report['findings']:
+            print(f"   • {finding}")
+
+    return report['passed']
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
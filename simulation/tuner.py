@@ -0,0 +1,228 @@
+# Parameter tuner - grid or random search over settings, scored on simulated scenario runs
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runtime_config import ConfigError, get_config, load_config
+from simulation.scenarios import SCENARIOS, run_scenario, summarize
+
+# Pareto objectives - (metric, higher is better)
+OBJECTIVES = (
+    ('detection_rate', True),
+    ('latency_mean', False),
+    ('false_alerts_per_minute', False),
+    ('ping_rate', False)          # Servo moves and pings per second - battery and wear
+)
+
+def parse_value(text):
+    """'0.05' -> 0.05, '4' -> 4, anything else stays a string"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def combinations(space, samples=None, seed=1):
+    """Every combination of the space, or `samples` of them drawn at random"""
+    names = list(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    if samples is not None and samples < len(grid):
+        grid = random.Random(seed).sample(grid, samples)
+    return grid
+
+def to_overrides(combination):
+    """{'SERVO.STEP': 4} -> {'SERVO': {'STEP': 4}}"""
+    sections = {}
+    for name, value in combination.items():
+        section, _, key = name.partition('.')
+        sections.setdefault(section, {})[key] = value
+    return sections
+
+def _quiet_worker():
+    # The system's own output from many workers would bury the progress lines
+    sys.stdout = open(os.devnull, 'w')
+
+def _run_job(job):
+    # Runs in a worker process - one scenario for one combination
+    index, overrides, name, seed = job
+    return index, run_scenario(name, overrides, seed)
+
+def evaluate(combination, config, results):
+    """Scores of one combination over all its scenario runs
+
+    Ping rate is pings per second in the automatic scenarios; sweep rate
+    divides it by the positions in one pass, (MAX_ANGLE - MIN_ANGLE) / STEP.
+    """
+    row = summarize(results)
+    minutes = sum(result['duration'] for result in results) / 60
+    auto = [result for result in results if SCENARIOS[result['scenario']].mode == 'auto']
+    auto_seconds = sum(result['duration'] for result in auto)
+    ping_rate = sum(result['pings'] for result in auto) / auto_seconds if auto_seconds else None
+    servo = config.servo
+    positions = max(1, (servo.max_angle - servo.min_angle) / servo.step)
+
+    row['settings'] = combination
+    row['alerts'] = sum(result['alerts'] for result in results)
+    row['alerts_per_minute'] = row['alerts'] / minutes
+    row['ping_rate'] = ping_rate
+    row['sweep_rate'] = ping_rate / positions if ping_rate is not None else None
+    return row
+
+def _objective(row, metric, higher):
+    # Missing values (nothing detected, no automatic scenario) rank worst
+    value = row[metric]
+    if value is None:
+        return -math.inf if higher else math.inf
+    return value if higher else -value
+
+def dominates(a, b):
+    """a is at least as good as b on every objective and better on one"""
+    better = False
+    for metric, higher in OBJECTIVES:
+        a_value = _objective(a, metric, higher)
+        b_value = _objective(b, metric, higher)
+        if a_value < b_value:
+            return False
+        if a_value > b_value:
+            better = True
+    return better
+
+def pareto_front(rows):
+    return [row for row in rows if not any(dominates(other, row) for other in rows if other is not row)]
+
+def rank(rows):
+    """Most detections first, then earliest first alert, fewest false alerts, cheapest sweep"""
+    return sorted(rows, key=lambda row: tuple(-_objective(row, metric, higher)
+                                              for metric, higher in OBJECTIVES))
+
+def tune(space, scenarios, samples=None, seed=1, workers=None):
+    """Run every combination through every scenario on a process pool - rows ranked best first"""
+    jobs = []
+    candidates = []
+    for combination in combinations(space, samples, seed):
+        overrides = to_overrides(combination)
+        try:
+            config = load_config(overrides=overrides)
+        except ConfigError as e:
+            print(f"[TUNER] skipping {combination}: {e}")
+            continue
+        index = len(candidates)
+        candidates.append((combination, config))
+        jobs.extend((index, overrides, name, seed) for name in scenarios)
+
+    results = [[] for _ in candidates]
+    failed = set()
+    started = time.time()
+    print(f"[TUNER] {len(candidates)} combinations x {len(scenarios)} scenarios "
+          f"= {len(jobs)} runs on {workers} workers")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as pool:
+        futures = {pool.submit(_run_job, job): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), 1):
+            index, _, name, _ = futures[future]
+            try:
+                results[index].append(future.result()[1])
+            except Exception as e:
+                failed.add(index)
+                print(f"[TUNER] {name} failed for {candidates[index][0]}: {e}")
+            if done % max(1, len(jobs) // 10) == 0 or done == len(jobs):
+                print(f"[TUNER] {done}/{len(jobs)} runs | {time.time() - started:.0f}s")
+
+    rows = [evaluate(combination, config, results[index])
+            for index, (combination, config) in enumerate(candidates) if index not in failed]
+    return rank(rows)
+
+def _format(value, pattern):
+    return '-' if value is None else format(value, pattern)
+
+def _seconds(value):
+    return '-' if value is None else f"{value:.1f}s"
+
+def print_table(rows, names, front, limit=None):
+    widths = [max(len(name.partition('.')[2]), 6) for name in names]
+    print("  ".join(f"{name.partition('.')[2]:>{width}}" for name, width in zip(names, widths)) +
+          f" {'Detected':>9} {'Latency':>8} {'Worst':>6} {'False/min':>10} "
+          f"{'Alerts/min':>11} {'Sweeps/s':>9} {'Pings/s':>8}  Pareto")
+    for row in rows[:limit]:
+        settings = "  ".join(f"{row['settings'][name]!s:>{width}}" for name, width in zip(names, widths))
+        print(f"{settings} {_format(row['detection_rate'], '.0%'):>9} "
+              f"{_seconds(row['latency_mean']):>8} {_seconds(row['latency_max']):>6} "
+              f"{row['false_alerts_per_minute']:>10.2f} {row['alerts_per_minute']:>11.2f} "
+              f"{_format(row['sweep_rate'], '.3f'):>9} {_format(row['ping_rate'], '.1f'):>8}  "
+              f"{'*' if id(row) in front else ''}")
+
+def write_csv(rows, names, front, path):
+    fields = ['rank'] + names + ['detection_rate', 'detected', 'needed', 'latency_mean', 'latency_max',
+                                 'false_alerts_per_minute', 'alerts_per_minute', 'sweep_rate',
+                                 'ping_rate', 'direction_accuracy', 'pareto']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for position, row in enumerate(rows, 1):
+            writer.writerow(dict(row, **row['settings'], rank=position, pareto=id(row) in front))
+
+def main():
+    config = get_config()
+    tuner = config.tuner
+    parser = argparse.ArgumentParser(description="Search settings on simulated scenario runs, using every CPU core")
+    parser.add_argument('--param', action='append', default=[], metavar='SECTION.KEY=V1,V2',
+                        help="values to try for a setting, replacing TUNER['SPACE'] for it")
+    parser.add_argument('--only', action='store_true', help="search only the --param settings")
+    parser.add_argument('--random', type=int, metavar='N', help="try N random combinations instead of the grid")
+    parser.add_argument('--scenarios', nargs='+', help="scenarios per combination (default TUNER['SCENARIOS'] or all)")
+    parser.add_argument('--workers', type=int, help="worker processes (default TUNER['WORKERS'], 0 = all cores)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for echoes, noise and --random")
+    parser.add_argument('--top', type=int, default=tuner.top, help="rows shown in the ranked table")
+    parser.add_argument('--csv', help="write the full ranked table to this file")
+    parser.add_argument('--pareto-csv', help="write the Pareto front to this file")
+    args = parser.parse_args()
+
+    space = {} if args.only else {name: list(values) for name, values in tuner.space.items()}
+    for param in args.param:
+        name, _, values = param.partition('=')
+        section, _, key = name.partition('.')
+        if not values or key not in config.sections.get(section, {}):
+            print(f"Bad --param {param} (expected SECTION.KEY=V1,V2 with a known setting)")
+            return False
+        space[name] = [parse_value(value) for value in values.split(',')]
+    if not space:
+        print("Nothing to search - give --param or drop --only")
+        return False
+
+    scenarios = args.scenarios or list(tuner.scenarios) or list(SCENARIOS)
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (python3 -m simulation.scenarios --list)")
+        return False
+
+    workers = args.workers if args.workers is not None else tuner.workers
+    rows = tune(space, scenarios, args.random, args.seed, workers or os.cpu_count())
+    if not rows:
+        print("No combination could be scored")
+        return False
+
+    names = list(space)
+    front = pareto_front(rows)
+    on_front = {id(row) for row in front}
+    print(f"\nRanked combinations (top {min(args.top, len(rows))} of {len(rows)}):")
+    print_table(rows, names, on_front, args.top)
+    print(f"\nPareto front ({len(front)} combinations, no other is better on "
+          f"{', '.join(metric for metric, _ in OBJECTIVES)}):")
+    print_table(front, names, on_front)
+
+    if args.csv:
+        write_csv(rows, names, on_front, args.csv)
+    if args.pareto_csv:
+        write_csv(front, names, on_front, args.pareto_csv)
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,5 @@
+#Fleet sync
+from .agent import SyncAgent
+from .aggregator import AggregatorStore, AggregatorServer
+
+__all__ = ['SyncAgent', 'AggregatorStore', 'AggregatorServer']
\ No newline at end of file
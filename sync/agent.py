@@ -0,0 +1,334 @@
+# Sync agent - ships new device rows to the aggregation service
+import argparse
+import base64
+import gzip
+import json
+import os
+import random
+import socket
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runtime_config import get_config
+from database.snapshot import read_path
+
+# Tables shipped to the aggregator and the columns sent for each
+SYNC_TABLES = {
+    'measurements': ('id', 'date_time', 'distance', 'angle', 'direction',
+                     'direction_code', 'alert_status', 'scan_mode'),
+    'system_logs': ('id', 'date_time', 'event_type', 'description', 'system_mode'),
+    'sweep_frames': ('id', 'start_time', 'end_time', 'angle_start', 'angle_step', 'count',
+                     'encoding', 'distances', 'alert_count', 'scan_mode', 'angles',
+                     'echo_count', 'distance_sum')
+}
+
+# Responses that refuse the batch itself (malformed, too large) - its rows are set aside.
+# Other 4xx answers (auth, wrong URL) stop the round and keep the mark, nothing is skipped.
+REJECTED_STATUSES = (400, 413, 422)
+
+# BLOB columns travel as base64 text inside the JSON batch
+SYNC_BLOB_COLUMNS = {
+    'sweep_frames': ('distances', 'angles')
+}
+
+def _blob_indexes(table):
+    columns = SYNC_TABLES[table]
+    return [columns.index(name) for name in SYNC_BLOB_COLUMNS.get(table, ())]
+
+def encode_blobs(table, rows):
+    """Rows as JSON-safe lists - bytes become base64 text, NULL stays None"""
+    indexes = _blob_indexes(table)
+    if not indexes:
+        return rows
+    encoded = []
+    for row in rows:
+        row = list(row)
+        for index in indexes:
+            if row[index] is not None:
+                row[index] = base64.b64encode(row[index]).decode('ascii')
+        encoded.append(row)
+    return encoded
+
+def decode_blobs(table, rows):
+    """Reverse of encode_blobs - raises ValueError on bad base64"""
+    indexes = _blob_indexes(table)
+    if not indexes:
+        return rows
+    decoded = []
+    for row in rows:
+        row = list(row)
+        for index in indexes:
+            if row[index] is not None:
+                row[index] = base64.b64decode(row[index], validate=True)
+        decoded.append(row)
+    return decoded
+
+class UploadError(Exception):
+    """Raised when a batch could not be delivered"""
+
+class BatchRejected(UploadError):
+    """The server refused the batch's contents - sending it again will not help"""
+
+    def __init__(self, status):
+        super().__init__(f"Batch rejected: HTTP {status}")
+        self.status = status
+
+class SyncAgent:
+    def __init__(self, config=None, db_path=None):
+        self.config = config or get_config()
+        sync = self.config.sync
+        # The snapshot replica when there is one, so uploads never hold up the writer
+        self.db_path = db_path or read_path(self.config)
+        self.device_id = sync.device_id or socket.gethostname()
+        self.state_file = sync.state_file
+        self.rejected_file = sync.rejected_file
+        self.state = self.load_state()
+        self.stats = {
+            'rows': 0,
+            'batches': 0,
+            'rejected': 0,
+            'raw_bytes': 0,
+            'sent_bytes': 0,
+            'retries': 0,
+            'upload_time': 0.0
+        }
+
+    def load_state(self):
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+
+        return {table: int(state.get(table, 0)) for table in SYNC_TABLES}
+
+    def save_state(self):
+        # Atomic replace so a crash never leaves a half-written mark
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_file)
+
+    def _connect(self):
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                               timeout=self.config.database.connection_timeout)
+
+    def read_batch(self, conn, table, after_id, limit):
+        columns = SYNC_TABLES[table]
+        cursor = conn.execute(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        )
+        return encode_blobs(table, cursor.fetchall())
+
+    def build_payload(self, table, rows):
+        body = json.dumps({
+            'device_id': self.device_id,
+            'table': table,
+            'columns': SYNC_TABLES[table],
+            'rows': rows
+        }, separators=(',', ':')).encode('utf-8')
+        return body, gzip.compress(body)
+
+    def upload(self, payload):
+        """POST one compressed batch, retrying with exponential backoff"""
+        sync = self.config.sync
+        request = urllib.request.Request(
+            sync.server_url, data=payload, method='POST',
+            headers={
+                'Content-Type': 'application/json',
+                'Content-Encoding': 'gzip',
+                'X-Device-Id': self.device_id
+            }
+        )
+
+        for attempt in range(sync.max_retries):
+            try:
+                with urllib.request.urlopen(request, timeout=sync.request_timeout) as response:
+                    return json.loads(response.read().decode('utf-8'))
+            except urllib.error.HTTPError as e:
+                if e.code in REJECTED_STATUSES:
+                    raise BatchRejected(e.code)
+                if 400 <= e.code < 500:
+                    # Retrying will not help until the setup is fixed
+                    raise UploadError(f"Request refused: HTTP {e.code}")
+                error = e
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                error = e
+
+            if attempt < sync.max_retries - 1:
+                self.stats['retries'] += 1
+                delay = min(sync.backoff_max, sync.backoff_base * (2 ** attempt))
+                delay *= random.uniform(0.5, 1.0)
+                print(f"Upload attempt {attempt + 1} failed ({error}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+        raise UploadError(f"Upload failed after {sync.max_retries} attempts: {error}")
+
+    def sync_table(self, conn, table):
+        sent = 0
+        batch_size = self.config.sync.batch_size
+
+        while True:
+            rows = self.read_batch(conn, table, self.state[table], batch_size)
+            if not rows:
+                return sent
+
+            sent += self.send_rows(table, rows)
+
+            # Advance the mark only after every row was acknowledged or set aside
+            self.state[table] = rows[-1][0]
+            self.save_state()
+
+            if len(rows) < batch_size:
+                return sent
+
+    def send_rows(self, table, rows):
+        """Upload rows - returns how many the server took
+
+        A rejected batch is split in halves until the refused rows stand alone,
+        those are recorded in SYNC['REJECTED_FILE'] and skipped. Network and 5xx
+        errors still raise, so the batch is tried again next round.
+        """
+        raw, payload = self.build_payload(table, rows)
+        start = time.time()
+        try:
+            self.upload(payload)
+        except BatchRejected as e:
+            if len(rows) > 1:
+                middle = len(rows) // 2
+                return self.send_rows(table, rows[:middle]) + self.send_rows(table, rows[middle:])
+            self.reject(table, rows, e.status)
+            return 0
+        finally:
+            self.stats['upload_time'] += time.time() - start
+
+        self.stats['rows'] += len(rows)
+        self.stats['batches'] += 1
+        self.stats['raw_bytes'] += len(raw)
+        self.stats['sent_bytes'] += len(payload)
+        return len(rows)
+
+    def reject(self, table, rows, status):
+        """Set aside rows the server refused - they stay in the device database"""
+        first_id, last_id = rows[0][0], rows[-1][0]
+        print(f"Sync: server refused {table} rows {first_id}-{last_id} (HTTP {status}), skipping them")
+        self.stats['rejected'] += len(rows)
+        entry = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'device_id': self.device_id,
+            'table': table,
+            'first_id': first_id,
+            'last_id': last_id,
+            'rows': len(rows),
+            'status': status
+        }
+        try:
+            with open(self.rejected_file, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        except OSError as e:
+            print(f"Sync: cannot record rejected rows: {e}")
+
+    def sync_once(self):
+        """Ship everything new since the high-water marks"""
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"Sync: cannot open database: {e}")
+            return False
+
+        try:
+            for table in SYNC_TABLES:
+                sent = self.sync_table(conn, table)
+                if sent:
+                    print(f"Sync: {sent} {table} rows uploaded")
+            return True
+        except UploadError as e:
+            print(f"Sync interrupted: {e}")
+            return False
+        except sqlite3.Error as e:
+            print(f"Sync read error: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def get_lag(self):
+        """Rows not yet shipped and age of the oldest one (seconds)"""
+        lag = {}
+        try:
+            conn = self._connect()
+        except sqlite3.Error:
+            return lag
+
+        try:
+            for table, columns in SYNC_TABLES.items():
+                # Frames keep epoch seconds, the other tables local date strings
+                time_column = 'date_time' if 'date_time' in columns else 'start_time'
+                cursor = conn.execute(
+                    f"SELECT COUNT(*), MIN({time_column}) FROM {table} WHERE id > ?",
+                    (self.state[table],)
+                )
+                count, oldest = cursor.fetchone()
+                age = 0
+                if isinstance(oldest, str):
+                    oldest = time.mktime(time.strptime(oldest, '%Y-%m-%d %H:%M:%S'))
+                if oldest:
+                    age = max(0, time.time() - oldest)
+                lag[table] = {'rows': count, 'oldest_age': age}
+        except sqlite3.Error as e:
+            print(f"Sync lag query error: {e}")
+        finally:
+            conn.close()
+
+        return lag
+
+    def report(self):
+        stats = self.stats
+        upload_time = stats['upload_time'] or 1e-9
+        ratio = stats['raw_bytes'] / stats['sent_bytes'] if stats['sent_bytes'] else 0
+
+        print(f"Sync: {stats['rows']} rows in {stats['batches']} batches | "
+              f"{stats['rows'] / upload_time:.0f} rows/s | "
+              f"{stats['sent_bytes'] / 1024 / upload_time:.1f} KB/s | "
+              f"compression {ratio:.1f}x | retries {stats['retries']} | "
+              f"rejected {stats['rejected']}")
+
+        for table, lag in self.get_lag().items():
+            print(f"Sync lag {table}: {lag['rows']} rows, oldest {lag['oldest_age']:.0f}s")
+
+    def run_forever(self):
+        interval = self.config.sync.interval
+        print(f"Sync agent '{self.device_id}' -> {self.config.sync.server_url}")
+
+        try:
+            while True:
+                self.sync_once()
+                self.report()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\nSync agent stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload device records to the aggregation service")
+    parser.add_argument('--once', action='store_true', help="run one sync round and exit")
+    parser.add_argument('--db', help="database file (default: snapshot replica, else the configured database)")
+    args = parser.parse_args()
+
+    agent = SyncAgent(db_path=args.db)
+    if args.once:
+        ok = agent.sync_once()
+        agent.report()
+        return ok
+
+    agent.run_forever()
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
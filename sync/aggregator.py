@@ -0,0 +1,255 @@
+# Reference aggregation service - collects batches from many devices into one store
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runtime_config import get_config
+from sync.agent import SYNC_TABLES, decode_blobs
+
+class AggregatorStore:
+    """Fleet-wide SQLite store, one bulk insert per received batch"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.rows_received = 0
+        self.rows_inserted = 0
+        self.batches = 0
+        self.ingest_time = 0.0
+        self.start_time = time.time()
+        self._create_tables()
+
+    def _create_tables(self):
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS fleet_measurements (
+            device_id TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            date_time TEXT NOT NULL,
+            distance REAL NOT NULL,
+            angle INTEGER NOT NULL,
+            direction TEXT NOT NULL,
+            direction_code INTEGER NOT NULL,
+            alert_status INTEGER NOT NULL,
+            scan_mode TEXT,
+            PRIMARY KEY (device_id, source_id)
+        )
+        ''')
+
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS fleet_system_logs (
+            device_id TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            date_time TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            description TEXT,
+            system_mode TEXT,
+            PRIMARY KEY (device_id, source_id)
+        )
+        ''')
+
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS fleet_sweep_frames (
+            device_id TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            start_time REAL NOT NULL,
+            end_time REAL NOT NULL,
+            angle_start INTEGER NOT NULL,
+            angle_step INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            encoding INTEGER NOT NULL,
+            distances BLOB NOT NULL,
+            alert_count INTEGER NOT NULL,
+            scan_mode TEXT,
+            angles BLOB,
+            echo_count INTEGER,
+            distance_sum REAL,
+            PRIMARY KEY (device_id, source_id)
+        )
+        ''')
+
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS devices (
+            device_id TEXT PRIMARY KEY,
+            last_seen REAL NOT NULL,
+            rows_received INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        self.conn.commit()
+
+    def ingest(self, device_id, table, columns, rows):
+        """Insert one batch - retried batches are ignored row by row"""
+        if table not in SYNC_TABLES or tuple(columns) != SYNC_TABLES[table]:
+            raise ValueError(f"Unexpected table or columns: {table}")
+
+        # Device row id becomes source_id
+        names = ('device_id', 'source_id') + tuple(columns[1:])
+        placeholders = ', '.join('?' * len(names))
+        sql = f"INSERT OR IGNORE INTO fleet_{table} ({', '.join(names)}) VALUES ({placeholders})"
+        # A malformed row is the sender's fault (400), found before the transaction opens
+        for row in rows:
+            if not isinstance(row, (list, tuple)) or len(row) != len(columns):
+                raise ValueError(f"Malformed row in {table}: expected {len(columns)} values")
+        values = [(device_id,) + tuple(row) for row in decode_blobs(table, rows)]
+
+        start = time.time()
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany(sql, values)
+                inserted = cursor.rowcount
+                cursor.execute(
+                    "INSERT INTO devices (device_id, last_seen, rows_received) VALUES (?, ?, ?) "
+                    "ON CONFLICT(device_id) DO UPDATE SET last_seen = excluded.last_seen, "
+                    "rows_received = rows_received + excluded.rows_received",
+                    (device_id, time.time(), len(rows))
+                )
+                self.conn.commit()
+            except Exception:
+                # Never leave the transaction open - every later batch would fail
+                self.conn.rollback()
+                raise
+
+            self.batches += 1
+            self.rows_received += len(rows)
+            self.rows_inserted += inserted
+            self.ingest_time += time.time() - start
+
+        return inserted
+
+    def get_statistics(self):
+        with self.lock:
+            devices = self.conn.execute(
+                "SELECT device_id, last_seen, rows_received FROM devices ORDER BY device_id"
+            ).fetchall()
+
+        uptime = time.time() - self.start_time
+        return {
+            'batches': self.batches,
+            'rows_received': self.rows_received,
+            'rows_inserted': self.rows_inserted,
+            'rows_per_second': self.rows_received / uptime if uptime > 0 else 0,
+            'insert_rows_per_second': self.rows_received / self.ingest_time if self.ingest_time else 0,
+            'devices': [
+                {'device_id': device_id, 'last_seen_age': time.time() - last_seen,
+                 'rows_received': received}
+                for device_id, last_seen, received in devices
+            ]
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class IngestHandler(BaseHTTPRequestHandler):
+    store = None
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != '/ingest':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length)
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            batch = json.loads(body.decode('utf-8'))
+            inserted = self.store.ingest(batch['device_id'], batch['table'],
+                                         batch['columns'], batch['rows'])
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except sqlite3.Error as e:
+            self._send_json(503, {'error': str(e)})
+            return
+
+        self._send_json(200, {'accepted': len(batch['rows']), 'inserted': inserted})
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._send_json(200, self.store.get_statistics())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def log_message(self, format, *args):
+        # Keep the console for the periodic throughput report
+        pass
+
+class AggregatorServer:
+    def __init__(self, host=None, port=None, db_path=None, config=None):
+        self.config = config or get_config()
+        sync = self.config.sync
+        self.store = AggregatorStore(db_path or sync.aggregator_db)
+        handler = type('BoundIngestHandler', (IngestHandler,), {'store': self.store})
+        self.httpd = ThreadingHTTPServer((host or sync.aggregator_host,
+                                          port if port is not None else sync.aggregator_port),
+                                         handler)
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def start(self):
+        """Serve in a background thread (used for localhost testing)"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="aggregator",
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+        self.store.close()
+
+    def report(self):
+        stats = self.store.get_statistics()
+        print(f"Aggregator: {stats['batches']} batches | {stats['rows_received']} rows "
+              f"({stats['rows_inserted']} new) | {stats['rows_per_second']:.1f} rows/s | "
+              f"insert {stats['insert_rows_per_second']:.0f} rows/s | "
+              f"{len(stats['devices'])} devices")
+
+    def serve_forever(self, report_interval=30):
+        host, port = self.address[:2]
+        print(f"Aggregator listening on http://{host}:{port}/ingest")
+        self.start()
+        try:
+            while True:
+                time.sleep(report_interval)
+                self.report()
+        except KeyboardInterrupt:
+            print("\nAggregator stopped")
+        finally:
+            self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Reference fleet aggregation service")
+    parser.add_argument('--host', help="bind address")
+    parser.add_argument('--port', type=int, help="listen port")
+    parser.add_argument('--db', help="fleet database file")
+    args = parser.parse_args()
+
+    AggregatorServer(args.host, args.port, args.db).serve_forever()
+
+if __name__ == "__main__":
+    main()